@@ -1,50 +1,145 @@
 import os
+import sys
 import json
-from datetime import date, datetime, timedelta
-import smtplib
-import feedparser
+import argparse
+from datetime import date, datetime, timedelta, timezone
 from collections import defaultdict
-import requests
+from itertools import islice
 from email.mime.text import MIMEText
-from bs4 import BeautifulSoup, XMLParsedAsHTMLWarning
-import imaplib
+from email.mime.multipart import MIMEMultipart
+from html import escape as escape_html
 import email
 import time
-from email.utils import parsedate_to_datetime
-import warnings
+from email.utils import parsedate_to_datetime, parseaddr
+from email.header import decode_header, make_header
+from html.parser import HTMLParser
+import base64
+import quopri
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError as FuturesTimeout, wait
+import multiprocessing
+import threading
+import hashlib
+import heapq
+import random
+import signal
+import re
+import logging
+from contextlib import contextmanager
+from dataclasses import dataclass, field, replace
+from types import MappingProxyType
+from urllib.parse import urlparse, parse_qsl, urlencode
 
-warnings.filterwarnings("ignore", category=XMLParsedAsHTMLWarning)
+# Schwere Abhängigkeiten (requests, feedparser, lxml, bs4, imaplib, smtplib) werden erst in den Funktionen importiert,
+# die sie brauchen – so bleibt "import briefing" schnell und ohne CONFIG nutzbar (Tests, Tools, Worker-Prozesse).
 
 # Pfad zu den Holiday JSON Dateien (relativ zum Script-Verzeichnis)
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 CHINA_HOLIDAY_FILE = os.path.join(BASE_DIR, "holiday_cache", "china.json")
 HK_HOLIDAY_FILE = os.path.join(BASE_DIR, "holiday_cache", "hk.json")
+ADJUSTED_WORKDAYS_FILE = os.path.join(BASE_DIR, "holiday_cache", "adjusted_workdays")
+SUBSTACKS_FILE = os.path.join(BASE_DIR, "substacks.json")
 
-def load_holidays(filepath):
+# === 📅 Handelskalender China/Hongkong ===
+# Die Feiertagsdateien enthalten auch Gedenk- und Aktionstage, an denen ganz normal gehandelt wird
+NON_TRADING_HOLIDAY_NAMES = {
+    "china": {"lantern festival", "zhonghe festival", "international women's day", "arbor day", "youth day",
+              "children's day", "cpc founding day", "army day", "chinese valentine's day", "spirit festival",
+              "teachers' day", "double ninth festival", "journalists' day", "maritime day", "christmas day"},
+    "hk": {"valentine's day", "easter sunday", "mother's day", "father's day", "hungry ghost festival",
+           "confucius' birthday", "new year's eve"},
+}
+WORKDAY_NAMES = {"special working day", "adjusted working day"}
+MARKET_TZ = timezone(timedelta(hours=8))  # Shanghai, Shenzhen und Hongkong
+
+def load_calendar_entries(filepath, key="holidays"):
+    """Liest [(Datum, Name)] aus einer Kalenderdatei; fehlende/kaputte Dateien ergeben eine leere Liste."""
     if not os.path.exists(filepath):
-        print(f"Warnung: Datei {filepath} nicht gefunden, keine Feiertage geladen.")
-        return set()
+        log.warning("Warnung: Datei %s nicht gefunden, keine Feiertage geladen.", filepath)
+        return []
     try:
         with open(filepath, "r", encoding="utf-8") as f:
             data = json.load(f)
-            return set(item["date"] for item in data.get("holidays", []))
+        return [(date.fromisoformat(item["date"]), item.get("name", "").strip().replace("’", "'").lower())
+                for item in data.get(key, [])]
     except Exception as e:
-        print(f"Fehler beim Laden der Feiertage aus {filepath}: {e}")
-        return set()
+        log.error("Fehler beim Laden der Feiertage aus %s: %s", filepath, e)
+        return []
+
+class TradingCalendar:
+    """Handelstage je Markt als vorberechnete Bitmaske pro Jahr (Bit n = n-ter Tag des Jahres).
+
+    Börsen handeln nur Mo–Fr ohne Feiertag; Ersatzarbeitstage am Wochenende (调休) sind Arbeitstage,
+    aber keine Handelstage – dafür gibt es is_workday().
+    """
+
+    def __init__(self, holidays, workdays=None):
+        # holidays/workdays: {Markt: set(date)}
+        self.holidays = holidays
+        self.workdays = workdays or {}
+        self.years = {}
+
+    def _year(self, market, year):
+        compiled = self.years.get((market, year))
+        if compiled is None:
+            compiled = self._compile(market, year)
+            self.years[(market, year)] = compiled
+        return compiled
+
+    def _compile(self, market, year):
+        """Baut (erster Tag, Handelstag-Bits, Arbeitstag-Bits, vorheriger Handelstag je Tag, letzter Handelstag)."""
+        if market not in self.holidays:
+            raise KeyError(f"Unbekannter Markt: {market}")
+        holidays, workdays = self.holidays[market], self.workdays.get(market, set())
+        first = date(year, 1, 1).toordinal()
+        days = date(year + 1, 1, 1).toordinal() - first
+        trading_bits = workday_bits = 0
+        previous = [None] * days
+        last = None
+        for i in range(days):
+            day = date.fromordinal(first + i)
+            previous[i] = last
+            if day.weekday() < 5 and day not in holidays:
+                trading_bits |= 1 << i
+                last = first + i
+            if (day.weekday() < 5 and day not in holidays) or day in workdays:
+                workday_bits |= 1 << i
+        return first, trading_bits, workday_bits, previous, last
+
+    def is_trading_day(self, market, day):
+        first, trading_bits, _, _, _ = self._year(market, day.year)
+        return bool(trading_bits >> (day.toordinal() - first) & 1)
 
-def is_holiday(today_str, holidays_set):
-    return today_str in holidays_set
+    def is_workday(self, market, day):
+        first, _, workday_bits, _, _ = self._year(market, day.year)
+        return bool(workday_bits >> (day.toordinal() - first) & 1)
 
-def is_weekend():
-    return date.today().weekday() >= 5
+    def previous_trading_day(self, market, day):
+        """Letzter Handelstag vor day (über Jahresgrenzen hinweg), z. B. der Tag vor der Golden Week."""
+        first, _, _, previous, _ = self._year(market, day.year)
+        ordinal = previous[day.toordinal() - first]
+        year = day.year
+        while ordinal is None:
+            year -= 1
+            ordinal = self._year(market, year)[4]
+        return date.fromordinal(ordinal)
 
-# Werte vorladen (global)
-today_str = date.today().isoformat()
-china_holidays = load_holidays(CHINA_HOLIDAY_FILE)
-hk_holidays = load_holidays(HK_HOLIDAY_FILE)
-is_holiday_china = is_holiday(today_str, china_holidays)
-is_holiday_hk = is_holiday(today_str, hk_holidays)
-is_weekend_day = is_weekend()
+_trading_calendar = None
+_trading_calendar_lock = threading.Lock()
+
+def get_trading_calendar():
+    """Lädt die Kalenderdateien einmal pro Prozess; die Jahres-Bitmasken entstehen beim ersten Zugriff."""
+    global _trading_calendar
+    with _trading_calendar_lock:
+        if _trading_calendar is None:
+            holidays, workdays = {}, {}
+            for market, filepath in (("china", CHINA_HOLIDAY_FILE), ("hk", HK_HOLIDAY_FILE)):
+                entries = load_calendar_entries(filepath)
+                holidays[market] = {d for d, name in entries
+                                    if name not in WORKDAY_NAMES and name not in NON_TRADING_HOLIDAY_NAMES[market]}
+                workdays[market] = {d for d, name in entries if name in WORKDAY_NAMES}
+            workdays["china"] |= {d for d, _ in load_calendar_entries(ADJUSTED_WORKDAYS_FILE, "adjusted_workdays")}
+            _trading_calendar = TradingCalendar(holidays, workdays)
+        return _trading_calendar
 
 # === 🧠 Wirtschaftskalendar (Dummy) ===
 def fetch_china_economic_events():
@@ -56,11 +151,125 @@ def fetch_china_economic_events():
     ]
 
 # === 🔐 Konfiguration aus ENV-Variable ===
-config = os.getenv("CONFIG")
-if not config:
-    raise ValueError("CONFIG environment variable not found!")
-pairs = config.split(";")
-config_dict = dict(pair.split("=", 1) for pair in pairs)
+def load_config():
+    """Liest CONFIG (key=value;...) – erst beim Versand, damit der Import ohne Zugangsdaten funktioniert."""
+    config = os.getenv("CONFIG")
+    if not config:
+        raise ValueError("CONFIG environment variable not found!")
+    pairs = config.split(";")
+    return dict(pair.split("=", 1) for pair in pairs)
+
+# === 📊 Messwerte & Laufbericht ===
+log = logging.getLogger("briefing")
+RUN_REPORT_FILE = os.path.join(BASE_DIR, "run_report.json")
+METRIC_FIELDS = ("calls", "seconds", "bytes", "items", "retries", "errors")
+
+class StageRecord:
+    """Wird im with-Block von measure() befüllt: übertragene Bytes, Einträge, Wiederholungen, Fehler."""
+    __slots__ = ("bytes", "items", "retries", "error")
+
+    def __init__(self):
+        self.bytes = self.items = self.retries = 0
+        self.error = None
+
+class RunReport:
+    """Summiert Messwerte je (Stufe, Ziel) über einen Lauf; Ausgabe als JSON, Prometheus-Text oder Fußzeile."""
+
+    def __init__(self):
+        self.started = datetime.now(timezone.utc)
+        self.started_monotonic = time.monotonic()
+        self.lock = threading.Lock()
+        self.stages = {}
+
+    def add(self, stage, target, seconds, record):
+        with self.lock:
+            entry = self.stages.get((stage, target))
+            if entry is None:
+                entry = self.stages[(stage, target)] = dict.fromkeys(METRIC_FIELDS, 0)
+                entry["last_error"] = None
+            entry["calls"] += 1
+            entry["seconds"] += seconds
+            entry["bytes"] += record.bytes
+            entry["items"] += record.items
+            entry["retries"] += record.retries
+            if record.error:
+                entry["errors"] += 1
+                entry["last_error"] = record.error
+
+    def totals(self, stage=None):
+        with self.lock:
+            entries = [e for (st, _), e in self.stages.items() if stage is None or st == stage]
+        return {field: sum(e[field] for e in entries) for field in METRIC_FIELDS}
+
+    def to_dict(self):
+        with self.lock:
+            stages = [{"stage": stage, "target": target, **entry} for (stage, target), entry in self.stages.items()]
+        return {
+            "started": self.started.isoformat(),
+            "duration": time.monotonic() - self.started_monotonic,
+            "totals": {stage: self.totals(stage) for stage in dict.fromkeys(e["stage"] for e in stages)},
+            "stages": stages,
+        }
+
+    def write_json(self, path):
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=1)
+        os.replace(tmp, path)
+        log.info("📊 Laufbericht gespeichert: %s", path)
+
+    def prometheus(self):
+        """Textformat für den Prometheus-Textfile-Collector (node_exporter)."""
+        def label(value):
+            return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        lines = ["# TYPE briefing_run_duration_seconds gauge",
+                 f"briefing_run_duration_seconds {time.monotonic() - self.started_monotonic:.3f}"]
+        with self.lock:
+            stages = sorted(self.stages.items())
+        for field in METRIC_FIELDS:
+            metric = "briefing_stage_seconds" if field == "seconds" else f"briefing_stage_{field}_total"
+            lines.append(f"# TYPE {metric} {'gauge' if field == 'seconds' else 'counter'}")
+            for (stage, target), entry in stages:
+                lines.append(f'{metric}{{stage="{label(stage)}",target="{label(target)}"}} {entry[field]:g}')
+        return "\n".join(lines) + "\n"
+
+    def footer_text(self):
+        sections = self.totals("section")
+        fetched = {stage: self.totals(stage) for stage in ("feed", "yahoo", "imap")}
+        received = sum(t["bytes"] for t in fetched.values())
+        errors = sum(t["errors"] for t in fetched.values()) + sections["errors"]
+        with self.lock:
+            slowest = max(((target, e["seconds"]) for (stage, target), e in self.stages.items() if stage == "section"),
+                          key=lambda x: x[1], default=None)
+        text = (f"⏱️ Erstellt in {time.monotonic() - self.started_monotonic:.1f} s · {sections['calls']} Quellen · "
+                f"{received / 1024:.0f} KB geladen · {errors} Fehler")
+        if slowest:
+            text += f" · langsamste Quelle: {slowest[0]} ({slowest[1]:.1f} s)"
+        return text
+
+_run_report = RunReport()
+
+def start_run_report():
+    """Beginnt einen neuen Laufbericht (je Briefing); Versand-Messwerte landen im selben Bericht."""
+    global _run_report
+    _run_report = RunReport()
+    return _run_report
+
+def get_run_report():
+    return _run_report
+
+@contextmanager
+def measure(stage, target=""):
+    """Misst Dauer (und was der Block in den StageRecord schreibt) einer Abruf-/Parse-Stufe; Ausnahmen zählen als Fehler."""
+    record = StageRecord()
+    start = time.perf_counter()
+    try:
+        yield record
+    except Exception as e:
+        record.error = record.error or str(e)
+        raise
+    finally:
+        _run_report.add(stage, target, time.perf_counter() - start, record)
 
 # === Google Mapping ===
 source_categories = {
@@ -118,576 +327,3938 @@ feeds_scmp_yicai = {
 }
 
 # === China-Filter & Score-Funktionen ===
-def score_article(title, summary=""):
-    title = title.lower()
-    summary = summary.lower()
-    content = f"{title} {summary}"
-    must_have_in_title = [
-        "china", "chinese", "xi", "beijing", "shanghai", "hong kong", "taiwan", "prc",
+# Eigene Listen/Gewichte können in keywords.json (gleiche Struktur) hinterlegt werden.
+# Ein "*" am Ende erlaubt Wortendungen (z. B. "tariff*" → tariff, tariffs); sonst zählen nur ganze Wörter.
+KEYWORDS_FILE = os.path.join(BASE_DIR, "keywords.json")
+DEFAULT_SCORING_CONFIG = {
+    "base_score": 1,
+    "must_have_in_title": [
+        "china*", "chinese", "xi", "beijing", "shanghai", "hong kong", "taiwan*", "prc",
         "communist party", "cpc", "byd", "alibaba", "tencent", "huawei", "li qiang", "brics",
         "belt and road", "macau", "pla"
-    ]
-    if not any(kw in title for kw in must_have_in_title):
-        return 0
-    important_keywords = [
-        "gdp", "exports", "imports", "tariffs", "real estate", "economy", "policy", "ai",
-        "semiconductors", "pmi", "cpi", "housing", "foreign direct investment", "tech",
-        "military", "sanctions", "trade", "data", "manufacturing", "industrial"
-    ]
-    positive_modifiers = [
-        "analysis", "explainer", "comment", "feature", "official", "report", "statement"
-    ]
-    negative_keywords = [
-        "celebrity", "gossip", "dog", "baby", "fashion", "movie", "series", "bizarre",
-        "dating", "weird", "quiz", "elon musk", "rapid", "lask", "bundesliga", "eurovision",
-        "basketball", "nba", "mlb", "nfl", "liberty", "yankees", "tournament", "playoffs",
-        "finale", "score", "blowout"
-    ]
-    score = 1
-    for word in important_keywords:
-        if word in content:
-            score += 2
-    for word in positive_modifiers:
-        if word in content:
-            score += 1
-    for word in negative_keywords:
-        if word in content:
-            score -= 3
-    return score
+    ],
+    "groups": {
+        "important": {"weight": 2, "keywords": [
+            "gdp", "export*", "imports", "tariff*", "real estate", "economy", "policy", "ai",
+            "semiconductor*", "pmi", "cpi", "housing", "foreign direct investment", "tech",
+            "military", "sanction*", "trade", "data", "manufacturing", "industrial"
+        ]},
+        "positive": {"weight": 1, "keywords": [
+            "analysis", "explainer", "comment", "feature", "official", "report", "statement"
+        ]},
+        "negative": {"weight": -3, "keywords": [
+            "celebrity", "gossip", "dog", "baby", "fashion", "movie", "series", "bizarre",
+            "dating", "weird", "quiz", "elon musk", "rapid", "lask", "bundesliga", "eurovision",
+            "basketball", "nba", "mlb", "nfl", "liberty", "yankees", "tournament", "playoffs",
+            "finale", "score", "blowout"
+        ]},
+    },
+}
 
-# === News-Artikel filtern & bewerten ===
-def fetch_news(feed_url, max_items=20, top_n=5):
-    feed = feedparser.parse(feed_url)
-    scored = []
-    for entry in feed.entries[:max_items]:
-        title = entry.get("title", "")
-        summary = entry.get("summary", "")
-        link = entry.get("link", "")
-        score = score_article(title, summary)
-        if score > 0:
-            scored.append((score, f'• <a href="{link.strip()}">{title.strip()}</a>'))
-    scored.sort(reverse=True, key=lambda x: x[0])
-    return [item[1] for item in scored[:top_n]] or ["Keine aktuellen China-Artikel gefunden."]
+WORD_RE = re.compile(r"\w+")
+HTML_TAG_RE = re.compile(r"<[^>]*>")
 
-# === SCMP & Yicai Ranking-Wrapper ===
-def fetch_ranked_articles(feed_url, max_items=20, top_n=5):
-    return fetch_news(feed_url, max_items=max_items, top_n=top_n)
+class KeywordScorer:
+    """Kompiliert die Schlagwörter einmalig in Wort-Sets, Phrasen und einen Stamm-Regex (Treffer nur an Wortgrenzen)."""
 
-# === Neue Funktion: extract_source (für Google News) ===
-def extract_source(title):
-    """Extrahiert den Quellennamen aus dem Titel (z. B. '– Reuters')."""
-    for source in source_categories:
-        if f"– {source}" in title or f"- {source}" in title or title.lower().endswith(source.lower()):
-            return source
-    return "Unknown Source"
+    def __init__(self, config):
+        self.base_score = config.get("base_score", 1)
+        self.title_matcher = self._compile([(k, 0) for k in config["must_have_in_title"]])
+        self.content_matcher = self._compile([(k, group["weight"]) for group in config["groups"].values() for k in group["keywords"]])
 
-# === Substack aus E-Mails abrufen ===
-def fetch_substack_from_email(email_user, email_password, folder="[Gmail]/Alle Nachrichten", max_results_per_sender=5):
-    """Liest Substack-Mails von mehreren Absendern aus Gmail, robuste Version."""
-    posts = []
-    
-    try:
-        print(f"Debug - Aktuelles Arbeitsverzeichnis: {os.getcwd()}")
-        print(f"Debug - Existiert substacks.json?: {os.path.exists('substacks.json')}")
-        with open("substacks.json", "r") as f:
-            substack_senders = json.load(f)
-        substack_senders = sorted(substack_senders, key=lambda x: x["order"])
-        email_counts = defaultdict(int)
-        for sender in substack_senders:
-            email_counts[sender.get("email")] += 1
-        duplicates = [email for email, count in email_counts.items() if count > 1 and email]
-        if duplicates:
-            print(f"⚠️ Warnung: Doppelte E-Mail-Adressen in substacks.json: {duplicates}")
-    except FileNotFoundError:
-        print("❌ Fehler: substacks.json nicht gefunden!")
-        posts.append(("Allgemein", "❌ Fehler: substacks.json nicht gefunden.", "#", "", 999, None))
-        return posts
-    except json.JSONDecodeError:
-        print("❌ Fehler: substacks.json ungültig!")
-        posts.append(("Allgemein", "❌ Fehler: substacks.json ungültig.", "#", "", 999, None))
-        return posts
-    
-    # Retry-Logik für Gmail-Verbindung
-    for attempt in range(3):
-        try:
-            imap = imaplib.IMAP4_SSL("imap.gmail.com")
-            imap.login(email_user, email_password)
-            folders = [folder, "INBOX", "[Gmail]/Updates"]
-            selected_folder = None
-            for f in folders:
+    @staticmethod
+    def _compile(keywords):
+        words, phrases, stems = {}, [], {}
+        for keyword, weight in keywords:
+            keyword = " ".join(WORD_RE.findall(keyword.lower())) + ("*" if keyword.strip().endswith("*") else "")
+            if keyword.endswith("*"):
+                stems[keyword[:-1]] = (keyword, weight)
+            elif " " in keyword:
+                phrases.append((f" {keyword} ", (keyword, weight)))
+            else:
+                words[keyword] = (keyword, weight)
+        stem_re = None
+        if stems:
+            # Im mit Leerzeichen verbundenen Token-Text beginnt jedes Wort nach einem Leerzeichen
+            stem_re = re.compile(" (" + "|".join(re.escape(s) for s in sorted(stems, key=len, reverse=True)) + ")")
+        return words, phrases, stems, stem_re
+
+    @staticmethod
+    def _hits(matcher, tokens):
+        words, phrases, stems, stem_re = matcher
+        hits = {words[t] for t in words.keys() & tokens}
+        if phrases or stem_re:
+            padded = " " + " ".join(tokens) + " "
+            hits.update(kw for phrase, kw in phrases if phrase in padded)
+            if stem_re:
+                hits.update(stems[m.group(1)] for m in stem_re.finditer(padded))
+        return hits
+
+    def score(self, title, summary=""):
+        return self.score_many([(title, summary)])[0]
+
+    def score_many(self, items):
+        """Bewertet eine ganze Liste (Titel, Zusammenfassung) eines Feeds; jedes Schlagwort zählt pro Artikel einmal."""
+        scores = []
+        for title, summary in items:
+            title_tokens = WORD_RE.findall(title.lower())
+            if not self._hits(self.title_matcher, title_tokens):
+                scores.append(0)
+                continue
+            # Google-News-Zusammenfassungen sind HTML; Tags und URLs darin sollen nicht mitzählen
+            tokens = title_tokens + WORD_RE.findall(HTML_TAG_RE.sub(" ", summary).lower())
+            scores.append(self.base_score + sum(weight for _, weight in self._hits(self.content_matcher, tokens)))
+        return scores
+
+_scorer = None
+_scorer_lock = threading.Lock()
+
+def get_scorer():
+    """Lädt keywords.json (falls vorhanden) und kompiliert den Scorer einmal pro Prozess."""
+    global _scorer
+    with _scorer_lock:
+        if _scorer is None:
+            config = DEFAULT_SCORING_CONFIG
+            if os.path.exists(KEYWORDS_FILE):
                 try:
-                    imap.select(f)
-                    print(f"Debug - Ausgewählter Ordner: {f}")
-                    typ, data = imap.search(None, 'ALL')
-                    print(f"Debug - Anzahl Mails im Ordner {f}: {len(data[0].split())}")
-                    selected_folder = f
-                    break
+                    with open(KEYWORDS_FILE, "r", encoding="utf-8") as f:
+                        config = {**DEFAULT_SCORING_CONFIG, **json.load(f)}
                 except Exception as e:
-                    print(f"Debug - Fehler bei Ordner {f}: {str(e)}")
-            if not selected_folder:
-                raise Exception("Kein gültiger Ordner gefunden")
-            break
-        except Exception as e:
-            print(f"❌ Verbindung zu Gmail fehlgeschlagen (Versuch {attempt+1}/3): {str(e)}")
-            if attempt == 2:
-                posts.append(("Allgemein", f"❌ Fehler beim Verbinden mit Gmail nach 3 Versuchen: {str(e)}", "#", "", 999, None))
-                return posts
-            time.sleep(2)
-    
-    try:
-        # Datumsfilter: Letzte 7 Tage
-        since_date = (datetime.now() - timedelta(days=7)).strftime("%d-%b-%Y")
-        print(f"Debug - Suche nach Mails seit: {since_date}")
-        for sender in substack_senders:
-            sender_email = sender.get("email")
-            sender_name = sender.get("name")
-            sender_order = sender.get("order", 999)
-            if not sender_email:
-                posts.append((sender_name, f"❌ Keine E-Mail-Adresse für {sender_name} angegeben.", "#", "", sender_order, None))
-                continue
+                    log.warning("Warnung: %s unlesbar, nutze Standard-Schlagwörter: %s", KEYWORDS_FILE, e)
+            _scorer = KeywordScorer(config)
+        return _scorer
+
+def score_article(title, summary=""):
+    return get_scorer().score(title, summary)
+
+def score_entries(entries):
+    """Bewertet alle Einträge eines Feeds in einem Durchgang."""
+    return get_scorer().score_many([(entry.get("title", ""), entry.get("summary", "")) for entry in entries])
+
+# === 🎞️ Aufnahme & Wiedergabe (Fixtures für Tests/Benchmarks ohne Netz) ===
+FIXTURES_DIR = os.path.join(BASE_DIR, "fixtures")
+IMAP_DATE_RE = re.compile(r"\b\d{1,2}-[A-Z][a-z]{2}-\d{4}\b")
+_fixtures = None  # aktive FixtureSession oder None (Normalbetrieb)
+
+def _pack(value):
+    """bytes/Tupel JSON-tauglich machen (IMAP-Antworten bestehen aus verschachtelten bytes-Tupeln)."""
+    if isinstance(value, bytes):
+        return {"b64": base64.b64encode(value).decode("ascii")}
+    if isinstance(value, tuple):
+        return {"tuple": [_pack(v) for v in value]}
+    if isinstance(value, list):
+        return [_pack(v) for v in value]
+    return value
+
+def _unpack(value):
+    if isinstance(value, dict):
+        if "b64" in value:
+            return base64.b64decode(value["b64"])
+        return tuple(_unpack(v) for v in value["tuple"])
+    if isinstance(value, list):
+        return [_unpack(v) for v in value]
+    return value
+
+def imap_call_key(method, args):
+    """Schlüssel eines IMAP-Befehls; Datumsangaben (SINCE) und Zugangsdaten werden neutralisiert."""
+    if method == "login":
+        return "login"
+    text = json.dumps([a.decode(errors="replace") if isinstance(a, bytes) else a for a in args], ensure_ascii=False)
+    return f"{method} {IMAP_DATE_RE.sub('<DATUM>', text)}"
+
+class FixtureSession:
+    """Nimmt alle HTTP-Antworten und IMAP-Befehle in fixture_dir auf (mode="record") oder spielt sie ab (mode="replay").
+
+    Beim Abspielen wird die aufgezeichnete Antwortzeit mal latency nachgestellt (0 = ohne Wartezeit).
+    """
+
+    def __init__(self, mode, fixture_dir=FIXTURES_DIR, latency=1.0):
+        self.mode = mode
+        self.dir = fixture_dir
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.http = {}
+        self.imap = []
+        self.imap_queues = defaultdict(list)
+        self.imap_by_method = defaultdict(list)
+        if mode == "replay":
+            with open(os.path.join(fixture_dir, "http.json"), "r", encoding="utf-8") as f:
+                self.http = json.load(f)
+            imap_file = os.path.join(fixture_dir, "imap.json")
+            if os.path.exists(imap_file):
+                with open(imap_file, "r", encoding="utf-8") as f:
+                    self.imap = json.load(f)
+            for entry in self.imap:
+                self.imap_queues[entry["key"]].append(entry)
+                self.imap_by_method[entry["method"]].append(entry)
+
+    def wait(self, entry):
+        if self.latency:
+            time.sleep(entry.get("elapsed", 0) * self.latency)
+
+    def record_http(self, key, response, elapsed):
+        with self.lock:
+            self.http[key] = {"status": response.status_code, "reason": response.reason, "headers": dict(response.headers),
+                              "body": base64.b64encode(response.content).decode("ascii"), "elapsed": elapsed}
+
+    def record_imap(self, method, args, result, error, elapsed):
+        with self.lock:
+            self.imap.append({"key": imap_call_key(method, args), "method": method, "result": _pack(result),
+                              "error": error, "elapsed": elapsed})
+
+    def replay_imap(self, method, args):
+        """Nächste passende Aufnahme: erst exakt nach Befehl+Argumenten, sonst nach Befehl."""
+        key = imap_call_key(method, args)
+        with self.lock:
+            queue = self.imap_queues.get(key) or self.imap_by_method.get(method)
+            if not queue:
+                raise LookupError(f"Keine IMAP-Aufnahme für {key}")
+            entry = queue.pop(0) if len(queue) > 1 else queue[0]
+        self.wait(entry)
+        return entry
+
+    def save(self):
+        os.makedirs(self.dir, exist_ok=True)
+        for name, data in (("http.json", self.http), ("imap.json", self.imap)):
+            path = os.path.join(self.dir, name)
+            with open(path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(path + ".tmp", path)
+        log.info("🎞️ Aufgenommen: %d HTTP-Antworten, %d IMAP-Befehle → %s", len(self.http), len(self.imap), self.dir)
+
+def use_fixtures(session):
+    """Aktiviert (oder mit None beendet) Aufnahme/Wiedergabe für alle folgenden HTTP- und IMAP-Zugriffe."""
+    global _fixtures, _http_session, _fetch_policy
+    _fixtures = session
+    with _http_session_lock:
+        _http_session = None  # neue Session mit passendem Adapter
+        _fetch_policy = None
+
+class FixtureHTTPAdapter:
+    """Transport-Adapter für requests: zeichnet Antworten auf bzw. beantwortet Anfragen aus den Fixtures."""
+
+    def __init__(self, session, inner=None):
+        self.session = session
+        self.inner = inner
+
+    def send(self, request, **kwargs):
+        import requests
+        key = f"{request.method} {request.url}"
+        if self.session.mode == "record":
+            start = time.monotonic()
+            response = self.inner.send(request, **kwargs)
+            response.content  # Body vollständig lesen, damit er gespeichert werden kann
+            self.session.record_http(key, response, time.monotonic() - start)
+            return response
+        entry = self.session.http.get(key)
+        if entry is None:
+            raise requests.ConnectionError(f"Keine HTTP-Aufnahme für {key}")
+        self.session.wait(entry)
+        response = requests.models.Response()
+        response.status_code = entry["status"]
+        response.reason = entry.get("reason")
+        response.headers = requests.structures.CaseInsensitiveDict(entry["headers"])
+        response._content = base64.b64decode(entry["body"])
+        response._content_consumed = True
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        if self.inner:
+            self.inner.close()
+
+class RecordingIMAP:
+    """Reicht alle Befehle an die echte IMAP-Verbindung durch und zeichnet Antworten samt Dauer auf."""
+
+    def __init__(self, session, inner):
+        self._session = session
+        self._inner = inner
+
+    def __getattr__(self, name):
+        attr = getattr(self._inner, name)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            start = time.monotonic()
             try:
-                search_query = f'(FROM "{sender_email}" SINCE {since_date})'
-                print(f"Debug - Vollständige Suchabfrage: {search_query}")
-                typ, data = imap.search(None, search_query)
-                if typ != "OK":
-                    print(f"Debug - IMAP-Suchfehler für {sender_name} ({sender_email}): {data}")
-                    posts.append((sender_name, f"❌ Fehler beim Suchen nach Mails von {sender_name} ({sender_email}).", "#", "", sender_order, None))
-                    continue
-                email_ids = data[0].split()[-max_results_per_sender:]
-                print(f"Debug - Gefundene Mail-IDs für {sender_name}: {email_ids}")
-                if not email_ids:
-                    posts.append((sender_name, f"📭 Keine Mails von {sender_name} in den letzten 7 Tagen gefunden.", "#", "", sender_order, None))
-                    continue
-                sender_posts = []
-                for eid in email_ids:
-                    try:
-                        typ, msg_data = imap.fetch(eid, "(RFC822)")
-                        if typ != "OK":
-                            sender_posts.append((sender_name, f"❌ Fehler beim Abrufen der Mail {eid} von {sender_name}.", "#", "", sender_order, None))
-                            continue
-                        msg = email.message_from_bytes(msg_data[0][1])
-                        date_str = msg["Date"]
-                        mail_date = None
-                        if date_str:
-                            try:
-                                mail_date = parsedate_to_datetime(date_str)
-                                print(f"Debug - Datum für Mail {eid} von {sender_name}: {mail_date}")
-                            except (TypeError, ValueError) as e:
-                                print(f"Debug - Ungültiges Datum in Mail {eid} von {sender_name}: {date_str}, Fehler: {str(e)}")
-                        else:
-                            print(f"Debug - Kein Datum in Mail {eid} von {sender_name}")
-                        html = None
-                        if msg.is_multipart():
-                            for part in msg.walk():
-                                if part.get_content_type() == "text/html":
-                                    html = part.get_payload(decode=True).decode(errors="ignore")
-                                    break
-                        elif msg.get_content_type() == "text/html":
-                            html = msg.get_payload(decode=True).decode(errors="ignore")
-                        if not html:
-                            sender_posts.append((sender_name, f"❌ Kein HTML-Inhalt in der Mail {eid} von {sender_name}.", "#", "", sender_order, mail_date))
-                            continue
-                        soup = BeautifulSoup(html, "lxml")
-                        title_tag = (soup.find("h1") or 
-                                    soup.find("h2") or 
-                                    soup.find("h3") or 
-                                    soup.find("p", class_=lambda x: x and "title" in x.lower()) or
-                                    soup.find("div", class_=lambda x: x and "title" in x.lower()) or
-                                    soup.find("span", class_=lambda x: x and "title" in x.lower()))
-                        if not title_tag:
-                            link_tag = soup.find("a", href=lambda x: x and "/post/" in x)
-                            if link_tag and link_tag.text.strip():
-                                title = link_tag.text.strip()
-                            else:
-                                title = msg["Subject"].strip() if msg["Subject"] else "Unbenannter Beitrag"
-                        else:
-                            title = title_tag.text.strip()
-                        print(f"Debug - Titel für {sender_name}: {title}")
-                        link_tag = soup.find("a", href=lambda x: x and ("app-link/post" in x or "/post/" in x))
-                        if not link_tag:
-                            link_tag = soup.find("a", href=lambda x: x and "https://" in x)
-                        link = link_tag["href"].strip() if link_tag else "#"
-                        teaser = ""
-                        if title_tag or link_tag:
-                            start_tag = title_tag or link_tag
-                            content_candidates = start_tag.find_all_next(string=True)
-                            found_title = False
-                            teaser_parts = []
-                            for text in content_candidates:
-                                stripped = text.strip()
-                                if not found_title and stripped and (stripped in title or stripped in link):
-                                    found_title = True
-                                    continue
-                                if (found_title and 30 < len(stripped) < 500 and 
-                                    "dear reader" not in stripped.lower() and 
-                                    "subscribe" not in stripped.lower() and 
-                                    "view in browser" not in stripped.lower()):
-                                    teaser_parts.append(stripped)
-                                    if len(" ".join(teaser_parts)) > 100:
-                                        break
-                            teaser = " ".join(teaser_parts).strip()[:300]
-                        print(f"Debug - Teaser für {sender_name}: {teaser}")
-                        sender_posts.append((sender_name, title, link, teaser, sender_order, mail_date))
-                    except Exception as e:
-                        sender_posts.append((sender_name, f"❌ Fehler bei Mail {eid} von {sender_name}: {str(e)}", "#", "", sender_order, None))
-                sender_posts.sort(key=lambda x: x[5] or datetime(1970, 1, 1), reverse=True)
-                posts.extend(sender_posts)
+                result = attr(*args, **kwargs)
             except Exception as e:
-                posts.append((sender_name, f"❌ Fehler bei der Verarbeitung von {sender_name} ({sender_email}): {str(e)}", "#", "", sender_order, None))
-        imap.logout()
-    except Exception as e:
-        posts.append(("Allgemein", f"❌ Fehler beim Verbinden mit Gmail: {str(e)}", "#", "", 999, None))
-    
-    return posts if posts else [("Allgemein", "Keine neuen Substack-Mails gefunden.", "#", "", 999, None)]
+                self._session.record_imap(name, args, None, str(e), time.monotonic() - start)
+                raise
+            self._session.record_imap(name, args, result, None, time.monotonic() - start)
+            return result
+        return call
 
-# === Test Substack-E-Mail-Zugriff ===
-def test_substack_email_access(folder="[Gmail]/Alle Nachrichten"):
-    """Testet, ob Substack-Mails in der Gmail-Posteingang ausgelesen werden können."""
-    print("🔍 Teste Substack-E-Mail-Zugriff...")
-    
-    substack_mail = os.getenv("SUBSTACK_MAIL")
-    if not substack_mail:
-        return "❌ Fehler: SUBSTACK_MAIL Umgebungsvariable nicht gefunden!"
-    try:
-        mail_config = dict(pair.split("=", 1) for pair in substack_mail.split(";"))
-        email_user = mail_config.get("GMAIL_USER")
-        email_password = mail_config.get("GMAIL_PASS")
-        if not email_user or not email_password:
-            return f"❌ Fehler: GMAIL_USER oder GMAIL_PASS fehlen in SUBSTACK_MAIL: {mail_config}"
-    except ValueError as e:
-        return f"❌ Fehler beim Parsen von SUBSTACK_MAIL: {str(e)}"
-    
-    try:
-        with open("substacks.json", "r") as f:
-            substack_senders = json.load(f)
-    except FileNotFoundError:
-        return "❌ Fehler: substacks.json nicht gefunden!"
-    except json.JSONDecodeError:
-        return "❌ Fehler: substacks.json ungültig!"
-    
-    try:
-        imap = imaplib.IMAP4_SSL("imap.gmail.com")
-        imap.login(email_user, email_password)
-        print(f"✅ Gmail-Login erfolgreich für {email_user}")
-        
-        folders = [folder, "INBOX", "[Gmail]/Updates"]
-        results = []
-        for f in folders:
+class ReplayIMAP:
+    """Spielt aufgezeichnete IMAP-Antworten ab – gleiche Schnittstelle wie imaplib.IMAP4_SSL."""
+
+    def __init__(self, session):
+        self._session = session
+
+    def __getattr__(self, name):
+        def call(*args, **kwargs):
+            import imaplib
+            entry = self._session.replay_imap(name, args)
+            if entry["error"] is not None:
+                raise imaplib.IMAP4.error(entry["error"])
+            return _unpack(entry["result"])
+        return call
+
+IMAP_TIMEOUT = 30  # Sekunden je blockierendem Socket-Aufruf (Verbinden, Login, SEARCH, FETCH …)
+
+def imap_connect(host="imap.gmail.com", timeout=IMAP_TIMEOUT):
+    """Öffnet eine IMAP-SSL-Verbindung – bzw. deren Aufnahme/Wiedergabe, wenn Fixtures aktiv sind.
+
+    Der Timeout gilt für den Verbindungsaufbau und bleibt danach am Socket: kein Aufruf hängt länger.
+    """
+    import imaplib
+    if _fixtures is None:
+        return imaplib.IMAP4_SSL(host, timeout=timeout)
+    if _fixtures.mode == "replay":
+        return ReplayIMAP(_fixtures)
+    return RecordingIMAP(_fixtures, imaplib.IMAP4_SSL(host, timeout=timeout))
+
+# === 🌐 Gemeinsame HTTP-Session (Keep-Alive, Connection-Pool) ===
+HTTP_HEADERS = {"User-Agent": "Mozilla/5.0"}
+HTTP_POOL_SIZE = 16
+_http_session = None
+_http_session_lock = threading.Lock()
+
+def get_http_session():
+    """Liefert die gemeinsame requests.Session, damit TCP/TLS-Verbindungen wiederverwendet werden."""
+    global _http_session
+    with _http_session_lock:
+        if _http_session is None:
+            import requests
+            import requests.adapters
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+            if _fixtures is not None:
+                adapter = FixtureHTTPAdapter(_fixtures, adapter)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers.update(HTTP_HEADERS)
+            _http_session = session
+        return _http_session
+
+# === 🛡️ Abruf-Richtlinie: Timeouts je Host, Wiederholungen, Circuit Breaker ===
+HOST_TIMEOUTS = {  # (Verbindungsaufbau, Lesen) in Sekunden
+    "query1.finance.yahoo.com": (4, 8),
+    "news.google.com": (4, 12),
+    "www.stats.gov.cn": (6, 12),
+}
+DEFAULT_HOST_TIMEOUT = (5, 15)
+FETCH_RETRIES = 2  # weitere Versuche nach dem ersten
+FETCH_BACKOFF = 0.5  # Sekunden; Obergrenze der zufälligen Wartezeit, verdoppelt sich je Versuch
+FETCH_CALL_BUDGET = 25  # Sekunden je Abruf inkl. aller Versuche – auch bei tröpfelnden Antworten
+RETRY_STATUS = {429, 500, 502, 503, 504}
+BREAKER_THRESHOLD = 3  # Fehlschläge in Folge, ab denen ein Host übersprungen wird
+BREAKER_COOLDOWN = 120  # Sekunden bis zum nächsten Probe-Versuch
+
+class CircuitOpenError(Exception):
+    """Host ist nach wiederholten Fehlschlägen vorübergehend gesperrt."""
+
+class FetchPolicy:
+    """Gemeinsame Regeln für alle HTTP-Abrufe.
+
+    Timeouts je Host, begrenzte Wiederholungen mit zufälliger Wartezeit (Jitter) und eine harte
+    Obergrenze je Abruf. Hosts, die mehrfach hintereinander versagt haben, werden bis zum Ablauf der
+    Sperrzeit gar nicht mehr angefragt (Circuit Breaker) – die Aufrufer greifen dann auf den letzten
+    guten Stand zurück.
+    """
+
+    def __init__(self, retries=FETCH_RETRIES, backoff=FETCH_BACKOFF, budget=FETCH_CALL_BUDGET):
+        self.retries = retries
+        self.backoff = backoff
+        self.budget = budget
+        self.lock = threading.Lock()
+        self.failures = defaultdict(int)  # Host -> Fehlschläge in Folge
+        self.open_until = {}  # Host -> Zeitpunkt (monotonic), bis zu dem er übersprungen wird
+
+    def get(self, url, params=None, headers=None, max_bytes=None):
+        """Wie session.get(); liefert die Response (auch 4xx/5xx) oder wirft die letzte Ausnahme.
+
+        max_bytes: längere Antworten werden nach so vielen (entpackten) Bytes abgeschnitten statt ganz geladen.
+        """
+        return self._request(url, params, headers, max_bytes, read=True)[0]
+
+    def open(self, url, params=None, headers=None, max_bytes=None):
+        """Wie get(), liest den Body aber nicht: liefert (Response, Body-Stücke als Generator).
+
+        Der Generator hält dieselbe Obergrenze und dasselbe Zeitbudget ein wie get(); wer ihn nicht zu Ende liest,
+        schließt ihn (close()) – das beendet den Download.
+        """
+        response, deadline_at = self._request(url, params, headers, max_bytes, read=False)
+        return response, self.iter_body(response, deadline_at, max_bytes)
+
+    def _request(self, url, params, headers, max_bytes, read):
+        import requests
+        host = urlparse(url).hostname
+        with self.lock:
+            if time.monotonic() < self.open_until.get(host, 0):
+                raise CircuitOpenError(f"{host} nach {self.failures[host]} Fehlschlägen vorübergehend übersprungen")
+        connect, read_timeout = HOST_TIMEOUTS.get(host, DEFAULT_HOST_TIMEOUT)
+        deadline_at = time.monotonic() + self.budget
+        for attempt in range(self.retries + 1):
+            remaining = max(0.1, deadline_at - time.monotonic())
+            error = response = None
             try:
-                imap.select(f)
-                print(f"Debug - Ausgewählter Ordner: {f}")
-                typ, data = imap.search(None, 'ALL')
-                total_mails = len(data[0].split())
-                print(f"Debug - Anzahl Mails im Ordner {f}: {total_mails}")
-                
-                for sender in substack_senders:
-                    sender_email = sender.get("email")
-                    sender_name = sender.get("name")
-                    if not sender_email:
-                        results.append(f"⚠️ {sender_name}: Keine E-Mail-Adresse angegeben.")
-                        continue
-                    search_query = f'(FROM "{sender_email}")'
-                    print(f"Debug - Suche nach: {search_query}")
-                    typ, data = imap.search(None, search_query)
-                    if typ != "OK":
-                        results.append(f"❌ {sender_name} ({sender_email}): IMAP-Suchfehler: {data}")
-                        continue
-                    mail_ids = data[0].split()
-                    results.append(f"📬 {sender_name} ({sender_email}): {len(mail_ids)} Mails gefunden in {f}")
-            except Exception as e:
-                results.append(f"❌ Fehler bei Ordner {f}: {str(e)}")
-        imap.logout()
-        return "\n".join(results) if results else "❌ Keine Ergebnisse."
-    except Exception as e:
-        return f"❌ Fehler beim Gmail-Zugriff: {str(e)}"
+                response = get_http_session().get(url, params=params, headers=headers, stream=True,
+                                                  timeout=(min(connect, remaining), min(read_timeout, remaining)))
+                if read or response.status_code in RETRY_STATUS:
+                    self._read_body(response, deadline_at, max_bytes)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+            if error is None and response.status_code not in RETRY_STATUS:
+                self._record(host, ok=True)
+                return response, deadline_at
+            delay = random.uniform(0, self.backoff * 2 ** attempt)
+            if attempt == self.retries or time.monotonic() + delay >= deadline_at:
+                break
+            log.debug("Abruf %s fehlgeschlagen (%s), Versuch %d in %.2f s", url,
+                      error or response.status_code, attempt + 2, delay)
+            time.sleep(delay)
+        self._record(host, ok=False)
+        if error is not None:
+            raise error
+        return response, deadline_at
 
-# === NBS-Daten abrufen ===
-def fetch_latest_nbs_data():
-    url = "http://www.stats.gov.cn/english/PressRelease/rss.xml"
-    headers = {"User-Agent": "Mozilla/5.0"}
-    try:
-        r = requests.get(url, headers=headers, timeout=10)
-        r.raise_for_status()
-        soup = BeautifulSoup(r.text, "html.parser")
-        items = []
-        for li in soup.select("ul.list_009 li")[:5]:
-            a = li.find("a")
-            if a and a.text:
-                title = a.text.strip()
-                link = "https://www.stats.gov.cn" + a["href"]
-                items.append(f"• {title} ({link})")
-        return items or ["Keine aktuellen Veröffentlichungen gefunden."]
-    except Exception as e:
-        return [f"❌ Fehler beim Abrufen der NBS-Daten: {e}"]
+    @staticmethod
+    def iter_body(response, deadline_at, max_bytes=None):
+        """Body-Stücke einer Stream-Response; nach max_bytes abgeschnitten, nach der Deadline requests.Timeout."""
+        # Der Lese-Timeout gilt nur je Paket; die Obergrenze des ganzen Abrufs prüfen wir selbst
+        import requests
+        size, finished = 0, False
+        try:
+            for chunk in response.iter_content(64 * 1024):
+                size += len(chunk)
+                if max_bytes is not None and size > max_bytes:
+                    # Rest gar nicht erst herunterladen; die Verbindung geht dabei verloren, nicht aber der Pool
+                    log.info("✂️ %s nach %d KB abgeschnitten", response.url, max_bytes // 1024)
+                    yield chunk[:len(chunk) - (size - max_bytes)]
+                    return
+                if time.monotonic() > deadline_at:
+                    raise requests.Timeout(f"Antwort von {response.url} nicht innerhalb des Zeitbudgets vollständig")
+                yield chunk
+            finished = True
+        finally:
+            if not finished:
+                response.close()
 
-# === Börsendaten & Wechselkurse abrufen ===
-def fetch_index_data():
-    indices = {
-        "Hang Seng Index (HSI)": "^HSI",
-        "Hang Seng China Enterprises (HSCEI)": "^HSCE",
-        "SSE Composite Index (Shanghai)": "000001.SS",
-        "Shenzhen Component Index": "399001.SZ"
-    }
-    headers = {"User-Agent": "Mozilla/5.0"}
-    results = []
-    for name, symbol in indices.items():
-        url = f"https://query1.finance.yahoo.com/v8/finance/chart/{symbol}?interval=1d&range=2d"
+    @classmethod
+    def _read_body(cls, response, deadline_at, max_bytes=None):
+        response._content = b"".join(cls.iter_body(response, deadline_at, max_bytes))
+        response._content_consumed = True
+
+    def _record(self, host, ok):
+        with self.lock:
+            if ok:
+                self.failures.pop(host, None)
+                self.open_until.pop(host, None)
+                return
+            self.failures[host] += 1
+            if self.failures[host] >= BREAKER_THRESHOLD:
+                already_open = time.monotonic() < self.open_until.get(host, 0)
+                self.open_until[host] = time.monotonic() + BREAKER_COOLDOWN
+                if not already_open:
+                    log.warning("⚡ %s %d-mal in Folge fehlgeschlagen – für %d s übersprungen.",
+                                host, self.failures[host], BREAKER_COOLDOWN)
+
+_fetch_policy = None
+
+def get_fetch_policy():
+    """Liefert die gemeinsame FetchPolicy (Wiedergabe aus Fixtures: ohne Wiederholungen)."""
+    global _fetch_policy
+    with _http_session_lock:
+        if _fetch_policy is None:
+            replay = _fixtures is not None and _fixtures.mode == "replay"
+            _fetch_policy = FetchPolicy(retries=0 if replay else FETCH_RETRIES)
+        return _fetch_policy
+
+# === 💾 Feed-Cache auf der Platte (ETag/Last-Modified, TTL, LRU) ===
+FEED_CACHE_DIR = os.path.join(BASE_DIR, "feed_cache")
+FEED_CACHE_MAX_BYTES = 20 * 1024 * 1024
+DEFAULT_FEED_TTL = 15 * 60
+# Innerhalb der TTL wird ein Feed ohne Netzwerkzugriff aus dem Cache gelesen
+FEED_TTLS = {url: 6 * 3600 for url in feeds_thinktanks.values()}
+
+class FeedCache:
+    """Speichert Feed-Inhalte samt ETag/Last-Modified und fragt danach nur noch bedingt (304) an."""
+
+    def __init__(self, directory=FEED_CACHE_DIR, max_bytes=FEED_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.index_file = os.path.join(directory, "index.json")
+        self.lock = threading.Lock()
+        self.index = {}
         try:
-            r = requests.get(url, headers=headers, timeout=10)
-            r.raise_for_status()
-            data = r.json()
-            closes = data["chart"]["result"][0]["indicators"]["quote"][0]["close"]
-            if len(closes) < 2 or not all(closes[-2:]):
-                results.append(f"❌ {name}: Keine gültigen Kursdaten verfügbar.")
-                continue
-            prev_close = closes[-2]
-            last_close = closes[-1]
-            change = last_close - prev_close
-            pct = (change / prev_close) * 100
-            arrow = "→" if abs(pct) < 0.01 else "↑" if change > 0 else "↓"
-            results.append(f"• {name}: {round(last_close,2)} {arrow} ({pct:+.2f} %)")
+            with open(self.index_file, "r", encoding="utf-8") as f:
+                self.index = json.load(f)
+        except FileNotFoundError:
+            pass
         except Exception as e:
-            results.append(f"❌ {name}: Fehler beim Abrufen ({e})")
-    return results
+            log.warning("Warnung: Feed-Cache %s unlesbar, starte leer: %s", self.index_file, e)
 
-def fetch_currency_data():
-    currencies = {
-        "USDCNY": "USDCNY=X",
-        "USDCNH": "USDCNH=X",
-        "HKDUSD": "HKDUSD=X",
-    }
-    headers = {"User-Agent": "Mozilla/5.0"}
-    results = {}
-    for name, symbol in currencies.items():
-        url = f"https://query1.finance.yahoo.com/v8/finance/chart/{symbol}?interval=1d&range=2d"
+    def _body_path(self, url):
+        return os.path.join(self.directory, hashlib.sha1(url.encode("utf-8")).hexdigest() + ".xml")
+
+    def _iter_body(self, path):
+        """Die gespeicherte Datei in FEED_PARSE_CHUNK-Stücken (geöffnet wird sie schon beim Aufruf)."""
+        f = open(path, "rb")
+
+        def chunks():
+            with f:
+                while chunk := f.read(FEED_PARSE_CHUNK):
+                    yield chunk
+        return chunks()
+
+    def open(self, url, ttl=None):
+        """Liefert (Body-Stücke, Status); Status ist "cache", "304", "200" oder "stale".
+
+        "stale": Die Quelle ist nicht erreichbar, geliefert wird der letzte gute Stand aus dem Cache.
+        Nichts davon liegt ganz im Speicher: gespeicherte Feeds werden stückweise gelesen, neue beim Lesen
+        mitgeschrieben (siehe _download).
+        """
+        ttl = FEED_TTLS.get(url, DEFAULT_FEED_TTL) if ttl is None else ttl
+        now = time.time()
+        with self.lock:
+            entry = dict(self.index.get(url, {}))
+        path = self._body_path(url)
+        cached = bool(entry) and os.path.exists(path)
+        if cached and now - entry.get("fetched", 0) < ttl:
+            self._store(url, entry, accessed=now)
+            return self._iter_body(path), "cache"
+        headers = {}
+        if cached:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
         try:
-            r = requests.get(url, headers=headers, timeout=10)
-            r.raise_for_status()
-            data = r.json()
-            if not data.get("chart") or not data["chart"].get("result"):
-                results[name] = f"❌ {name}: Keine Daten in der API-Antwort."
-                continue
-            result = data["chart"]["result"][0]
-            closes = result["indicators"]["quote"][0]["close"]
-            prev_close = result.get("meta", {}).get("chartPreviousClose")
-            if not closes or len(closes) == 0 or prev_close is None:
-                results[name] = f"❌ {name}: Keine gültigen Kursdaten verfügbar (closes={closes}, prev_close={prev_close})."
-                continue
-            last_close = closes[-1]
-            if len(closes) == 1:
-                change = last_close - prev_close
-                pct = (change / prev_close) * 100 if prev_close != 0 else 0
-            else:
-                prev_close = closes[-2]
-                change = last_close - prev_close
-                pct = (change / prev_close) * 100 if prev_close != 0 else 0
-            arrow = "→" if abs(pct) < 0.01 else "↑" if change > 0 else "↓"
-            results[name] = (last_close, arrow, pct)
+            r, chunks = get_fetch_policy().open(url, headers=headers, max_bytes=FEED_MAX_BYTES)
+            if r.status_code == 304 and cached:
+                chunks.close()
+                entry["fetched"] = now
+                self._store(url, entry, accessed=now)
+                return self._iter_body(path), "304"
+            try:
+                r.raise_for_status()
+            except Exception:
+                chunks.close()
+                raise
         except Exception as e:
-            results[name] = f"❌ {name}: Unerwarteter Fehler ({str(e)})"
-    return results
+            if not cached:
+                raise
+            age = (now - entry.get("fetched", now)) / 3600
+            log.warning("⚠️ %s nicht erreichbar (%s) – nutze Stand von vor %.1f h.", url, e, age)
+            self._store(url, entry, accessed=now)
+            return self._iter_body(path), "stale"
+        return self._download(url, r, chunks, now), "200"
 
-# === Stimmen von X ===
-x_accounts = [
-    {"account": "Sino_Market", "name": "CN Wire", "url": "https://x.com/Sino_Market"},
-    {"account": "tonychinaupdate", "name": "China Update", "url": "https://x.com/tonychinaupdate"},
-    {"account": "YuanTalks", "name": "YUAN TALKS", "url": "https://x.com/YuanTalks"},
-    {"account": "Brad_Setser", "name": "Brad Setser", "url": "https://x.com/Brad_Setser"},
-    {"account": "KennedyCSIS", "name": "Scott Kennedy", "url": "https://x.com/KennedyCSIS"},
-]
+    def _download(self, url, response, chunks, fetched):
+        """Reicht die Stücke durch und schreibt sie dabei in die Cache-Datei.
 
-def fetch_recent_x_posts(account, name, url):
-    return [f"• {name} (@{account}) → {url}"]
+        Nur ein zu Ende gelesener Body ersetzt den Eintrag. Hört der Leser vorher auf, endet auch der Download, und
+        der Cache bleibt, wie er war (der alte Body passt weiter zu seinem ETag). Ein bei FEED_MAX_BYTES
+        abgeschnittener Body wird ohne ETag/Last-Modified gespeichert – ein 304 darf ihn nie als ganzen Feed ausgeben.
+        """
+        path = self._body_path(url)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        os.makedirs(self.directory, exist_ok=True)
+        size, complete = 0, False
+        try:
+            with open(tmp, "wb") as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    size += len(chunk)
+                    yield chunk
+            complete = True
+        finally:
+            if complete:
+                os.replace(tmp, path)
+                truncated = size >= FEED_MAX_BYTES
+                if truncated:
+                    log.warning("⚠️ Feed %s bei %d Bytes abgeschnitten – gespeichert ohne ETag.", url, size)
+                self._store(url, {"etag": None if truncated else response.headers.get("ETag"),
+                                  "last_modified": None if truncated else response.headers.get("Last-Modified"),
+                                  "fetched": fetched, "size": size}, accessed=fetched)
+            else:
+                chunks.close()
+                try:
+                    os.remove(tmp)
+                except OSError:
+                    pass
 
-# === Render Substack Posts ===
-def render_markdown(posts):
-    """Rendert Substack-Posts in Markdown-Format für das Briefing."""
-    rendered = []
-    current_sender = None
-    for sender_name, title, link, teaser, sender_order, mail_date in sorted(posts, key=lambda x: (x[4], x[5] or datetime(1970, 1, 1)), reverse=True):
-        if sender_name != current_sender:
-            if current_sender is not None:
-                rendered.append("")  # Leere Zeile zwischen Absendern
-            rendered.append(f"### {sender_name}")
-            current_sender = sender_name
-        if "❌" in title:
-            rendered.append(f"• {title}")
-        else:
-            date_str = mail_date.strftime("%d.%m.%Y") if mail_date else "Datum unbekannt"
-            rendered.append(f"• [{title}]({link}) ({date_str})")
-            if teaser:
-                rendered.append(f"  {teaser}")
-    return rendered
+    def _store(self, url, entry, accessed):
+        with self.lock:
+            entry["accessed"] = accessed
+            self.index[url] = entry
+            self._evict()
+            self._save()
 
-# === Briefing generieren ===
-def generate_briefing():
-    date_str = datetime.now().strftime("%d. %B %Y")
-    briefing = [f"Guten Morgen, Hado!\n\n🗓️ {date_str}\n\n📬 Dies ist dein tägliches China-Briefing.\n"]
+    def _evict(self):
+        # Am längsten nicht genutzte Einträge entfernen, bis die Obergrenze eingehalten ist
+        total = sum(e.get("size", 0) for e in self.index.values())
+        for url, entry in sorted(self.index.items(), key=lambda x: x[1].get("accessed", 0)):
+            if total <= self.max_bytes:
+                break
+            total -= entry.get("size", 0)
+            del self.index[url]
+            try:
+                os.remove(self._body_path(url))
+            except OSError:
+                pass
 
-    # Börsenindizes
-    briefing.append("\n## 📊 Börsenindizes China (08:00 Uhr MESZ)")
-    if is_weekend_day or is_holiday_china:
-        briefing.append("📈 Heute kein Handelstag an den chinesischen Börsen.")
-    else:
-        briefing.extend(fetch_index_data())
-    if is_weekend_day or is_holiday_hk:
-        briefing.append("📈 Heute kein Handelstag an der Börse Hongkong.")
-
-    # Wechselkurse
-    briefing.append("\n## 💱 Wechselkurse (08:00 Uhr MESZ)")
-    if is_weekend_day or is_holiday_china or is_holiday_hk:
-        briefing.append("📉 Heute keine aktuellen Wechselkurse.")
-    else:
-        currency_data = fetch_currency_data()
-        if isinstance(currency_data.get("HKDUSD"), tuple):
-            val, arrow, pct = currency_data["HKDUSD"]
-            val_inv = 1 / val
-            pct_inv = -pct
-            arrow_inv = "→" if abs(pct_inv) < 0.01 else "↑" if pct_inv > 0 else "↓"
-            briefing.append(f"• CPR (HKD/USD): {val_inv:.4f} {arrow_inv} ({pct_inv:+.2f} %)")
-        else:
-            briefing.append(currency_data.get("HKDUSD"))
-        if isinstance(currency_data.get("USDCNY"), tuple):
-            val_cny, arrow_cny, pct_cny = currency_data["USDCNY"]
-            briefing.append(f"• USD/CNY (Onshore): {val_cny:.4f} {arrow_cny} ({pct_cny:+.2f} %)")
-        else:
-            briefing.append(currency_data.get("USDCNY"))
-        if isinstance(currency_data.get("USDCNH"), tuple):
-            val_cnh, arrow_cnh, pct_cnh = currency_data["USDCNH"]
-            briefing.append(f"• USD/CNH (Offshore): {val_cnh:.4f} {arrow_cnh} ({pct_cnh:+.2f} %)")
-        else:
-            briefing.append(currency_data.get("USDCNH"))
-        if isinstance(currency_data.get("USDCNY"), tuple) and isinstance(currency_data.get("USDCNH"), tuple):
-            val_cny = currency_data["USDCNY"][0]
-            val_cnh = currency_data["USDCNH"][0]
-            spread = val_cnh - val_cny
-            briefing.append(f"• Spread CNH–CNY: {spread:+.4f}")
-
-    # Top 5 China-Stories
-    briefing.append("\n## 🏆 Top 5 China-Stories laut Google News")
-    for source, url in feeds_topchina.items():
-        briefing.append(f"\n### {source}")
-        briefing.extend(fetch_news(url, max_items=30, top_n=5))
-
-    # NBS-Daten
-    briefing.append("\n## 📈 NBS – Nationale Statistikdaten")
-    briefing.extend(fetch_latest_nbs_data())
-
-    # X-Stimmen
-    briefing.append("\n## 📡 Stimmen & Perspektiven von X")
-    for acc in x_accounts:
-        briefing.extend(fetch_recent_x_posts(acc["account"], acc["name"], acc["url"]))
+    def _save(self):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp = self.index_file + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.index, f, indent=1)
+        os.replace(tmp, self.index_file)
 
-    # Google News nach Sprache/Quelle
-    briefing.append("\n## 🌍 Google News – Nach Sprache & Quelle sortiert")
-    all_articles = {
-        "EN": defaultdict(list),
-        "DE": defaultdict(list),
-        "FR": defaultdict(list),
-        "ASIA": defaultdict(list),
-        "OTHER": defaultdict(list)
-    }
-    for lang, url in feeds_google_news.items():
-        feed = feedparser.parse(url)
-        for entry in feed.entries:
-            title = entry.get("title", "").strip()
-            summary = entry.get("summary", "").strip()
-            link = entry.get("link", "").strip()
-            if not title or not link:
-                continue
-            score = score_article(title, summary)
-            if score <= 0:
-                continue
-            source = extract_source(title)
-            category = source_categories.get(source, lang if lang in ["EN", "DE", "FR"] else "OTHER")
-            if source in ["SCMP", "Nikkei Asia", "Yicai"]:
-                category = "ASIA"
-            clean_title = title
-            if f"– {source}" in title:
-                clean_title = title.split(f"– {source}")[0].strip()
-            elif f"- {source}" in title:
-                clean_title = title.split(f"- {source}")[0].strip()
-            if clean_title.lower().endswith(source.lower()):
-                clean_title = clean_title[:-(len(source))].strip("-:—– ").strip()
-            all_articles[category][source].append((score, f'• <a href="{link}">{clean_title}</a>'))
-    category_titles = {
-        "EN": "🇺🇸 Englischsprachige Medien",
-        "DE": "🇩🇪 Deutschsprachige Medien",
-        "FR": "🇫🇷 Französische Medien",
-        "ASIA": "🌏 Asiatische Medien",
-        "OTHER": "🧪 Sonstige Quellen"
-    }
-    for cat_key, sources in all_articles.items():
-        if not sources:
+# === 🧵 Feed-Parser: inkrementell, nur die benötigten Felder ===
+FEED_MAX_BYTES = 2 * 1024 * 1024  # größere Feeds werden beim Download abgeschnitten (der Parser verkraftet das)
+FEED_PARSE_CHUNK = 64 * 1024
+FEED_ROOTS = {"rss", "feed", "RDF"}  # RSS 2.0, Atom, RSS 1.0
+FEED_DATE_FIELDS = {"pubDate": "published_parsed", "published": "published_parsed", "issued": "published_parsed",
+                    "updated": "updated_parsed", "modified": "updated_parsed", "date": "updated_parsed"}
+
+def parse_feed_date(text):
+    """RFC 822 (RSS) oder ISO 8601 (Atom, Dublin Core) → time.struct_time in UTC wie bei feedparser, sonst None."""
+    text = (text or "").strip()
+    if not text:
+        return None
+    try:
+        parsed = parsedate_to_datetime(text)
+    except (TypeError, ValueError, IndexError):
+        try:
+            parsed = datetime.fromisoformat(text.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.utctimetuple()
+
+def feed_entry(item):
+    """Übernimmt aus einem <item>/<entry> nur Titel, Link, Zusammenfassung, Datum und Quelle."""
+    from lxml import etree
+    entry = {}
+    for child in item:
+        if not isinstance(child.tag, str):
             continue
-        briefing.append(f"\n## {category_titles.get(cat_key, cat_key)}")
-        for source_name, articles in sorted(sources.items()):
-            if not articles:
-                continue
-            briefing.append(f"\n### {source_name}")
-            top_articles = sorted(articles, reverse=True)[:5]
-            briefing.extend([a[1] for a in top_articles])
+        name = etree.QName(child).localname
+        text = (child.text or "").strip()
+        if name == "title" and "title" not in entry:
+            entry["title"] = "".join(child.itertext()).strip()
+        elif name == "link":
+            href = child.get("href")
+            if href is None:
+                entry.setdefault("link", text)
+            elif child.get("rel", "alternate") == "alternate":
+                entry.setdefault("link", href.strip())
+        elif name in ("description", "summary"):
+            entry.setdefault("summary", "".join(child.itertext()).strip())
+        elif name == "encoded" or (name == "content" and "summary" not in entry):
+            entry.setdefault("content", "".join(child.itertext()).strip())
+        elif name in FEED_DATE_FIELDS:
+            parsed = parse_feed_date(text)
+            if parsed is not None:
+                entry.setdefault(FEED_DATE_FIELDS[name], parsed)
+        elif name == "source":
+            title = text or child.findtext("{*}title", "").strip()
+            entry["source"] = {"title": title, "href": child.get("url", "")}
+    if "summary" not in entry and "content" in entry:
+        entry["summary"] = entry["content"]
+    entry.pop("content", None)
+    # Wie feedparser: ohne eigenes Änderungsdatum gilt das Veröffentlichungsdatum
+    if "updated_parsed" not in entry and "published_parsed" in entry:
+        entry["updated_parsed"] = entry["published_parsed"]
+    return entry
 
-    # SCMP
-    briefing.append("\n## SCMP – Top-Themen")
-    briefing.extend(fetch_ranked_articles(feeds_scmp_yicai["SCMP"]))
+def iter_feed_entries(chunks):
+    """Einträge eines RSS/Atom-Feeds, während die Body-Stücke eintreffen (lxml XMLPullParser).
 
-    # Yicai
-    briefing.append("\n## Yicai Global – Top-Themen")
-    briefing.extend(fetch_ranked_articles(feeds_scmp_yicai["Yicai Global"]))
+    Jeder fertige Eintrag wird sofort auf die benötigten Felder reduziert und aus dem Baum gelöscht; wer aufhört
+    zu lesen, lädt und parst nichts weiter. Ohne lxml oder bei etwas anderem als einem Feed übernimmt feedparser.
+    """
+    try:
+        from lxml import etree
+    except ImportError:
+        etree = None
+    chunks = iter(chunks)
+    if etree is not None:
+        head = []  # Stücke bis zum Wurzel-Element – für den Rückfall auf feedparser
 
-    # Substack-Abschnitt
-    briefing.append("\n## 📬 Aktuelle Substack-Artikel")
-    substack_mail = os.getenv("SUBSTACK_MAIL")
-    if not substack_mail:
-        briefing.append("❌ Fehler: SUBSTACK_MAIL Umgebungsvariable nicht gefunden!")
-    else:
+        def captured():
+            for chunk in chunks:
+                if head is not None:
+                    head.append(chunk)
+                yield chunk
+
+        root = None
+        for event, element in iter_feed_elements(etree, captured()):
+            if root is None:
+                root = etree.QName(element).localname
+                if root not in FEED_ROOTS:
+                    break
+                head = None
+            if event == "end" and etree.QName(element).localname in ("item", "entry"):
+                yield feed_entry(element)
+                # Fertige Einträge (und ihre Vorgänger) aus dem Baum löschen – im Speicher bleibt nur der aktuelle
+                element.clear()
+                while element.getprevious() is not None:
+                    del element.getparent()[0]
+        if root in FEED_ROOTS:
+            return
+        chunks = [*head, *chunks]
+    import feedparser
+    yield from feedparser.parse(b"".join(chunks)).entries
+
+class FeedStream:
+    """Ein Feed, der erst beim Lesen geladen und geparst wird – nur so weit, wie ihn jemand liest.
+
+    Mehrere Leser (Threads) teilen sich die schon geparsten Einträge: iter(feed) parst bei Bedarf weiter,
+    feed.entries liest bis zum Ende (höchstens FEED_MAX_BYTES). close() beendet einen offenen Download;
+    die bis dahin geparsten Einträge bleiben lesbar.
+    """
+
+    def __init__(self, url, chunks, on_close=None):
+        self.url = url
+        self.lock = threading.Lock()
+        self.size = 0  # gelesene Bytes
+        self.seconds = 0.0  # Zeit für Laden und Parsen
+        self.on_close = on_close
+        self._entries = []
+        self._chunks = chunks
+        self._source = iter_feed_entries(self._counted(chunks))
+
+    def _counted(self, chunks):
+        for chunk in chunks:
+            self.size += len(chunk)
+            yield chunk
+
+    def __iter__(self):
+        index = 0
+        while True:
+            with self.lock:
+                if index >= len(self._entries) and not self._pull():
+                    return
+                entry = self._entries[index]
+            index += 1
+            yield entry
+
+    def _pull(self):
+        """Parst den nächsten Eintrag; False am Ende. Bricht der Download ab, zählt das bis dahin Gelesene."""
+        if self._source is None:
+            return False
+        start = time.perf_counter()
         try:
-            mail_pairs = substack_mail.split(";")
-            mail_config = {}
-            for pair in mail_pairs:
-                if "=" in pair:
-                    key, value = pair.split("=", 1)
-                    mail_config[key] = value
-            if "GMAIL_USER" not in mail_config or "GMAIL_PASS" not in mail_config:
-                missing_keys = [k for k in ["GMAIL_USER", "GMAIL_PASS"] if k not in mail_config]
-                briefing.append(f"❌ Fehler: Fehlende Schlüssel in SUBSTACK_MAIL: {', '.join(missing_keys)}")
-            else:
-                email_user = mail_config["GMAIL_USER"]
-                email_password = mail_config["GMAIL_PASS"]
-                posts = fetch_substack_from_email(email_user, email_password)
-                briefing.extend(render_markdown(posts))
-        except ValueError as e:
-            briefing.append(f"❌ Fehler beim Parsen von SUBSTACK_MAIL: {str(e)}")
+            self._entries.append(next(self._source))
+            return True
+        except StopIteration:
+            self._finish()
+        except Exception as e:
+            self._finish()
+            if not self._entries:
+                raise
+            log.warning("⚠️ Feed %s nur teilweise gelesen (%d Einträge): %s", self.url, len(self._entries), e)
+        finally:
+            self.seconds += time.perf_counter() - start
+        return False
 
-    briefing.append("\nEinen erfolgreichen Tag! 🌟")
+    @property
+    def entries(self):
+        """Alle Einträge – parst den Feed dafür zu Ende."""
+        for _ in self:
+            pass
+        return self._entries
 
-    return f"""\
-<html>
-  <body style="background-color: white;">
-    <div style="background-color: white; padding: 20px;">
-      <pre style="font-family: system-ui, sans-serif">
-{chr(10).join(briefing)}
-      </pre>
-    </div>
-  </body>
-</html>"""
+    def read(self):
+        """Parst zu Ende und liefert den Feed selbst (z. B. um ihn über den Lauf hinaus aufzubewahren)."""
+        self.entries
+        return self
+
+    def close(self, blocking=True):
+        """Beendet Download und Parser. blocking=False überlässt einen gerade lesenden Thread sich selbst."""
+        if not self.lock.acquire(blocking):
+            return
+        try:
+            self._finish()
+        finally:
+            self.lock.release()
+
+    def _finish(self):
+        source, self._source = self._source, None
+        if source is None:
+            return
+        try:
+            self._chunks.close()
+            source.close()
+        except Exception as e:
+            log.warning("⚠️ Feed %s: Abschluss des Downloads fehlgeschlagen: %s", self.url, e)
+        # Ein aufbewahrter Feed (Daemon) soll weder Download noch FeedFetcher am Leben halten
+        on_close, self.on_close, self._chunks = self.on_close, None, None
+        if on_close:
+            on_close(self)
+
+def iter_feed_elements(etree, chunks):
+    """(Ereignis, Element) beim Einlesen der Body-Stücke (große in FEED_PARSE_CHUNK geteilt); kaputtes oder
+    abgeschnittenes XML endet einfach."""
+    parser = etree.XMLPullParser(events=("start", "end"), recover=True, resolve_entities=False, no_network=True)
+    try:
+        for chunk in chunks:
+            for offset in range(0, len(chunk), FEED_PARSE_CHUNK):
+                parser.feed(chunk[offset:offset + FEED_PARSE_CHUNK])
+                for event, element in parser.read_events():
+                    if isinstance(element.tag, str):
+                        yield event, element
+        parser.close()
+    except etree.XMLSyntaxError as e:
+        log.debug("Feed nicht vollständig lesbar: %s", e)
+        return
+    for event, element in parser.read_events():
+        if isinstance(element.tag, str):
+            yield event, element
+
+# === 📰 Feed-Abruf (pro Lauf einmal je URL) ===
+class FeedFetcher:
+    """Öffnet jeden Feed pro Lauf genau einmal; gleichzeitige Anfragen derselben URL teilen sich den FeedStream.
+
+    Geladen und geparst wird erst beim Lesen und nur so weit, wie die Leser Einträge brauchen. close() am Ende
+    des Laufs beendet, was noch offen ist.
+    """
+
+    def __init__(self, cache=None):
+        self.cache = cache
+        self.lock = threading.Lock()
+        self.feeds = {}  # URL -> Future mit dem FeedStream
+        self.readers = defaultdict(int)  # URL -> Zahl der Leser
+        self.fetches = 0
+        self.not_modified = 0
+        self.cache_hits = 0
+        self.stale = 0
+        self.shared = 0
+        self.bytes_fetched = 0
+        self.bytes_saved = 0
+
+    def get(self, url):
+        with self.lock:
+            self.readers[url] += 1
+            future = self.feeds.get(url)
+            is_owner = future is None
+            if is_owner:
+                future = Future()
+                self.feeds[url] = future
+        if not is_owner:
+            # Bereits geöffnet oder gerade in Arbeit: denselben Stream mitlesen
+            feed = future.result()
+            with self.lock:
+                self.shared += 1
+            return feed
+        try:
+            with measure("feed", url):
+                if self.cache:
+                    chunks, status = self.cache.open(url)
+                else:
+                    r, chunks = get_fetch_policy().open(url, max_bytes=FEED_MAX_BYTES)
+                    try:
+                        r.raise_for_status()
+                    except Exception:
+                        chunks.close()
+                        raise
+                    status = "200"
+            feed = FeedStream(url, chunks, on_close=lambda feed: self._closed(feed, status))
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        with self.lock:
+            if status == "200":
+                self.fetches += 1
+            elif status == "304":
+                self.not_modified += 1
+            elif status == "stale":
+                self.stale += 1
+            else:
+                self.cache_hits += 1
+        future.set_result(feed)
+        return feed
+
+    def _closed(self, feed, status):
+        """Bilanz eines fertig gelesenen (oder geschlossenen) Feeds für report() und den Laufbericht."""
+        with self.lock:
+            if status == "200":
+                self.bytes_fetched += feed.size
+            else:
+                self.bytes_saved += feed.size
+            self.bytes_saved += feed.size * (self.readers[feed.url] - 1)
+        record = StageRecord()
+        record.items = len(feed._entries)
+        record.bytes = feed.size
+        get_run_report().add("feed_parse", feed.url, feed.seconds, record)
+
+    def close(self):
+        """Schließt alle noch offenen Feeds (Downloads, Cache-Dateien); ihre Einträge bleiben lesbar.
+
+        Feeds, in denen gerade ein (z. B. nach der Deadline verwaister) Abruf liest, bleiben diesem überlassen.
+        """
+        with self.lock:
+            futures = list(self.feeds.values())
+        for future in futures:
+            if future.done() and future.exception() is None:
+                future.result().close(blocking=False)
+
+    def report(self):
+        log.info("📰 Feeds: %d geladen (%.1f KB), %d unverändert (304), %d aus dem Cache, %d veraltet (Quelle down), "
+                 "%d mehrfach genutzt – %.1f KB gespart",
+                 self.fetches, self.bytes_fetched / 1024, self.not_modified, self.cache_hits, self.stale, self.shared,
+                 self.bytes_saved / 1024)
+
+# === 🔁 Artikel-Duplikate über alle Abschnitte hinweg ===
+TRACKING_PARAMS = {"oc", "ref", "cmpid", "ocid", "guccounter", "fbclid", "gclid"}
+TITLE_STOPWORDS = {"the", "a", "an", "of", "in", "on", "to", "for", "and", "as", "at", "by", "with", "is",
+                   "der", "die", "das", "und", "in", "im", "mit", "von", "für", "le", "la", "les", "de", "des", "du", "et", "en"}
+TITLE_SIMILARITY = 0.9  # fast wortgleich; kurze Titel gelten nur bei gleicher Wortmenge als Dublette
+# Gleiche Satzschablone, andere Meldung: "CPI"/"PPI rises in June", "cuts"/"holds loan prime rate"
+TITLE_CONTRASTS = [
+    {"cpi", "ppi", "pmi"}, {"export", "import"}, {"cut", "hold", "raise", "hike", "keep", "lift"},
+    {"rise", "fall", "drop", "gain", "slide", "climb", "jump", "slump", "surge", "sink"}, {"up", "down"},
+    {"higher", "lower"}, {"beat", "miss"}, {"buy", "sell"},
+    {"steigt", "sinkt", "fällt"}, {"senkt", "erhöht", "hält"}, {"exporte", "importe"},
+    {"hausse", "baisse"}, {"hausse", "recul"}, {"baisse", "abaisse", "relève", "maintient"},
+]
+# Wort -> Nummern seiner Gegensatzgruppen
+TITLE_CONTRAST_GROUPS = {word: frozenset(i for i, group in enumerate(TITLE_CONTRASTS) if word in group)
+                         for group in TITLE_CONTRASTS for word in group}
+
+def unwrap_google_news(url):
+    """Ermittelt, wo möglich, die Original-URL hinter einem Google-News-Link (url=-Parameter oder base64-kodierte Artikel-ID)."""
+    parsed = urlparse(url)
+    if not parsed.netloc.endswith("news.google.com"):
+        return url
+    target = dict(parse_qsl(parsed.query)).get("url")
+    if target:
+        return target
+    m = re.search(r"/articles/([A-Za-z0-9_-]+)", parsed.path)
+    if m:
+        try:
+            raw = base64.urlsafe_b64decode(m.group(1) + "=" * (-len(m.group(1)) % 4))
+            found = re.search(rb"https?://[\x21-\x7e]+", raw)
+            if found:
+                return found.group(0).decode()
+        except ValueError:
+            pass
+    return url
+
+def normalize_url(url):
+    """Vereinheitlicht eine Artikel-URL: Redirect auflösen, www/Schema/Fragment/Tracking-Parameter entfernen."""
+    parsed = urlparse(unwrap_google_news(url.strip()))
+    host = parsed.netloc.lower().removeprefix("www.").removeprefix("amp.")
+    query = urlencode(sorted((k, v) for k, v in parse_qsl(parsed.query)
+                             if k.lower() not in TRACKING_PARAMS and not k.lower().startswith("utm_")))
+    path = parsed.path.rstrip("/").removesuffix("/amp")
+    return f"{host}{path}" + (f"?{query}" if query else "")
+
+SOURCE_SUFFIX_RE = re.compile(r"\s[-–—|]\s([^-–—|]{2,40})$")
+
+def title_fingerprint(title):
+    """Wortmenge eines Titels ohne Quellen-Suffix, Füllwörter und Plural-s – Grundlage für den Ähnlichkeitsvergleich."""
+    suffix = SOURCE_SUFFIX_RE.search(title)
+    if suffix and len(suffix.group(1).split()) <= 4:
+        title = title[:suffix.start()]
+    tokens = (t for t in WORD_RE.findall(title.lower()) if t not in TITLE_STOPWORDS)
+    return frozenset(t[:-1] if len(t) > 3 and t.endswith("s") else t for t in tokens)
+
+def titles_contrast(a, b, numbers_both=False):
+    """True, wenn sich zwei Titel-Wortmengen in einer Zahl oder in Gegensatzwörtern unterscheiden – andere Meldung.
+
+    Mit numbers_both zählt eine Zahl nur, wenn beide Seiten eine eigene haben (Übersetzungen lassen Zahlen weg).
+    """
+    only_a, only_b = a - b, b - a
+    numbered = [any(ch.isdigit() for token in side for ch in token) for side in (only_a, only_b)]
+    if all(numbered) if numbers_both else any(numbered):
+        return True
+    groups_a = frozenset().union(*(TITLE_CONTRAST_GROUPS.get(token, frozenset()) for token in only_a))
+    return any(groups_a & TITLE_CONTRAST_GROUPS.get(token, frozenset()) for token in only_b)
+
+class DedupIndex:
+    """Merkt sich pro Lauf alle ausgegebenen Artikel (normalisierte URL + Titel-Wortmenge) und erkennt Wiederholungen.
+
+    Titel zählen nur als Dublette, wenn sie fast wortgleich sind und sich nicht in Zahlen oder Gegensätzen
+    ("cuts"/"holds", "CPI"/"PPI") unterscheiden – lieber eine Wiederholung zu viel als eine verschluckte Meldung.
+    Mit Story-Clustern erscheint jede Geschichte nur einmal: der zuerst ausgegebene Artikel steht für sie und
+    verlinkt die übrigen Quellen (StoryClusters.related), alle weiteren gelten als Dublette.
+    """
+
+    def __init__(self, similarity=TITLE_SIMILARITY, clusters=None):
+        self.similarity = similarity
+        self.clusters = clusters  # StoryClusters oder None
+        self.stories = set()  # Cluster-Nr. bereits ausgegebener Geschichten
+        self.lock = threading.Lock()
+        self.urls = set()
+        self.fingerprints = []
+        self.by_token = defaultdict(list)  # Wort -> Indizes in self.fingerprints
+        self.duplicates = 0
+
+    def _similar_title_seen(self, fingerprint):
+        # Nur Titel mit gemeinsamen Wörtern kommen in Frage; Jaccard-Ähnlichkeit über die Wortmengen
+        overlaps = defaultdict(int)
+        for token in fingerprint:
+            for index in self.by_token.get(token, ()):
+                overlaps[index] += 1
+        for index, overlap in overlaps.items():
+            union = len(fingerprint) + len(self.fingerprints[index]) - overlap
+            if overlap / union >= self.similarity and not titles_contrast(fingerprint, self.fingerprints[index]):
+                return True
+        return False
+
+    def _story(self, url_key):
+        return self.clusters.cluster(url_key) if self.clusters and url_key else None
+
+    def _duplicate(self, url_key, fingerprint):
+        if url_key in self.urls or self._story(url_key) in self.stories:
+            return True
+        return len(fingerprint) >= 3 and self._similar_title_seen(fingerprint)
+
+    def seen(self, link, title):
+        """Nur prüfen, nicht registrieren: wurde der Artikel (fast) identisch schon ausgegeben?"""
+        url_key = normalize_url(link) if link else None
+        fingerprint = title_fingerprint(title)
+        with self.lock:
+            return self._duplicate(url_key, fingerprint)
+
+    def add(self, link, title):
+        """Registriert einen Artikel; liefert False, wenn er schon ausgegeben wurde."""
+        url_key = normalize_url(link) if link else None
+        fingerprint = title_fingerprint(title)
+        with self.lock:
+            if self._duplicate(url_key, fingerprint):
+                self.duplicates += 1
+                return False
+            if url_key:
+                self.urls.add(url_key)
+                story = self._story(url_key)
+                if story is not None:
+                    self.stories.add(story)
+            if fingerprint:
+                for token in fingerprint:
+                    self.by_token[token].append(len(self.fingerprints))
+                self.fingerprints.append(fingerprint)
+            return True
+
+# === News-Artikel filtern & bewerten ===
+@dataclass(slots=True, frozen=True)
+class Article:
+    """Bewerteter Feed-Eintrag; sortiert wird nur nach Feldern, nie nach formatiertem Text."""
+    score: float
+    title: str
+    link: str
+    source: str = None
+    published: datetime = None
+    summary: str = None  # Klartext, nur für die Story-Cluster
+
+def rank_feed_entries(feed_url, max_items=20, feeds=None):
+    """Bewertet die ersten max_items Einträge mit Titel und Link; China-relevante als Articles, bester zuerst.
+
+    Der Feed wird nur so weit geladen und geparst, bis diese Einträge beisammen sind.
+    """
+    feed = (feeds or FeedFetcher()).get(feed_url)
+    scored = []
+    entries = list(islice((e for e in feed if e.get("title", "").strip() and e.get("link", "").strip()), max_items))
+    for entry, score in zip(entries, score_entries(entries)):
+        if score > 0:
+            scored.append(Article(score, entry.get("title", "").strip(), entry.get("link", "").strip(),
+                                  summary=entry_summary(entry)))
+    scored.sort(reverse=True, key=lambda a: a.score)
+    return scored
+
+def render_ranked(scored, top_n=5, dedup=None, history=None):
+    """Liefert die besten top_n Einträge als LinkItems; bereits in anderen Abschnitten gezeigte Artikel werden übersprungen.
+
+    Mit history werden seit dem letzten Lauf neue Artikel markiert.
+    """
+    items = []
+    for article in scored:
+        if len(items) >= top_n:
+            break
+        if dedup and not dedup.add(article.link, article.title):
+            continue
+        related = dedup.clusters.related(article.link) if dedup and dedup.clusters else ()
+        items.append(LinkItem(article.title, article.link, new=bool(history and history.is_new(article.link)),
+                              related=related))
+    return items or [NoteItem("Keine aktuellen China-Artikel gefunden.")]
+
+def render_ranked_result(result, top_n=5, dedup=None, history=None, min_score=0):
+    """Wie render_ranked, reicht aber Fehlermeldungen der Abruf-Engine (ErrorItems) unverändert durch."""
+    if result and isinstance(result[0], ErrorItem):
+        return list(result)
+    return render_ranked([a for a in result if a.score >= min_score], top_n=top_n, dedup=dedup, history=history)
+
+def fetch_news(feed_url, max_items=20, top_n=5, feeds=None, dedup=None):
+    return render_ranked(rank_feed_entries(feed_url, max_items=max_items, feeds=feeds), top_n=top_n, dedup=dedup)
+
+# === SCMP & Yicai Ranking-Wrapper ===
+def fetch_ranked_articles(feed_url, max_items=20, top_n=5, feeds=None, dedup=None):
+    return fetch_news(feed_url, max_items=max_items, top_n=top_n, feeds=feeds, dedup=dedup)
+
+# === Quelle eines Google-News-Eintrags bestimmen ===
+ASIA_SOURCES = {"SCMP", "Nikkei Asia", "Yicai"}
+# Vorberechnet: kleingeschriebener Name → (Quelle, Kategorie), damit pro Titel nur Wörterbuch-Zugriffe nötig sind
+SOURCE_INDEX = {name.lower(): (name, "ASIA" if name in ASIA_SOURCES else category)
+                for name, category in source_categories.items()}
+SOURCE_MAX_WORDS = max(len(name.split()) for name in source_categories)
+
+def split_source_suffix(title):
+    """Trennt eine bekannte Quelle am Titelende ab: (Titel ohne Quelle, Quelle) bzw. (Titel, None)."""
+    words = title.rsplit(None, SOURCE_MAX_WORDS)
+    for n in range(min(SOURCE_MAX_WORDS, len(words) - 1), 0, -1):
+        known = SOURCE_INDEX.get(" ".join(words[-n:]).lower())
+        if known:
+            return " ".join(words[:-n]).strip("-:—–| ").strip(), known[0]
+    return title, None
+
+def extract_source(title):
+    """Extrahiert den Quellennamen aus dem Titel (z. B. '– Reuters')."""
+    return split_source_suffix(title)[1] or "Unknown Source"
+
+def resolve_source(entry, title):
+    """(Titel ohne Quelle, Quelle) – zuerst aus dem <source>-Element des Feeds, sonst über das Titelende."""
+    clean_title, source = split_source_suffix(title)
+    outlet = (entry.get("source") or {}).get("title", "").strip()
+    if outlet:
+        if source is None:
+            # Quelle nicht im Index: Suffix " - Quelle" trotzdem abschneiden, wenn er zum <source>-Element passt
+            suffix = SOURCE_SUFFIX_RE.search(title)
+            if suffix and suffix.group(1).strip().lower() == outlet.lower():
+                clean_title = title[:suffix.start()].strip()
+        known = SOURCE_INDEX.get(outlet.lower())
+        if known:
+            return clean_title, known[0]
+    return clean_title, source or "Unknown Source"
+
+# === Google News nach Sprache & Quelle gruppieren ===
+GOOGLE_CATEGORY_TITLES = {
+    "EN": "🇺🇸 Englischsprachige Medien",
+    "DE": "🇩🇪 Deutschsprachige Medien",
+    "FR": "🇫🇷 Französische Medien",
+    "ASIA": "🌏 Asiatische Medien",
+    "OTHER": "🧪 Sonstige Quellen"
+}
+
+def scan_google_feed(lang, feed):
+    """Bewertet einen Google-News-Feed und ordnet jeden relevanten Eintrag zu: [(Kategorie, Article mit Quelle)]."""
+    default_category = lang if lang in ("EN", "DE", "FR") else "OTHER"
+    entries = [e for e in feed.entries if e.get("title", "").strip() and e.get("link", "").strip()]
+    scanned = []
+    for entry, score in zip(entries, score_entries(entries)):
+        if score <= 0:
+            continue
+        title, source = resolve_source(entry, entry["title"].strip())
+        known = SOURCE_INDEX.get(source.lower())
+        scanned.append((known[1] if known else default_category,
+                        Article(score, title, entry["link"].strip(), source, summary=entry_summary(entry))))
+    return scanned
+
+class GoogleNewsAggregator:
+    """Sammelt Google-News-Einträge Feed für Feed und behält je (Kategorie, Quelle) nur die besten k.
+
+    Was schon in einem früheren Abschnitt stand, kommt gar nicht erst in den Heap; der kleine Puffer über top_n
+    fängt Dubletten innerhalb von Google News ab. Speicher und Sortieraufwand hängen so nur davon ab, wie viel
+    angezeigt wird – nicht von der Länge der Feeds (when:7d, weitere Sprachen).
+    """
+
+    def __init__(self, top_n=5, slack=5, dedup=None, history=None):
+        self.top_n = top_n
+        self.k = top_n + slack
+        self.dedup = dedup
+        self.history = history
+        self.heaps = defaultdict(list)  # (Kategorie, Quelle) -> Min-Heap [(Score, -Reihenfolge, Article)]
+        self.counter = 0
+
+    def add_feed(self, lang, feed):
+        for category, article in scan_google_feed(lang, feed):
+            self.add(category, article)
+
+    def add(self, category, article):
+        """Nimmt einen Artikel auf, wenn er zu den besten k seiner (Kategorie, Quelle) gehört."""
+        # Bei gleichem Score gewinnt der frühere Eintrag (wie beim stabilen Sortieren)
+        self.counter += 1
+        heap = self.heaps[(category, article.source)]
+        item = (article.score, -self.counter, article)
+        if len(heap) >= self.k and item < heap[0]:
+            return
+        # Dubletten-Prüfung erst für Kandidaten, die es in den Heap schaffen
+        if self.dedup and self.dedup.seen(article.link, article.title):
+            return
+        if len(heap) < self.k:
+            heapq.heappush(heap, item)
+        else:
+            heapq.heapreplace(heap, item)
+
+    def candidates(self):
+        """Inhalt aller Heaps als [(Kategorie, Article)] in der Reihenfolge, in der sie hinzukamen."""
+        kept = [(-order, category, article) for (category, _), heap in self.heaps.items() for _, order, article in heap]
+        return [(category, article) for _, category, article in sorted(kept, key=lambda x: x[0])]
+
+    def groups(self):
+        """[(Kategorie, Bausteine)] in der Reihenfolge von GOOGLE_CATEGORY_TITLES; leere Kategorien fallen weg."""
+        groups = []
+        for cat_key in GOOGLE_CATEGORY_TITLES:
+            category_items = []
+            for source_name in sorted(source for category, source in self.heaps if category == cat_key):
+                best = [article for _, _, article in sorted(self.heaps[(cat_key, source_name)], reverse=True)]
+                items = [item for item in render_ranked(best, top_n=self.top_n, dedup=self.dedup, history=self.history)
+                         if isinstance(item, LinkItem)]
+                if items:
+                    category_items.append(HeadlineItem(source_name, level=3))
+                    category_items.extend(items)
+            if category_items:
+                groups.append((cat_key, [HeadlineItem(GOOGLE_CATEGORY_TITLES[cat_key])] + category_items))
+        return groups
+
+@dataclass(frozen=True)
+class GoogleScan:
+    """Ergebnis eines Google-News-Feeds: die Top-k je Quelle zum Rendern, jeder bewertete Artikel für den Verlauf."""
+    candidates: tuple  # ((Kategorie, Article), ...)
+    scanned: tuple  # (Article, ...) ohne Zusammenfassung
+
+    def __len__(self):
+        return len(self.candidates)
+
+def top_google_articles(lang, feed_url, feeds):
+    """Bewertet einen Google-News-Feed und behält zum Rendern nur die Kandidaten der Top-k je (Kategorie, Quelle).
+
+    Der Snapshot (und der Daemon zwischen zwei Abrufen) hält so nie mehr als k Artikel je Quelle mit Zusammenfassung;
+    alle übrigen bewerteten bleiben nur als schlanke Articles für record_snapshot.
+    """
+    aggregator = GoogleNewsAggregator()
+    scanned = []
+    for category, article in scan_google_feed(lang, feeds.get(feed_url)):
+        aggregator.add(category, article)
+        scanned.append(replace(article, summary=None))
+    return GoogleScan(tuple(aggregator.candidates()), tuple(scanned))
+
+def group_google_news(feeds_by_lang, dedup=None, history=None):
+    """Ordnet die Einträge der Google-News-Feeds ({Sprache: Feed oder None}) nach Kategorie und Quelle.
+
+    Liefert [(Kategorie, Bausteine)] – leere Kategorien fallen weg.
+    """
+    aggregator = GoogleNewsAggregator(dedup=dedup, history=history)
+    for lang, feed in feeds_by_lang.items():
+        if feed is not None:
+            aggregator.add_feed(lang, feed)
+    return aggregator.groups()
+
+# === 🧩 Story-Cluster: dieselbe Meldung aus vielen Quellen ===
+CLUSTER_NGRAMS = (3, 4)  # Zeichen-n-Gramme (über Wortgrenzen) – trägt auch Namen, Kürzel und Zahlen über Sprachen hinweg
+CLUSTER_HASH_BITS = 18  # Hashing-Trick: 2^18 Spalten, kein Vokabular
+CLUSTER_SIMILARITY = 0.18  # Kosinus-Ähnlichkeit (TF-IDF); gewählt mit tests/cluster_tuning.py, geprüft in tests/test_clusters.py
+CLUSTER_MAX_DF = 0.02  # n-Gramme in mehr als 2 % der Artikel ("chi", "ina") trennen kaum, kosten aber quadratisch Paare
+CLUSTER_MIN_DF_LIMIT = 32  # ... bei kleinen Läufen aber nicht schon ab wenigen Artikeln verwerfen
+CLUSTER_PAIR_CHUNK = 1 << 21  # Kandidatenpaare je Block des Ähnlichkeitsdurchgangs (begrenzt den Speicher)
+CLUSTER_BLOCK_CELLS = 1 << 22  # Summenzellen (Zeilen im Block × Artikel) je Block
+CLUSTER_SUMMARY_CHARS = 300
+CLUSTER_MAX_SOURCES = 4  # so viele weitere Quellen werden unter einem Artikel verlinkt
+# Eigennamen und Kürzel, die in den Sprachen verschieden geschrieben werden, auf ein gemeinsames Wort. Nur
+# Eindeutiges: Gattungswörter ("senkt", "actions", "mars") bleiben, wie sie sind – sie würden fremde Meldungen verbinden.
+STORY_TERMS = {
+    "pboc": ("people's bank of china", "peoples bank of china", "banque populaire de chine", "pbc"),
+    "lpr": ("loan prime rate", "loan prime rates"),
+    "cpi": ("consumer price index", "verbraucherpreisindex", "indice des prix à la consommation"),
+    "ppi": ("producer price index", "erzeugerpreisindex", "indice des prix à la production"),
+    "china": ("chinas", "china's", "chine", "chinois", "chinoise", "chinoises", "chinesische", "chinesischen",
+              "chinesischer", "chinese"),
+    "beijing": ("peking", "pékin"),
+    "hongkong": ("hong kong",),
+    "eu": ("ue", "union européenne", "europäische union", "european union"),
+    "us": ("usa", "états-unis", "united states"),
+}
+STORY_TERM_MAP = {variant: word for word, variants in STORY_TERMS.items() for variant in variants}
+STORY_TERM_RE = re.compile(r"(?<![\w'])(?:" + "|".join(re.escape(v) for v in sorted(STORY_TERM_MAP, key=len, reverse=True))
+                           + r")(?![\w'])")
+
+def entry_summary(entry):
+    """Zusammenfassung eines Feed-Eintrags als kurzer Klartext (ohne HTML) für den Ähnlichkeitsvergleich."""
+    text = " ".join(HTML_TAG_RE.sub(" ", entry.get("summary", "")).split())
+    return text[:CLUSTER_SUMMARY_CHARS] or None
+
+@dataclass(frozen=True)
+class StoryClusters:
+    """Geschichten mit mehr als einem Artikel: normalisierte URL -> Cluster-Nr.; je Cluster die Artikel (Quelle, Link).
+
+    Gezeigt wird je Geschichte nur ein Artikel (siehe DedupIndex); related() liefert die Quellen darunter.
+    """
+    by_url: MappingProxyType = field(default_factory=lambda: MappingProxyType({}))
+    members: tuple = ()  # Cluster-Nr. -> ((Quelle, Link), ...), bester Artikel zuerst
+
+    def cluster(self, url_key):
+        return self.by_url.get(url_key)
+
+    def related(self, link):
+        """Die anderen Artikel derselben Geschichte als ((Quelle, Link), ...), je Quelle einer, höchstens CLUSTER_MAX_SOURCES."""
+        url_key = normalize_url(link) if link else None
+        cluster = self.by_url.get(url_key)
+        if cluster is None:
+            return ()
+        own = next(label for label, other in self.members[cluster] if normalize_url(other) == url_key)
+        others = {}
+        for label, other in self.members[cluster]:
+            if label != own and normalize_url(other) != url_key:
+                others.setdefault(label, other)
+        return tuple(others.items())[:CLUSTER_MAX_SOURCES]
+
+def story_label(article, name):
+    """Quelle eines Artikels für die Cluster-Anzeige: eigene Quelle, sonst Titel-Suffix, sonst der Abschnitt."""
+    source = article.source if article.source != "Unknown Source" else None
+    return source or split_source_suffix(article.title)[1] or name
+
+def story_terms(text):
+    """Kleinschreibung und Fachbegriffe aller Sprachen auf ein gemeinsames Wort (STORY_TERMS)."""
+    return STORY_TERM_RE.sub(lambda m: STORY_TERM_MAP[m.group(0)], text.lower().replace("’", "'"))
+
+def story_language(name):
+    """Sprache eines Abschnitts für den Namensvergleich: Google News je Feed, alle übrigen Quellen sind englisch."""
+    lang = name[len("Google News "):] if name.startswith("Google News ") else None
+    return lang if lang in feeds_google_news else "EN"
+
+def title_names(title):
+    """Eigennamen eines Titels: groß geschriebene Wörter außer am Anfang eines Satzteils, klein und angeglichen."""
+    suffix = SOURCE_SUFFIX_RE.search(title)
+    if suffix and len(suffix.group(1).split()) <= 4:
+        title = title[:suffix.start()]
+    names = set()
+    for part in re.split(r"[:–—]|\s-\s", title):
+        names.update(story_terms(word) for word in WORD_RE.findall(part)[1:] if word[0].isupper())
+    return frozenset(names)
+
+def story_features(article, name):
+    """(Titel-Wortmenge, Sprache, Eigennamen) eines Artikels – Grundlage für stories_compatible."""
+    return title_fingerprint(story_terms(article.title)), story_language(name), title_names(article.title)
+
+def stories_compatible(a, b):
+    """False, wenn zwei Artikel sicher verschiedene Meldungen sind, egal wie ähnlich ihr Text ist.
+
+    Eigene Zahlen oder Gegensätze auf beiden Seiten ("cuts"/"holds"); in derselben Sprache auch eigene Namen auf
+    beiden Seiten ("Xi arrives in Paris"/"... in Budapest"). Über Sprachen hinweg unterscheiden sich Namen ohnehin.
+    """
+    (fingerprint_a, lang_a, names_a), (fingerprint_b, lang_b, names_b) = a, b
+    if titles_contrast(fingerprint_a, fingerprint_b, numbers_both=True):
+        return False
+    return lang_a != lang_b or not (names_a - names_b and names_b - names_a)
+
+def story_text(article, label):
+    """Titel + Zusammenfassung, klein, nur Wortzeichen; der Quellenname fällt weg, sonst ähneln sich alle Reuters-Artikel."""
+    text = story_terms(f"{article.title} {article.summary or ''}".lower().replace(label.lower(), " "))
+    return " " + " ".join(WORD_RE.findall(text)) + " "
+
+def hashed_ngrams(texts, np):
+    """Alle Zeichen-n-Gramme aller Texte in einem vektorisierten Durchgang: (Zeile, gehashte Spalte) als Arrays."""
+    lengths = np.fromiter((len(t) for t in texts), dtype=np.int64, count=len(texts))
+    # Texte mit \0 getrennt aneinanderhängen; jede Position kennt ihren Text, Trennzeichen gehören zu keinem (-1)
+    codes = np.frombuffer("\0".join(texts).encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+    doc = np.repeat(np.arange(len(texts)), lengths + 1)[:len(codes)]
+    doc[np.cumsum(lengths + 1)[:-1] - 1] = -1
+    rows, cols = [], []
+    for n in CLUSTER_NGRAMS:
+        if len(codes) < n:
+            continue
+        h = np.zeros(len(codes) - n + 1, dtype=np.uint64)
+        for k in range(n):
+            h = h * np.uint64(1000003) + codes[k:len(codes) - n + 1 + k]
+        # Avalanche (MurmurHash3-Finalizer), damit die oberen Bits von allen Zeichen abhängen
+        h ^= h >> np.uint64(33)
+        h *= np.uint64(0xFF51AFD7ED558CCD)
+        h ^= h >> np.uint64(33)
+        valid = (doc[:len(h)] >= 0) & (doc[:len(h)] == doc[n - 1:])
+        rows.append(doc[:len(h)][valid])
+        cols.append((h[valid] >> np.uint64(64 - CLUSTER_HASH_BITS)).astype(np.int64))
+    return np.concatenate(rows), np.concatenate(cols)
+
+def tfidf_matrix(rows, cols, n, np):
+    """Dünn besetzte TF-IDF-Matrix (logarithmische TF, geglättete IDF, L2-normiert) als (Zeilen, Spalten, Gewichte).
+
+    Die Einträge sind nach (Spalte, Zeile) sortiert – so liegen alle Artikel mit demselben n-Gramm beieinander.
+    """
+    keys, counts = np.unique(rows * (1 << CLUSTER_HASH_BITS) + cols, return_counts=True)
+    rows, cols = keys >> CLUSTER_HASH_BITS, keys & ((1 << CLUSTER_HASH_BITS) - 1)
+    df = np.bincount(cols, minlength=1 << CLUSTER_HASH_BITS)
+    weights = (1 + np.log(counts)) * (np.log((1 + n) / (1 + df[cols])) + 1)
+    weights /= np.sqrt(np.bincount(rows, weights=weights * weights, minlength=n))[rows]
+    # Häufige n-Gramme erst nach dem Normieren weglassen: sie senken die Ähnlichkeit nur, statt sie aufzublähen
+    keep = df[cols] <= max(CLUSTER_MAX_DF * n, CLUSTER_MIN_DF_LIMIT)
+    rows, cols, weights = rows[keep], cols[keep], weights[keep]
+    order = np.lexsort((rows, cols))
+    return rows[order], cols[order], weights[order]
+
+def similar_pairs(rows, cols, weights, n, threshold, np):
+    """Alle Artikelpaare (i < j) mit Kosinus-Ähnlichkeit >= threshold, ähnlichste zuerst; blockweise über Zeilen.
+
+    Nur Artikel mit gemeinsamem n-Gramm werden verglichen. Je Block entstehen höchstens CLUSTER_PAIR_CHUNK
+    Kandidatenpaare und CLUSTER_BLOCK_CELLS Summenzellen; jedes Paar (i, j) fällt vollständig in den Block von i.
+    """
+    starts = np.flatnonzero(np.r_[True, cols[1:] != cols[:-1]])
+    ends = np.r_[starts[1:], len(cols)]
+    # Partner eines Eintrags: die folgenden Einträge derselben Spalte (dort stehen nur größere Zeilen)
+    partners = np.repeat(ends, ends - starts) - np.arange(len(cols)) - 1
+    per_row = np.bincount(rows, weights=partners, minlength=n)
+    block_rows = max(1, CLUSTER_BLOCK_CELLS // n)
+    bounds, first, taken = [0], 0, 0
+    for row, count in enumerate(per_row.tolist()):
+        if row > first and (taken + count > CLUSTER_PAIR_CHUNK or row - first >= block_rows):
+            bounds.append(row)
+            first, taken = row, 0
+        taken += count
+    bounds.append(n)
+    by_row = np.argsort(rows, kind="stable")
+    cuts = np.searchsorted(rows[by_row], bounds)
+    found_i, found_j, found_sim = [], [], []
+    for a, b, lo, hi in zip(bounds, bounds[1:], cuts, cuts[1:]):
+        left = by_row[lo:hi]
+        left = left[partners[left] > 0]
+        count = partners[left]
+        offsets = np.arange(count.sum()) - np.repeat(np.cumsum(count) - count, count)
+        left = np.repeat(left, count)
+        right = left + 1 + offsets
+        sims = np.bincount((rows[left] - a) * n + rows[right], weights=weights[left] * weights[right], minlength=(b - a) * n)
+        hits = np.flatnonzero(sims >= threshold)
+        found_i.append(hits // n + a)
+        found_j.append(hits % n)
+        found_sim.append(sims[hits])
+    order = np.argsort(-np.concatenate(found_sim), kind="stable")
+    return list(zip(np.concatenate(found_i)[order].tolist(), np.concatenate(found_j)[order].tolist()))
+
+def union_find(n, pairs, compatible=None):
+    """Zusammenhangskomponenten der Paare: Liste der Wurzel je Element.
+
+    Mit compatible(i, j) werden zwei Komponenten nur vereinigt, wenn alle Elemente paarweise verträglich sind –
+    sonst verketten Zwischenglieder ("PBoC decides on LPR") auch "cuts" und "holds" zu einer Geschichte.
+    """
+    parent = list(range(n))
+    members = {i: [i] for i in range(n)}
+
+    def root(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, j in pairs:
+        ri, rj = root(i), root(j)
+        if ri == rj:
+            continue
+        if compatible and not all(compatible(a, b) for a in members[ri] for b in members[rj]):
+            continue
+        keep, gone = min(ri, rj), max(ri, rj)
+        parent[gone] = keep
+        members[keep] += members.pop(gone)
+    return [root(i) for i in range(n)]
+
+def cluster_articles(named_articles, similarity=CLUSTER_SIMILARITY):
+    """Fasst bewertete Artikel aller Nachrichtenquellen ([(Abschnitt, Article)]) zu Geschichten zusammen.
+
+    TF-IDF über gehashte Zeichen-n-Gramme nach Angleichung der Fachbegriffe (NumPy, ohne Modelle oder Netz),
+    dünn besetzter Ähnlichkeitsdurchgang, Union-Find. Titel mit eigenen Zahlen, Gegensätzen ("cuts"/"holds") oder
+    – in derselben Sprache – eigenen Namen landen nie in derselben Geschichte (stories_compatible). Ohne NumPy gibt es keine Cluster – das Briefing sieht dann aus wie bisher.
+    """
+    try:
+        import numpy as np
+    except ImportError:
+        log.info("NumPy nicht installiert: Story-Cluster sind abgeschaltet.")
+        return StoryClusters()
+    # Jede URL nur einmal (derselbe Artikel kann in mehreren Feeds stehen)
+    unique = {}
+    for name, article in named_articles:
+        url_key = normalize_url(article.link) if article.link else None
+        if url_key and url_key not in unique:
+            unique[url_key] = (article, story_label(article, name), name)
+    if len(unique) < 2:
+        return StoryClusters()
+    keys = list(unique)
+    with measure("cluster", "stories") as m:
+        texts = [story_text(article, label) for article, label, _ in unique.values()]
+        features = [story_features(article, name) for article, _, name in unique.values()]
+        rows, cols, weights = tfidf_matrix(*hashed_ngrams(texts, np), len(texts), np)
+        pairs = similar_pairs(rows, cols, weights, len(texts), similarity, np)
+        roots = union_find(len(texts), pairs, lambda i, j: stories_compatible(features[i], features[j]))
+        groups = defaultdict(list)
+        for index, root in enumerate(roots):
+            groups[root].append(index)
+        by_url, members = {}, []
+        for indices in groups.values():
+            if len(indices) < 2:
+                continue
+            indices.sort(key=lambda i: unique[keys[i]][0].score, reverse=True)
+            for i in indices:
+                by_url[keys[i]] = len(members)
+            members.append(tuple((unique[keys[i]][1], unique[keys[i]][0].link) for i in indices))
+        m.items = len(texts)
+    log.info("🧩 Story-Cluster: %d Artikel, %d Geschichten mit mehreren Artikeln (%d Artikel verlinkt)",
+             len(texts), len(members), len(by_url))
+    return StoryClusters(MappingProxyType(by_url), tuple(members))
+
+# === 🗞️ Feed-Abschnitte: viele Feeds parallel, nur frische Einträge ===
+FEED_SECTION_WORKERS = 8
+FEED_SECTION_BUDGET = 25  # Sekunden; was bis dahin nicht geladen ist, fehlt im Abschnitt
+
+@dataclass
+class FeedSection:
+    """Ein Abschnitt aus mehreren Feeds ({Quelle: URL}) mit Frische-Fenster.
+
+    scored=False: keine Relevanz-Bewertung, die neuesten Einträge zuerst (z. B. NBS – dort ist ohnehin alles China).
+    """
+    feeds: dict
+    max_age: timedelta
+    top_n: int = 5
+    per_source: int = 2
+    scored: bool = True
+    empty_text: str = "Keine aktuellen Beiträge gefunden."
+    max_items: int = 30  # frische Einträge je Feed; danach wird der Feed nicht weiter gelesen
+
+NBS_SECTION = FeedSection({"NBS": "http://www.stats.gov.cn/english/PressRelease/rss.xml"}, timedelta(days=7),
+                          per_source=5, scored=False, empty_text="Keine aktuellen Veröffentlichungen gefunden.")
+THINKTANK_SECTION = FeedSection(feeds_thinktanks, timedelta(days=7), top_n=8)
+
+def entry_published(entry):
+    """Veröffentlichungszeitpunkt eines Feed-Eintrags (UTC) oder None."""
+    parsed = entry.get("published_parsed") or entry.get("updated_parsed")
+    return datetime(*parsed[:6], tzinfo=timezone.utc) if parsed else None
+
+def fresh_feed_entries(feed_url, feeds, cutoff, max_items):
+    """Die ersten max_items Einträge eines Feeds mit Titel, Link und Datum ab cutoff; liest den Feed nur so weit."""
+    fresh = []
+    for entry in feeds.get(feed_url):
+        published = entry_published(entry)
+        if published and published >= cutoff and entry.get("title") and entry.get("link"):
+            fresh.append((published, entry))
+            if len(fresh) >= max_items:
+                break
+    return fresh
+
+def collect_feed_section(section, feeds, now=None):
+    """Lädt alle Feeds des Abschnitts parallel, behält nur Einträge im Frische-Fenster und bewertet sie gemeinsam.
+
+    Einträge ohne Datum fallen weg – ihre Aktualität lässt sich nicht prüfen. Je Feed werden höchstens
+    section.max_items frische Einträge gelesen. Liefert Articles (mit Quelle und Zeitpunkt), bester zuerst;
+    nur wenn kein Feed geladen werden konnte, gibt es einen Fehler.
+    """
+    cutoff = (now or datetime.now(timezone.utc)) - section.max_age
+    pool = ThreadPoolExecutor(max_workers=min(FEED_SECTION_WORKERS, len(section.feeds)), thread_name_prefix="section")
+    futures = {pool.submit(fresh_feed_entries, url, feeds, cutoff, section.max_items): source
+               for source, url in section.feeds.items()}
+    done, pending = wait(futures, timeout=FEED_SECTION_BUDGET)
+    pool.shutdown(wait=False, cancel_futures=True)
+    fresh, failed = [], [futures[f] for f in pending]
+    for future in done:
+        source = futures[future]
+        try:
+            fresh.extend((source, published, entry) for published, entry in future.result())
+        except Exception as e:
+            log.warning("Warnung: Feed %s nicht abrufbar: %s", source, e)
+            failed.append(source)
+    if len(failed) == len(section.feeds):
+        raise RuntimeError(f"kein Feed erreichbar ({', '.join(sorted(failed))})")
+    if failed:
+        log.info("Feeds ohne Ergebnis: %s", ", ".join(sorted(failed)))
+    scores = score_entries([entry for _, _, entry in fresh]) if section.scored else [1] * len(fresh)
+    ranked = [Article(score, entry["title"].strip(), entry["link"].strip(), source, published, entry_summary(entry))
+              for (source, published, entry), score in zip(fresh, scores) if score > 0]
+    ranked.sort(key=lambda a: (a.score, a.published), reverse=True)
+    return ranked
+
+def render_feed_section(section, result, dedup=None, history=None, min_score=0):
+    """Macht aus collect_feed_section() LinkItems (höchstens per_source je Quelle); ErrorItems werden durchgereicht."""
+    if result and isinstance(result[0], ErrorItem):
+        return list(result)
+    items, per_source = [], defaultdict(int)
+    for article in result:
+        if len(items) >= section.top_n:
+            break
+        if section.scored and article.score < min_score:
+            continue
+        if per_source[article.source] >= section.per_source or (dedup and not dedup.add(article.link, article.title)):
+            continue
+        per_source[article.source] += 1
+        if len(section.feeds) > 1:
+            meta = f"{article.source}, {article.published.strftime('%d.%m.')}"
+        else:
+            meta = article.published.strftime("%d.%m.%Y")
+        items.append(LinkItem(article.title, article.link, meta=meta, new=bool(history and history.is_new(article.link))))
+    return items or [NoteItem(section.empty_text)]
+
+# === ⚡ Parallele Abruf-Engine ===
+# Deadline je Quelle in Sekunden (gemessen ab dem Start des Abrufs)
+FETCH_DEADLINES = {
+    "Marktdaten": 30,
+    "Google News – China": 30,
+    "NBS": 30,
+    "Think Tanks": 30,
+    "Google News EN": 30,
+    "Google News DE": 30,
+    "Google News FR": 30,
+    "SCMP": 30,
+    "Yicai": 30,
+    "Substack": 180,
+}
+DEFAULT_FETCH_DEADLINE = 30
+FETCH_WORKERS = 12
+
+class FetchEngine:
+    """Startet alle Abrufe parallel, höchstens max_workers gleichzeitig; jede Quelle hat ihre eigene Deadline.
+
+    Jeder Abruf läuft in einem Daemon-Thread: ein hängender Abruf hält nach shutdown() weder den Lauf
+    noch das Beenden des Interpreters auf (ThreadPoolExecutor würde seine Threads beim Beenden abwarten).
+    """
+
+    def __init__(self, max_workers=FETCH_WORKERS):
+        self.slots = threading.BoundedSemaphore(max_workers)
+        self.closed = threading.Event()
+        self.jobs = {}
+        self.timings = {}
+        self.started = time.monotonic()
+
+    def submit(self, name, func, *args, fallback=None, **kwargs):
+        """Startet func(*args, **kwargs) im Hintergrund. fallback(grund) liefert den Ersatzwert bei Fehler/Timeout."""
+        deadline = FETCH_DEADLINES.get(name, DEFAULT_FETCH_DEADLINE)
+        if fallback is None:
+            fallback = lambda reason: [ErrorItem(f"❌ {name}: {reason}")]
+        future = Future()
+        threading.Thread(target=self._run, args=(future, name, func, args, kwargs), name=f"fetch-{name}",
+                         daemon=True).start()
+        self.jobs[name] = (future, time.monotonic() + deadline, deadline, fallback)
+
+    def _run(self, future, name, func, args, kwargs):
+        with self.slots:
+            # Nach shutdown() startet kein wartender Abruf mehr
+            if self.closed.is_set() or not future.set_running_or_notify_cancel():
+                future.cancel()
+                return
+            try:
+                future.set_result(self._timed(name, func, args, kwargs))
+            except BaseException as e:
+                future.set_exception(e)
+
+    def _timed(self, name, func, args, kwargs):
+        start = time.monotonic()
+        try:
+            with measure("section", name) as m:
+                result = func(*args, **kwargs)
+                m.items = len(result) if hasattr(result, "__len__") else 0
+            self.timings[name] = (time.monotonic() - start, "ok")
+            return result
+        except Exception:
+            self.timings[name] = (time.monotonic() - start, "Fehler")
+            raise
+
+    def result(self, name):
+        """Wartet höchstens bis zur Deadline der Quelle und liefert sonst den Ersatzwert."""
+        future, deadline_at, deadline, fallback = self.jobs[name]
+        try:
+            return future.result(timeout=max(0, deadline_at - time.monotonic()))
+        except FuturesTimeout:
+            self.timings.setdefault(name, (deadline, "Timeout"))
+            timeout = StageRecord()
+            timeout.error = f"Timeout nach {deadline} s"
+            get_run_report().add("section", name, deadline, timeout)
+            return fallback(f"Keine Antwort innerhalb von {deadline} s.")
+        except Exception as e:
+            return fallback(f"Fehler beim Abrufen ({e})")
+
+    def report(self):
+        """Gibt die Laufzeit je Quelle (langsamste zuerst) und die Gesamtdauer aus."""
+        log.info("⏱️ Abrufzeiten je Quelle:")
+        for name, (duration, status) in sorted(self.timings.items(), key=lambda x: x[1][0], reverse=True):
+            log.info("   %-22s %6.2f s (%s)", name, duration, status)
+        log.info("⏱️ Gesamtdauer: %.2f s", time.monotonic() - self.started)
+
+    def shutdown(self):
+        # Hängende Abrufe nicht abwarten – ihre Ergebnisse werden nicht mehr gebraucht; wartende gar nicht erst starten
+        self.closed.set()
+        for future, *_ in self.jobs.values():
+            future.cancel()
+
+# === 📦 Lokaler Substack-Speicher (UID-Wasserstand) ===
+SUBSTACK_CACHE_DIR = os.path.join(BASE_DIR, "substack_cache")
+SUBSTACK_STORE_FILE = os.path.join(SUBSTACK_CACHE_DIR, "store.json")
+SUBSTACK_RETENTION_DAYS = 14
+SUBSTACK_RETRY_ATTEMPTS = 3  # so oft wird eine Mail nachgeladen, deren Abruf oder Parsen fehlschlug
+
+@dataclass(slots=True, frozen=True)
+class NewsletterPost:
+    """Ein Substack-Post – oder ein ausdrückliches Ergebnis ohne Post: error (Fehler) bzw. note (z. B. keine Mails)."""
+    sender: str
+    order: int = 999
+    title: str = None
+    link: str = None
+    teaser: str = None
+    date: datetime = None
+    error: str = None
+    note: str = None
+
+    @property
+    def sort_key(self):
+        return (self.order, self.date.timestamp() if self.date else 0)
+
+class SubstackStore:
+    """Merkt sich UIDVALIDITY, die höchste verarbeitete UID, fehlgeschlagene UIDs und geparste Posts je Ordner."""
+
+    def __init__(self, path=SUBSTACK_STORE_FILE, readonly=False):
+        """path=None: nur im Speicher (Aufnahme/Wiedergabe), jeder Lauf liest alles neu.
+        readonly=True: liest den gespeicherten Stand, schreibt ihn aber nie zurück (Vorschau, Benchmark)."""
+        self.path = path
+        self.readonly = readonly
+        self.data = {}
+        if not path:
+            return
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                self.data = json.load(f)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            log.warning("Warnung: Substack-Speicher %s unlesbar, starte leer: %s", path, e)
+
+    def folder(self, name, uidvalidity):
+        """Liefert den Zustand eines Ordners; bei geänderter UIDVALIDITY wird er verworfen."""
+        state = self.data.get(name)
+        if not state or state.get("uidvalidity") != uidvalidity:
+            if state:
+                log.debug("UIDVALIDITY von %s hat sich geändert, lese neu ein.", name)
+            state = {"uidvalidity": uidvalidity, "last_uid": 0, "senders": [], "posts": {}, "retry": {}}
+            self.data[name] = state
+        state.setdefault("retry", {})  # UID -> bisherige Fehlversuche; liegt ggf. unter last_uid
+        return state
+
+    def save(self):
+        cutoff = (datetime.now() - timedelta(days=SUBSTACK_RETENTION_DAYS)).timestamp()
+        for state in self.data.values():
+            state["posts"] = {uid: p for uid, p in state["posts"].items()
+                              if p.get("timestamp") is None or p["timestamp"] >= cutoff}
+        if not self.path or self.readonly:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.data, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, self.path)
+
+# === Substack-HTML: begrenztes, früh abbrechendes Parsen ===
+SUBSTACK_HTML_MAX_BYTES = 256 * 1024
+SUBSTACK_PARSE_CHUNK = 16 * 1024
+# Nach vollständigem Teaser höchstens so viele weitere Textknoten nach einem Post-Link absuchen
+SUBSTACK_LINK_LOOKAHEAD = 200
+TEASER_SKIP_WORDS = ("dear reader", "subscribe", "view in browser")
+
+class _EnoughText(Exception):
+    pass
+
+class SubstackHTMLExtractor(HTMLParser):
+    """Sammelt Titel-Kandidaten, Post-Link und Textknoten und bricht ab, sobald Titel, Link und Teaser feststehen."""
+
+    TITLE_CLASS_TAGS = {"p": 3, "div": 4, "span": 5}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.texts = []          # gestrippte Textknoten in Dokumentreihenfolge
+        self.titles = {}         # Priorität (h1=0 … span.title=5) -> [Textindex, Textteile, geschlossen]
+        self.open_title = None   # [Tag, Priorität, Verschachtelungstiefe]
+        self.post_link = None    # erster Link auf app-link/post oder /post/: [Textindex, href]
+        self.post_path_link = None  # erster Link mit /post/: [href, Textteile]
+        self.https_link = None   # erster https-Link: [Textindex, href]
+        self.in_post_path_link = False
+        self.teaser_complete_at = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if self.open_title and tag == self.open_title[0]:
+            self.open_title[2] += 1
+        priority = None
+        if tag in ("h1", "h2", "h3"):
+            priority = int(tag[1]) - 1
+        elif tag in self.TITLE_CLASS_TAGS and "title" in (attrs.get("class") or "").lower():
+            priority = self.TITLE_CLASS_TAGS[tag]
+        if priority is not None and priority not in self.titles and not self.open_title:
+            self.titles[priority] = [len(self.texts), [], False]
+            self.open_title = [tag, priority, 1]
+        if tag == "a":
+            href = (attrs.get("href") or "").strip()
+            if not self.post_link and ("app-link/post" in href or "/post/" in href):
+                self.post_link = [len(self.texts), href]
+            if not self.https_link and "https://" in href:
+                self.https_link = [len(self.texts), href]
+            if not self.post_path_link and "/post/" in href:
+                self.post_path_link = [href, []]
+                self.in_post_path_link = True
+
+    def handle_endtag(self, tag):
+        if tag == "a":
+            self.in_post_path_link = False
+        if self.open_title and tag == self.open_title[0]:
+            self.open_title[2] -= 1
+            if self.open_title[2] == 0:
+                self.titles[self.open_title[1]][2] = True
+                self.open_title = None
+
+    def handle_data(self, data):
+        if self.open_title:
+            self.titles[self.open_title[1]][1].append(data)
+        if self.in_post_path_link:
+            self.post_path_link[1].append(data)
+        stripped = data.strip()
+        if stripped:
+            self.texts.append(stripped)
+            self._check_done()
+
+    def _check_done(self):
+        # Eine h1 ist der bestmögliche Titel; danach reichen Teaser und Post-Link
+        if 0 not in self.titles or not self.titles[0][2]:
+            return
+        if self.teaser_complete_at is None:
+            title = "".join(self.titles[0][1]).strip()
+            teaser, complete = collect_teaser(self.texts[self.titles[0][0]:], title, "")
+            if complete:
+                self.teaser_complete_at = len(self.texts)
+            return
+        if self.post_link or len(self.texts) - self.teaser_complete_at > SUBSTACK_LINK_LOOKAHEAD:
+            raise _EnoughText()
+
+    def result(self, subject):
+        if self.titles:
+            start, parts, _ = self.titles[min(self.titles)]
+            title = "".join(parts).strip()
+        elif self.post_path_link and "".join(self.post_path_link[1]).strip():
+            start, title = None, "".join(self.post_path_link[1]).strip()
+        else:
+            start, title = None, subject.strip() if subject else "Unbenannter Beitrag"
+        link_info = self.post_link or self.https_link
+        link = link_info[1] if link_info else "#"
+        teaser = ""
+        if self.titles or link_info:
+            if start is None:
+                start = link_info[0]
+            teaser, _ = collect_teaser(self.texts[start:], title, link)
+        return title, link, teaser
+
+def collect_teaser(texts, title, link):
+    """Überspringt den Titel und sammelt danach Absätze, bis gut 100 Zeichen zusammenkommen."""
+    found_title = False
+    teaser_parts = []
+    for stripped in texts:
+        if not found_title and (stripped in title or (link and stripped in link)):
+            found_title = True
+            continue
+        lowered = stripped.lower()
+        if found_title and 30 < len(stripped) < 500 and not any(w in lowered for w in TEASER_SKIP_WORDS):
+            teaser_parts.append(stripped)
+            if len(" ".join(teaser_parts)) > 100:
+                return " ".join(teaser_parts).strip()[:300], True
+    return " ".join(teaser_parts).strip()[:300], False
+
+def extract_substack_html(html, subject=None):
+    """Extrahiert (Titel, Link, Teaser) aus dem HTML-Teil einer Substack-Mail; liest nur so weit wie nötig."""
+    parser = SubstackHTMLExtractor()
+    try:
+        for i in range(0, min(len(html), SUBSTACK_HTML_MAX_BYTES), SUBSTACK_PARSE_CHUNK):
+            parser.feed(html[i:i + SUBSTACK_PARSE_CHUNK])
+    except _EnoughText:
+        pass
+    return parser.result(subject)
+
+def decode_mime_header(value):
+    try:
+        return str(make_header(decode_header(value))) if value else value
+    except Exception:
+        return value
+
+def extract_substack_post(msg):
+    """Extrahiert Titel, Link und Teaser aus einer vollständigen Substack-Mail. Liefert None, wenn kein HTML-Teil vorhanden ist."""
+    html = None
+    if msg.is_multipart():
+        for part in msg.walk():
+            if part.get_content_type() == "text/html":
+                html = part.get_payload(decode=True).decode(part.get_content_charset() or "utf-8", errors="ignore")
+                break
+    elif msg.get_content_type() == "text/html":
+        html = msg.get_payload(decode=True).decode(msg.get_content_charset() or "utf-8", errors="ignore")
+    if not html:
+        return None
+    return extract_substack_html(html, decode_mime_header(msg["Subject"]))
+
+# === IMAP-BODYSTRUCTURE ===
+_IMAP_TOKEN_RE = re.compile(rb'\s*(?:(\()|(\))|"((?:[^"\\]|\\.)*)"|\{(\d+)\}|([^\s()"]+))')
+
+def parse_imap_sexpr(data, pos=0):
+    """Parst eine geklammerte IMAP-Struktur (Listen, Strings, Atome, NIL) ab pos; liefert (Wert, neue Position)."""
+    m = _IMAP_TOKEN_RE.match(data, pos)
+    if not m:
+        raise ValueError("Unerwartetes Ende der BODYSTRUCTURE")
+    pos = m.end()
+    if m.group(1):
+        items = []
+        while True:
+            closing = re.compile(rb"\s*\)").match(data, pos)
+            if closing:
+                return items, closing.end()
+            item, pos = parse_imap_sexpr(data, pos)
+            items.append(item)
+    if m.group(3) is not None:
+        return re.sub(rb"\\(.)", rb"\1", m.group(3)).decode(errors="ignore"), pos
+    if m.group(4):
+        raise ValueError("Literale in BODYSTRUCTURE werden nicht unterstützt")
+    if m.group(2):
+        raise ValueError("Unerwartete schließende Klammer")
+    atom = m.group(5).decode()
+    return (None if atom.upper() == "NIL" else atom), pos
+
+def find_html_part(structure, prefix=""):
+    """Sucht in einer BODYSTRUCTURE den text/html-Teil; liefert (Teilnummer, Encoding, Charset) oder None."""
+    if structure and isinstance(structure[0], list):
+        for i, child in enumerate(structure, 1):
+            if not isinstance(child, list):
+                break
+            found = find_html_part(child, f"{prefix}{i}.")
+            if found:
+                return found
+        return None
+    if len(structure) >= 6 and str(structure[0]).lower() == "text" and str(structure[1]).lower() == "html":
+        params = structure[2] if isinstance(structure[2], list) else []
+        charset = next((params[i + 1] for i in range(0, len(params) - 1, 2) if str(params[i]).lower() == "charset"), None)
+        return (prefix.rstrip(".") or "1"), (structure[5] or "7bit").lower(), charset or "utf-8"
+    return None
+
+def decode_body_part(data, encoding, charset):
+    """Dekodiert einen (ggf. abgeschnittenen) MIME-Teil nach Transfer-Encoding und Zeichensatz."""
+    if encoding == "base64":
+        data = re.sub(rb"\s+", b"", data)
+        data = base64.b64decode(data[:len(data) - len(data) % 4])
+    elif encoding == "quoted-printable":
+        data = quopri.decodestring(data)
+    try:
+        return data.decode(charset, errors="ignore")
+    except LookupError:
+        return data.decode("utf-8", errors="ignore")
+
+# === IMAP-Hilfsfunktionen ===
+IMAP_FETCH_BATCH = 100
+FETCH_ITEM_RE = re.compile(rb"(RFC822|BODY\[[^\]]*\](?:<\d+>)?) \{\d+\}$")
+
+def imap_or(criteria):
+    """Verknüpft Suchkriterien per IMAP-OR (binär, Präfixnotation): OR a OR b c."""
+    return "".join(f"OR {c} " for c in criteria[:-1]) + criteria[-1]
+
+def uid_set(uids):
+    """Fasst UIDs zu einer kompakten Sequenzmenge zusammen, z. B. 101:105,110."""
+    ranges = []
+    for uid in sorted(set(uids)):
+        if ranges and uid == ranges[-1][1] + 1:
+            ranges[-1][1] = uid
+        else:
+            ranges.append([uid, uid])
+    return ",".join(f"{a}:{b}" if a != b else str(a) for a, b in ranges)
+
+def parse_uid_fetch(data):
+    """Zerlegt die Antwort eines UID FETCH in {uid: (Metadaten, {Item: Literal})}."""
+    messages = {}
+    meta, items = b"", {}
+    for part in data or []:
+        if isinstance(part, tuple):
+            meta += part[0]
+            m = FETCH_ITEM_RE.search(part[0])
+            if m:
+                items[m.group(1).decode().upper()] = part[1]
+            continue
+        if part is None:
+            continue
+        # Ein Element ohne Literal schließt die Antwort zu einer Nachricht ab
+        meta += part
+        uid = re.search(rb"UID (\d+)", meta)
+        if uid:
+            messages[int(uid.group(1))] = (meta, items)
+        meta, items = b"", {}
+    return messages
+
+def imap_uid_fetch(imap, uids, items):
+    """UID FETCH in Blöcken von IMAP_FETCH_BATCH UIDs; liefert {uid: (Metadaten, {Item: Literal})}."""
+    uids = sorted(uids)
+    messages = {}
+    for i in range(0, len(uids), IMAP_FETCH_BATCH):
+        typ, data = imap.uid("fetch", uid_set(uids[i:i + IMAP_FETCH_BATCH]), items)
+        if typ != "OK":
+            raise Exception(f"UID FETCH fehlgeschlagen: {data}")
+        messages.update(parse_uid_fetch(data))
+    return messages
+
+def match_sender(from_header, senders_by_email):
+    """Ordnet eine Mail anhand des From-Headers einem Eintrag aus substacks.json zu."""
+    address = parseaddr(from_header or "")[1].lower()
+    if address in senders_by_email:
+        return senders_by_email[address]
+    for sender_email, sender in senders_by_email.items():
+        if sender_email in (from_header or "").lower():
+            return sender
+    return None
+
+def open_substack_folder(email_user, email_password, folders, attempts=3):
+    """Meldet sich bei Gmail an und öffnet den ersten verfügbaren Ordner (nur lesend); liefert (imap, Ordner)."""
+    for attempt in range(attempts):
+        try:
+            with measure("imap", "login") as m:
+                m.retries = 1 if attempt else 0
+                imap = imap_connect()
+                imap.login(email_user, email_password)
+            for f in folders:
+                try:
+                    typ, data = imap.select(f, readonly=True)
+                    if typ != "OK":
+                        raise Exception(data)
+                    log.debug("Ausgewählter Ordner: %s (%s Mails)", f, data[0].decode())
+                    return imap, f
+                except Exception as e:
+                    log.debug("Fehler bei Ordner %s: %s", f, e)
+            raise Exception("Kein gültiger Ordner gefunden")
+        except Exception as e:
+            log.error("❌ Verbindung zu Gmail fehlgeschlagen (Versuch %d/%d): %s", attempt + 1, attempts, e)
+            if attempt == attempts - 1:
+                raise
+            time.sleep(2)
+
+def fetch_bodies_parallel(imap, jobs, connections, email_user, email_password, folder):
+    """Verteilt (Items, UIDs)-Aufträge auf bis zu `connections` IMAP-Verbindungen; liefert {uid: Literal}."""
+    chunks = []
+    for items, uids in jobs:
+        uids = sorted(uids)
+        size = max(1, -(-len(uids) // connections))
+        chunks += [(items, uids[i:i + size]) for i in range(0, len(uids), size)]
+    workers = max(1, min(connections, len(chunks)))
+    assigned = [chunks[i::workers] for i in range(workers)]
+
+    def run(index):
+        # Verbindung 0 ist die bereits offene; weitere werden im jeweiligen Thread aufgebaut
+        conn = imap if index == 0 else open_substack_folder(email_user, email_password, [folder])[0]
+        bodies = {}
+        try:
+            for items, uids in assigned[index]:
+                for uid, (meta, fetched) in imap_uid_fetch(conn, uids, items).items():
+                    bodies[uid] = next(iter(fetched.values()), None)
+        finally:
+            if index != 0:
+                conn.logout()
+        return bodies
+
+    bodies = {}
+    if workers == 1:
+        return run(0)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="imap") as pool:
+        for result in pool.map(run, range(workers)):
+            bodies.update(result)
+    return bodies
+
+def parse_substack_body(part, encoding, charset, raw, subject):
+    """Parst den geladenen HTML-Teil (bzw. die ganze Mail); läuft bei Bedarf in einem eigenen Prozess."""
+    try:
+        if part == "RFC822":
+            return extract_substack_post(email.message_from_bytes(raw))
+        return extract_substack_html(decode_body_part(raw, encoding, charset), subject)
+    except Exception as e:
+        return e
+
+def parse_substack_bodies(tasks, parse_workers):
+    """tasks: Liste von Argument-Tupeln für parse_substack_body; Ergebnisse in derselben Reihenfolge."""
+    if parse_workers <= 1 or len(tasks) < 2 * parse_workers:
+        return [parse_substack_body(*task) for task in tasks]
+    # forkserver/spawn statt fork: der Hauptprozess hat zu diesem Zeitpunkt bereits viele Threads
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    with ProcessPoolExecutor(max_workers=parse_workers, mp_context=multiprocessing.get_context(method)) as pool:
+        return list(pool.map(parse_substack_body, *zip(*tasks), chunksize=4))
+
+# === Substack aus E-Mails abrufen ===
+def fetch_substack_from_email(email_user, email_password, folder="[Gmail]/Alle Nachrichten", max_results_per_sender=5, store=None,
+                              connections=1, parse_workers=0):
+    """Liest Substack-Mails von mehreren Absendern aus Gmail – inkrementell: nur UIDs oberhalb des gespeicherten Wasserstands werden geladen.
+
+    Mails, deren Abruf oder Parsen fehlschlug, merkt sich der Speicher und lädt sie in den nächsten Läufen erneut.
+    Scheitert Gmail, kommen die gespeicherten Posts samt Fehlerhinweis; abgemeldet wird in jedem Fall.
+
+    connections > 1 lädt die Mail-Inhalte über mehrere IMAP-Verbindungen parallel,
+    parse_workers > 1 parst das HTML in einem Prozess-Pool.
+    """
+    posts = []
+    
+    try:
+        with open(SUBSTACKS_FILE, "r") as f:
+            substack_senders = json.load(f)
+        substack_senders = sorted(substack_senders, key=lambda x: x["order"])
+        email_counts = defaultdict(int)
+        for sender in substack_senders:
+            email_counts[sender.get("email")] += 1
+        duplicates = [email for email, count in email_counts.items() if count > 1 and email]
+        if duplicates:
+            log.warning("⚠️ Warnung: Doppelte E-Mail-Adressen in substacks.json: %s", duplicates)
+    except FileNotFoundError:
+        log.error("❌ Fehler: substacks.json nicht gefunden!")
+        posts.append(NewsletterPost("Allgemein", error="Fehler: substacks.json nicht gefunden."))
+        return posts
+    except json.JSONDecodeError:
+        log.error("❌ Fehler: substacks.json ungültig!")
+        posts.append(NewsletterPost("Allgemein", error="Fehler: substacks.json ungültig."))
+        return posts
+    
+    store = store or SubstackStore()
+    folders = [folder, "INBOX", "[Gmail]/Updates"]
+    # Datumsfilter: Letzte 7 Tage
+    since = datetime.now() - timedelta(days=7)
+    errors = defaultdict(list)
+    imap, selected_folder, failure = None, None, None
+    try:
+        # Verbindung aufbauen (mit Retry)
+        imap, selected_folder = open_substack_folder(email_user, email_password, folders)
+        uidvalidity = (imap.response("UIDVALIDITY")[1][0] or b"").decode()
+        state = store.folder(selected_folder, uidvalidity)
+        last_uid = state["last_uid"]
+        retry = state["retry"]
+        failed = set()
+        since_date = since.strftime("%d-%b-%Y")
+        senders_by_email = {}
+        for sender in substack_senders:
+            if sender.get("email"):
+                senders_by_email[sender["email"].lower()] = sender
+            else:
+                errors[sender.get("name")].append(f"Keine E-Mail-Adresse für {sender.get('name')} angegeben.")
+        # Neu hinzugekommene Absender einmalig vollständig (7 Tage) einlesen
+        known_senders = {e.lower() for e in state["senders"]}
+        new_senders = [e for e in senders_by_email if e not in known_senders]
+        search_from = 1 if new_senders else last_uid + 1
+        max_uid = last_uid
+        if senders_by_email:
+            # Eine einzige Suche für alle Absender; die Zuordnung passiert lokal über den From-Header
+            from_criteria = [f'FROM "{e}"' for e in senders_by_email]
+            search_query = f"(SINCE {since_date} UID {search_from}:* {imap_or(from_criteria)})"
+            log.debug("Suche nach Mails seit UID %s bzw. %s von %d Absendern", search_from, since_date, len(senders_by_email))
+            with measure("imap", "search") as m:
+                typ, data = imap.uid("search", None, search_query)
+                if typ != "OK":
+                    raise Exception(f"IMAP-Suchfehler: {data}")
+                # "n:*" liefert immer mindestens die höchste UID – daher clientseitig filtern
+                found_uids = [int(u) for u in data[0].split() if int(u) >= search_from]
+                found_uids = sorted(set(found_uids) | {int(uid) for uid in retry})
+                m.items = len(found_uids)
+            # Erst nur Header und Struktur laden, danach gezielt den HTML-Teil
+            with measure("imap", "headers") as m:
+                headers = imap_uid_fetch(imap, found_uids, "(BODYSTRUCTURE BODY.PEEK[HEADER.FIELDS (FROM DATE SUBJECT)])") if found_uids else {}
+                m.items = len(headers)
+                m.bytes = sum(len(meta) + sum(len(v) for v in items.values()) for meta, items in headers.values())
+            failed.update(uid for uid in found_uids if uid not in headers)
+            uids_by_sender = defaultdict(list)
+            mail_headers = {}
+            for uid, (meta, items) in headers.items():
+                max_uid = max(max_uid, uid)
+                header_bytes = next((v for k, v in items.items() if k.startswith("BODY[HEADER")), b"")
+                header = email.message_from_bytes(header_bytes)
+                sender = match_sender(header["From"], senders_by_email)
+                if not sender:
+                    continue
+                if uid <= last_uid and sender["email"].lower() not in new_senders and str(uid) not in retry:
+                    continue
+                uids_by_sender[sender["email"].lower()].append(uid)
+                mail_headers[uid] = (header, meta)
+            wanted = {}
+            for sender_email, uids in uids_by_sender.items():
+                for uid in sorted(uids)[-max_results_per_sender:]:
+                    wanted[uid] = senders_by_email[sender_email]
+            log.debug("%d Treffer, %d neue Mails werden geladen", len(found_uids), len(wanted))
+            # Je Teilnummer ein gemeinsamer FETCH, begrenzt auf SUBSTACK_HTML_MAX_BYTES
+            html_parts = {}
+            uids_by_part = defaultdict(list)
+            for uid in wanted:
+                meta = mail_headers[uid][1]
+                try:
+                    structure, _ = parse_imap_sexpr(meta, meta.index(b"BODYSTRUCTURE") + len(b"BODYSTRUCTURE"))
+                    html_parts[uid] = find_html_part(structure)
+                except ValueError as e:
+                    log.debug("BODYSTRUCTURE von Mail %s nicht lesbar (%s), lade vollständige Mail.", uid, e)
+                    html_parts[uid] = ("RFC822", None, None)
+                if html_parts[uid]:
+                    uids_by_part[html_parts[uid][0]].append(uid)
+            jobs = [("(RFC822)" if part == "RFC822" else f"(BODY.PEEK[{part}]<0.{SUBSTACK_HTML_MAX_BYTES}>)", uids)
+                    for part, uids in uids_by_part.items()]
+            with measure("imap", "bodies") as m:
+                bodies = fetch_bodies_parallel(imap, jobs, connections, email_user, email_password, selected_folder)
+                m.items = len(bodies)
+                m.bytes = sum(len(b) for b in bodies.values() if b)
+            tasks = []
+            for uid, sender in wanted.items():
+                sender_name = sender.get("name")
+                if not html_parts[uid]:
+                    errors[sender_name].append(f"Kein HTML-Inhalt in der Mail {uid} von {sender_name}.")
+                elif not bodies.get(uid):
+                    errors[sender_name].append(f"Fehler beim Abrufen der Mail {uid} von {sender_name}.")
+                    failed.add(uid)
+                else:
+                    part, encoding, charset = html_parts[uid]
+                    tasks.append((uid, (part, encoding, charset, bodies[uid], decode_mime_header(mail_headers[uid][0]["Subject"]))))
+            with measure("substack_parse", f"{parse_workers} Prozesse" if parse_workers > 1 else "inline") as m:
+                parsed = parse_substack_bodies([args for _, args in tasks], parse_workers)
+                m.items = len(parsed)
+                m.bytes = sum(len(args[3]) for _, args in tasks)
+            for (uid, _), extracted in zip(tasks, parsed):
+                sender = wanted[uid]
+                sender_name = sender.get("name")
+                header = mail_headers[uid][0]
+                if isinstance(extracted, Exception):
+                    errors[sender_name].append(f"Fehler bei Mail {uid} von {sender_name}: {str(extracted)}")
+                    failed.add(uid)
+                    continue
+                if not extracted:
+                    errors[sender_name].append(f"Kein HTML-Inhalt in der Mail {uid} von {sender_name}.")
+                    continue
+                mail_date = None
+                if header["Date"]:
+                    try:
+                        mail_date = parsedate_to_datetime(header["Date"])
+                    except (TypeError, ValueError) as e:
+                        log.debug("Ungültiges Datum in Mail %s von %s: %s, Fehler: %s", uid, sender_name, header["Date"], e)
+                title, link, teaser = extracted
+                state["posts"][str(uid)] = {
+                    "sender": sender["email"],
+                    "title": title,
+                    "link": link,
+                    "teaser": teaser,
+                    "date": mail_date.isoformat() if mail_date else None,
+                    "timestamp": mail_date.timestamp() if mail_date else None,
+                }
+        # Wasserstand = höchste UID, deren Kopfzeilen vorlagen; Fehlschläge darunter stehen in retry
+        state["last_uid"] = max_uid
+        state["retry"] = {}
+        for uid in sorted(failed):
+            attempts = retry.get(str(uid), 0) + 1
+            if attempts < SUBSTACK_RETRY_ATTEMPTS:
+                state["retry"][str(uid)] = attempts
+            else:
+                log.warning("⚠️ Mail %s in %s nach %d Versuchen aufgegeben.", uid, selected_folder, attempts)
+        state["senders"] = [s.get("email") for s in substack_senders if s.get("email")]
+        store.save()
+        log.debug("Substack-Wasserstand jetzt UID %s", state["last_uid"])
+    except Exception as e:
+        failure = f"Fehler beim Verbinden mit Gmail{' nach 3 Versuchen' if imap is None else ''}: {str(e)}"
+    finally:
+        if imap is not None:
+            try:
+                imap.logout()
+            except Exception as e:
+                log.debug("IMAP-Logout fehlgeschlagen: %s", e)
+    if failure:
+        # Der Wasserstand bleibt stehen; gezeigt wird, was frühere Läufe gespeichert haben
+        log.warning("⚠️ Substack: %s – zeige gespeicherte Posts.", failure)
+        posts.append(NewsletterPost("Allgemein", error=failure))
+        state = next((store.data[f] for f in [selected_folder, *folders] if f in store.data), {"posts": {}})
+
+    # Ausgabe aus dem lokalen Speicher: neueste Posts je Absender aus den letzten 7 Tagen
+    stored_by_sender = defaultdict(list)
+    for post in state["posts"].values():
+        mail_date = datetime.fromisoformat(post["date"]) if post["date"] else None
+        if mail_date and mail_date.timestamp() < since.timestamp():
+            continue
+        stored_by_sender[post["sender"]].append(post | {"date": mail_date})
+    for sender in substack_senders:
+        sender_email = sender.get("email")
+        sender_name = sender.get("name")
+        sender_order = sender.get("order", 999)
+        sender_posts = [NewsletterPost(sender_name, sender_order, p["title"], p["link"], p["teaser"], p["date"])
+                        for p in stored_by_sender.get(sender_email, [])]
+        sender_posts.sort(key=lambda p: p.sort_key, reverse=True)
+        sender_posts = sender_posts[:max_results_per_sender]
+        sender_posts += [NewsletterPost(sender_name, sender_order, error=message) for message in errors.get(sender_name, [])]
+        if not sender_posts and sender_email and not failure:
+            sender_posts.append(NewsletterPost(sender_name, sender_order,
+                                               note=f"📭 Keine Mails von {sender_name} in den letzten 7 Tagen gefunden."))
+        posts.extend(sender_posts)
+    
+    return posts if posts else [NewsletterPost("Allgemein", note="Keine neuen Substack-Mails gefunden.")]
+
+# === Test Substack-E-Mail-Zugriff ===
+def test_substack_email_access(folder="[Gmail]/Alle Nachrichten"):
+    """Testet, ob Substack-Mails in der Gmail-Posteingang ausgelesen werden können."""
+    log.info("🔍 Teste Substack-E-Mail-Zugriff...")
+    
+    substack_mail = os.getenv("SUBSTACK_MAIL")
+    if not substack_mail:
+        return "❌ Fehler: SUBSTACK_MAIL Umgebungsvariable nicht gefunden!"
+    try:
+        mail_config = dict(pair.split("=", 1) for pair in substack_mail.split(";"))
+        email_user = mail_config.get("GMAIL_USER")
+        email_password = mail_config.get("GMAIL_PASS")
+        if not email_user or not email_password:
+            return f"❌ Fehler: GMAIL_USER oder GMAIL_PASS fehlen in SUBSTACK_MAIL: {mail_config}"
+    except ValueError as e:
+        return f"❌ Fehler beim Parsen von SUBSTACK_MAIL: {str(e)}"
+    
+    try:
+        with open(SUBSTACKS_FILE, "r") as f:
+            substack_senders = json.load(f)
+    except FileNotFoundError:
+        return "❌ Fehler: substacks.json nicht gefunden!"
+    except json.JSONDecodeError:
+        return "❌ Fehler: substacks.json ungültig!"
+    
+    try:
+        imap = imap_connect()
+        imap.login(email_user, email_password)
+        log.info("✅ Gmail-Login erfolgreich für %s", email_user)
+        
+        folders = [folder, "INBOX", "[Gmail]/Updates"]
+        results = []
+        for f in folders:
+            try:
+                imap.select(f)
+                log.debug("Ausgewählter Ordner: %s", f)
+                typ, data = imap.search(None, 'ALL')
+                total_mails = len(data[0].split())
+                log.debug("Anzahl Mails im Ordner %s: %d", f, total_mails)
+                
+                for sender in substack_senders:
+                    sender_email = sender.get("email")
+                    sender_name = sender.get("name")
+                    if not sender_email:
+                        results.append(f"⚠️ {sender_name}: Keine E-Mail-Adresse angegeben.")
+                        continue
+                    search_query = f'(FROM "{sender_email}")'
+                    log.debug("Suche nach: %s", search_query)
+                    typ, data = imap.search(None, search_query)
+                    if typ != "OK":
+                        results.append(f"❌ {sender_name} ({sender_email}): IMAP-Suchfehler: {data}")
+                        continue
+                    mail_ids = data[0].split()
+                    results.append(f"📬 {sender_name} ({sender_email}): {len(mail_ids)} Mails gefunden in {f}")
+            except Exception as e:
+                results.append(f"❌ Fehler bei Ordner {f}: {str(e)}")
+        imap.logout()
+        return "\n".join(results) if results else "❌ Keine Ergebnisse."
+    except Exception as e:
+        return f"❌ Fehler beim Gmail-Zugriff: {str(e)}"
+
+# === Börsendaten & Wechselkurse abrufen ===
+INDEX_SYMBOLS = {
+    "Hang Seng Index (HSI)": "^HSI",
+    "Hang Seng China Enterprises (HSCEI)": "^HSCE",
+    "SSE Composite Index (Shanghai)": "000001.SS",
+    "Shenzhen Component Index": "399001.SZ"
+}
+# Börse je Index-Symbol für den Handelskalender; Währungen laufen ohne Kalender
+SYMBOL_MARKETS = {"^HSI": "hk", "^HSCE": "hk", "000001.SS": "china", "399001.SZ": "china"}
+CURRENCY_SYMBOLS = {
+    "USDCNY": "USDCNY=X",
+    "USDCNH": "USDCNH=X",
+    "HKDUSD": "HKDUSD=X",
+}
+YAHOO_SPARK_URL = "https://query1.finance.yahoo.com/v8/finance/spark"
+YAHOO_CHART_URL = "https://query1.finance.yahoo.com/v8/finance/chart/{symbol}"
+YAHOO_BATCH_SIZE = 20
+YAHOO_RANGE = "5d"  # genug Puffer, um Kurse an Feiertagen zu verwerfen
+
+@dataclass(slots=True, frozen=True)
+class Quote:
+    """Schlusskurs eines Index/Währungspaars samt Vergleichskurs; bei Fehlern ist error gesetzt."""
+    name: str
+    symbol: str
+    last: float = None
+    previous: float = None
+    error: str = None
+    bars: list = None  # [(Datum ISO, Schlusskurs)] aus der Yahoo-Reihe, für den lokalen Verlauf
+    as_of: str = None  # gesetzt, wenn der Kurs aus dem Verlauf stammt (Yahoo nicht erreichbar)
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    @property
+    def change(self):
+        return self.last - self.previous
+
+    @property
+    def pct(self):
+        return (self.change / self.previous) * 100 if self.previous else 0
+
+    @property
+    def arrow(self):
+        return "→" if abs(self.pct) < 0.01 else "↑" if self.change > 0 else "↓"
+
+    def inverted(self, name):
+        """Kehrwert-Kurs, z. B. HKD/USD → USD/HKD."""
+        if not self.ok:
+            return self
+        return Quote(name, self.symbol, 1 / self.last, 1 / self.previous, as_of=self.as_of)
+
+    def error_line(self):
+        return f"❌ {self.name}: {self.error}"
+
+def quote_from_series(name, symbol, closes, chart_previous_close=None, timestamps=None, calendar=None):
+    """Baut ein Quote aus der Schlusskurs-Reihe von Yahoo (letzter vs. vorletzter Handelstag).
+
+    Mit Zeitstempeln und Kalender zählen nur Kurse an Handelstagen der Börse, und verglichen wird mit dem
+    Schlusskurs des laut Kalender vorherigen Handelstags (z. B. dem Tag vor der Golden Week).
+    """
+    market = SYMBOL_MARKETS.get(symbol)
+    if timestamps and calendar and market and len(timestamps) == len(closes or []):
+        by_day = {datetime.fromtimestamp(ts, MARKET_TZ).date(): c
+                  for ts, c in zip(timestamps, closes) if ts is not None and c is not None}
+        days = [d for d in by_day if calendar.is_trading_day(market, d)]
+        bars = [(d.isoformat(), by_day[d]) for d in days]
+        if days:
+            previous = by_day.get(calendar.previous_trading_day(market, days[-1]))
+            if previous is None:
+                previous = by_day[days[-2]] if len(days) >= 2 else chart_previous_close
+            if not previous:
+                return Quote(name, symbol, error="Keine gültigen Kursdaten verfügbar.")
+            return Quote(name, symbol, by_day[days[-1]], previous, bars=bars)
+    bars = None
+    if timestamps and len(timestamps) == len(closes or []):
+        bars = list({datetime.fromtimestamp(ts, MARKET_TZ).date().isoformat(): c
+                     for ts, c in zip(timestamps, closes) if ts is not None and c is not None}.items())
+    closes = [c for c in (closes or []) if c is not None]
+    if not closes:
+        return Quote(name, symbol, error="Keine gültigen Kursdaten verfügbar.")
+    previous = closes[-2] if len(closes) >= 2 else chart_previous_close
+    if not previous:
+        return Quote(name, symbol, error="Keine gültigen Kursdaten verfügbar.")
+    return Quote(name, symbol, closes[-1], previous, bars=bars)
+
+class MarketDataClient:
+    """Holt Kurse gebündelt über den Spark-Endpunkt von Yahoo (bis zu 20 Symbole pro Anfrage)."""
+
+    def __init__(self, policy=None, batch_size=YAHOO_BATCH_SIZE, calendar=None):
+        self.policy = policy or get_fetch_policy()
+        self.batch_size = batch_size
+        self.calendar = calendar
+
+    def quotes(self, symbols):
+        """symbols: {Anzeigename: Yahoo-Symbol} → {Anzeigename: Quote}, Reihenfolge wie übergeben."""
+        unique = list(dict.fromkeys(symbols.values()))
+        batches = [unique[i:i + self.batch_size] for i in range(0, len(unique), self.batch_size)]
+        series = {}
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            for batch_result in pool.map(self._fetch_batch, batches):
+                series.update(batch_result)
+            # Was der Batch-Endpunkt nicht geliefert hat, einzeln über den Chart-Endpunkt nachladen
+            missing = [s for s in unique if s not in series]
+            for symbol, result in zip(missing, pool.map(self._fetch_chart, missing)):
+                series[symbol] = result
+        results = {}
+        for name, symbol in symbols.items():
+            data = series[symbol]
+            if isinstance(data, str):
+                results[name] = Quote(name, symbol, error=data)
+            else:
+                results[name] = quote_from_series(name, symbol, *data, calendar=self.calendar)
+        return results
+
+    def _fetch_batch(self, symbols):
+        with measure("yahoo", "spark") as m:
+            try:
+                r = self.policy.get(YAHOO_SPARK_URL, params={"symbols": ",".join(symbols), "range": YAHOO_RANGE, "interval": "1d"})
+                m.bytes = len(r.content)
+                r.raise_for_status()
+                data = r.json()
+            except Exception as e:
+                m.error = str(e)
+                log.warning("Warnung: Sammelabfrage für %s fehlgeschlagen (%s), frage einzeln ab.", ",".join(symbols), e)
+                return {}
+            series = self._parse_spark(data, symbols)
+            m.items = len(series)
+            return series
+
+    @staticmethod
+    def _parse_spark(data, symbols):
+        series = {}
+        if "spark" in data:
+            # Älteres Antwortformat: {"spark": {"result": [{"symbol": ..., "response": [<chart>]}]}}
+            for item in (data["spark"].get("result") or []):
+                response = (item.get("response") or [None])[0]
+                if item.get("symbol") in symbols and response:
+                    closes = response["indicators"]["quote"][0]["close"]
+                    series[item["symbol"]] = (closes, response.get("meta", {}).get("chartPreviousClose"), response.get("timestamp"))
+        else:
+            for symbol in symbols:
+                item = data.get(symbol)
+                if item and item.get("close") is not None:
+                    series[symbol] = (item["close"], item.get("chartPreviousClose"), item.get("timestamp"))
+        return series
+
+    def _fetch_chart(self, symbol):
+        with measure("yahoo", symbol) as m:
+            try:
+                r = self.policy.get(YAHOO_CHART_URL.format(symbol=symbol), params={"interval": "1d", "range": YAHOO_RANGE})
+                m.bytes = len(r.content)
+                r.raise_for_status()
+                data = r.json()
+                if not data.get("chart") or not data["chart"].get("result"):
+                    m.error = "Keine Daten in der API-Antwort."
+                    return m.error
+                result = data["chart"]["result"][0]
+                m.items = 1
+                return (result["indicators"]["quote"][0]["close"], result.get("meta", {}).get("chartPreviousClose"), result.get("timestamp"))
+            except Exception as e:
+                m.error = str(e)
+                return f"Fehler beim Abrufen ({e})"
+
+def fetch_market_data(index_symbols=None, include_currencies=True, calendar=None):
+    """Holt Indizes (Standard: alle) und Wechselkurse in einem gemeinsamen Batch."""
+    symbols = dict(INDEX_SYMBOLS if index_symbols is None else index_symbols)
+    if include_currencies:
+        symbols.update(CURRENCY_SYMBOLS)
+    return MarketDataClient(calendar=calendar).quotes(symbols)
+
+# === 🗄️ Verlauf: Artikel & Schlusskurse (SQLite) ===
+HISTORY_DIR = os.path.join(BASE_DIR, "history_cache")
+HISTORY_DB_FILE = os.path.join(HISTORY_DIR, "history.db")
+HISTORY_PERIODS = (5, 20)  # Veränderung über 5 bzw. 20 gespeicherte Handelstage
+HISTORY_ARTICLE_DAYS = 90
+HISTORY_CLOSE_DAYS = 400
+
+HISTORY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS closes (
+    symbol TEXT NOT NULL,
+    day TEXT NOT NULL,
+    close REAL NOT NULL,
+    PRIMARY KEY (symbol, day)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS articles (
+    url_key TEXT PRIMARY KEY,
+    source TEXT NOT NULL,
+    title TEXT NOT NULL,
+    link TEXT NOT NULL,
+    score REAL,
+    first_seen TEXT NOT NULL,
+    last_seen TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS articles_first_seen ON articles (first_seen);
+CREATE INDEX IF NOT EXISTS articles_source ON articles (source, first_seen);
+"""
+
+class HistoryStore:
+    """Lokaler Verlauf aller bewerteten Artikel und der Tages-Schlusskurse (Indizes & Wechselkurse).
+
+    Daraus kommen die 5-/20-Tage-Veränderungen und die 🆕-Markierung – ohne größere Yahoo-Zeiträume
+    oder erneutes Laden alter Feeds. Jeder Lauf ergänzt die Schlusskurse der letzten Tage (range=5d),
+    so schließen sich Lücken durch ausgefallene Läufe von selbst.
+    """
+
+    def __init__(self, path=HISTORY_DB_FILE, today=None):
+        """path=None: nur im Speicher (Aufnahme/Wiedergabe, Benchmarks)."""
+        import sqlite3
+        self.today = (today or date.today()).isoformat()
+        if path:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            self.db = sqlite3.connect(path or ":memory:")
+            self.db.executescript(HISTORY_SCHEMA)
+        except sqlite3.Error as e:
+            log.warning("Warnung: Verlauf %s unbrauchbar, arbeite nur im Speicher: %s", path, e)
+            self.db = sqlite3.connect(":memory:")
+            self.db.executescript(HISTORY_SCHEMA)
+        # "Neu" ist ein Artikel nur, wenn es schon einen früheren Lauf gibt, mit dem er sich vergleichen lässt
+        self.has_past = self.db.execute("SELECT 1 FROM articles WHERE first_seen < ? LIMIT 1", (self.today,)).fetchone() is not None
+
+    def record_quotes(self, quotes):
+        """Speichert die Schlusskurse aller gültigen Quotes ({Name: Quote})."""
+        rows = {(q.symbol, day, close) for q in quotes.values() if q.ok and q.bars for day, close in q.bars}
+        with measure("history", "closes") as m, self.db:
+            self.db.executemany("INSERT INTO closes (symbol, day, close) VALUES (?, ?, ?) "
+                                "ON CONFLICT (symbol, day) DO UPDATE SET close = excluded.close", rows)
+            m.items = len(rows)
+
+    def change(self, symbol, periods, bars=()):
+        """Veränderung in % zwischen dem letzten Schlusskurs und dem periods Handelstage älteren; None bei zu kurzem Verlauf.
+
+        bars: noch nicht gespeicherte (Tag, Schlusskurs)-Paare, die wie gespeicherte zählen.
+        """
+        closes = dict(self.db.execute("SELECT day, close FROM closes WHERE symbol = ? ORDER BY day DESC LIMIT ?",
+                                      (symbol, periods + 1 + len(bars))))
+        closes.update(bars)
+        closes = [closes[day] for day in sorted(closes, reverse=True)[:periods + 1]]
+        if len(closes) <= periods or not closes[-1]:
+            return None
+        return (closes[0] / closes[-1] - 1) * 100
+
+    def last_quote(self, quote):
+        """Ersatz für ein fehlgeschlagenes Quote aus den zwei jüngsten gespeicherten Schlusskursen (sonst unverändert)."""
+        rows = self.db.execute("SELECT day, close FROM closes WHERE symbol = ? ORDER BY day DESC LIMIT 2",
+                               (quote.symbol,)).fetchall()
+        if len(rows) < 2 or not rows[1][1]:
+            return quote
+        as_of = date.fromisoformat(rows[0][0]).strftime("%d.%m.%Y")
+        return Quote(quote.name, quote.symbol, rows[0][1], rows[1][1], as_of=as_of)
+
+    def record_articles(self, source, articles):
+        """Speichert bewertete Articles; first_seen bleibt beim ersten Auftauchen stehen.
+
+        Trägt ein Article selbst eine Quelle (Google News, Feed-Abschnitte), gilt diese statt source.
+        """
+        rows = [(normalize_url(a.link), a.source or source, a.title, a.link, a.score, self.today, self.today)
+                for a in articles if a.link]
+        with measure("history", source or "gemischt") as m, self.db:
+            self.db.executemany("INSERT INTO articles (url_key, source, title, link, score, first_seen, last_seen) "
+                                "VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT (url_key) DO UPDATE SET "
+                                "last_seen = excluded.last_seen, score = max(articles.score, excluded.score)", rows)
+            m.items = len(rows)
+
+    def is_new(self, link):
+        """True, wenn der Artikel heute zum ersten Mal auftaucht (und es einen früheren Lauf gibt)."""
+        if not self.has_past or not link:
+            return False
+        row = self.db.execute("SELECT first_seen FROM articles WHERE url_key = ?", (normalize_url(link),)).fetchone()
+        return row is None or row[0] >= self.today
+
+    def view(self, quotes=(), articles=()):
+        """Unveränderlicher Auszug für das Rendern, ohne zu schreiben: welche der Articles heute neu sind und die
+        Veränderungen der Quotes – so, als wären beide schon gespeichert (record_snapshot folgt ggf. danach)."""
+        new_keys = frozenset()
+        if self.has_past:
+            known = {row[0] for row in self.db.execute("SELECT url_key FROM articles WHERE first_seen < ?", (self.today,))}
+            new_keys = frozenset(key for key in (normalize_url(a.link) for a in articles if a.link) if key not in known)
+        changes = {q.symbol: MappingProxyType({p: self.change(q.symbol, p, q.bars if q.ok and q.bars else ())
+                                               for p in HISTORY_PERIODS}) for q in quotes}
+        return HistoryView(new_keys, MappingProxyType(changes))
+
+    def close(self, prune=True):
+        """Löscht alte Einträge (außer bei prune=False, z. B. für einen rein lesenden Build) und schließt die Datenbank."""
+        today = date.fromisoformat(self.today)
+        if prune:
+            with self.db:
+                self.db.execute("DELETE FROM articles WHERE last_seen < ?", ((today - timedelta(days=HISTORY_ARTICLE_DAYS)).isoformat(),))
+                self.db.execute("DELETE FROM closes WHERE day < ?", ((today - timedelta(days=HISTORY_CLOSE_DAYS)).isoformat(),))
+        self.db.close()
+
+@dataclass(frozen=True)
+class HistoryView:
+    """Was das Rendern aus dem Verlauf braucht – ohne Datenbank, daher gefahrlos aus mehreren Threads nutzbar."""
+    new_keys: frozenset = frozenset()
+    changes: MappingProxyType = field(default_factory=lambda: MappingProxyType({}))
+
+    def is_new(self, link):
+        return bool(link) and normalize_url(link) in self.new_keys
+
+    def change(self, symbol, periods):
+        return self.changes.get(symbol, {}).get(periods)
+
+def quote_extra(history, q, invert=False):
+    """Zusatz hinter der Kurszeile: Stand (bei Rückgriff auf den Verlauf) und 5-/20-Tage-Veränderung."""
+    parts = [f"Stand {q.as_of}"] if q.as_of else []
+    changes = history_changes(history, q.symbol, invert=invert)
+    if changes:
+        parts.append(changes)
+    return " | ".join(parts) or None
+
+def history_changes(history, symbol, invert=False):
+    """"5T: +1.2 % | 20T: -3.4 %" aus dem lokalen Verlauf; None, solange noch zu wenig Schlusskurse gespeichert sind."""
+    if history is None:
+        return None
+    parts = []
+    for periods in HISTORY_PERIODS:
+        pct = history.change(symbol, periods)
+        if pct is None:
+            continue
+        if invert:
+            pct = (100 / (100 + pct) - 1) * 100
+        parts.append(f"{periods}T: {pct:+.1f} %")
+    return " | ".join(parts) or None
+
+def format_index_lines(quotes, history=None):
+    lines = []
+    for name in INDEX_SYMBOLS:
+        if name not in quotes:
+            continue  # Börse heute geschlossen, nicht abgefragt
+        q = quotes[name]
+        if not q.ok:
+            lines.append(ErrorItem(q.error_line()))
+            continue
+        lines.append(QuoteItem(name, str(round(q.last, 2)), q.arrow, q.pct,
+                               extra=quote_extra(history, q)))
+    return lines
+
+def format_currency_lines(quotes, history=None):
+    lines = []
+    fx_labels = [
+        (quotes["HKDUSD"].inverted("HKDUSD"), "CPR (HKD/USD)", True),
+        (quotes["USDCNY"], "USD/CNY (Onshore)", False),
+        (quotes["USDCNH"], "USD/CNH (Offshore)", False),
+    ]
+    for q, label, inverted in fx_labels:
+        if q.ok:
+            lines.append(QuoteItem(label, f"{q.last:.4f}", q.arrow, q.pct,
+                                   extra=quote_extra(history, q, invert=inverted)))
+        else:
+            lines.append(ErrorItem(q.error_line()))
+    cny, cnh = quotes["USDCNY"], quotes["USDCNH"]
+    if cny.ok and cnh.ok:
+        lines.append(QuoteItem("Spread CNH–CNY", f"{cnh.last - cny.last:+.4f}"))
+    return lines
+
+# === Stimmen von X ===
+x_accounts = [
+    {"account": "Sino_Market", "name": "CN Wire", "url": "https://x.com/Sino_Market"},
+    {"account": "tonychinaupdate", "name": "China Update", "url": "https://x.com/tonychinaupdate"},
+    {"account": "YuanTalks", "name": "YUAN TALKS", "url": "https://x.com/YuanTalks"},
+    {"account": "Brad_Setser", "name": "Brad Setser", "url": "https://x.com/Brad_Setser"},
+    {"account": "KennedyCSIS", "name": "Scott Kennedy", "url": "https://x.com/KennedyCSIS"},
+]
+
+def fetch_recent_x_posts(account, name, url):
+    return [LinkItem(f"{name} (@{account})", url)]
+
+# === Render Substack Posts ===
+def render_substack_items(posts):
+    """Wandelt NewsletterPosts in Briefing-Bausteine um (Absender als Zwischenüberschrift)."""
+    rendered = []
+    current_sender = None
+    for post in sorted(posts, key=lambda p: p.sort_key, reverse=True):
+        if post.sender != current_sender:
+            rendered.append(HeadlineItem(post.sender, level=3))
+            current_sender = post.sender
+        if post.error:
+            rendered.append(ErrorItem(f"❌ {post.error}"))
+        elif post.note:
+            rendered.append(NoteItem(post.note))
+        else:
+            date_str = post.date.strftime("%d.%m.%Y") if post.date else "Datum unbekannt"
+            rendered.append(LinkItem(post.title, post.link, meta=date_str, teaser=post.teaser or None))
+    return rendered
+
+# === Substack-Abschnitt ===
+def fetch_substack_section(substack_mail=None, commit=True):
+    """Liest die Zugangsdaten (substack_mail, sonst SUBSTACK_MAIL) und liefert die NewsletterPosts aller Absender
+    (bzw. ErrorItems). commit=False lässt den Substack-Speicher auf der Platte unverändert."""
+    substack_mail = substack_mail or os.getenv("SUBSTACK_MAIL")
+    if not substack_mail:
+        return [ErrorItem("❌ Fehler: SUBSTACK_MAIL Umgebungsvariable nicht gefunden!")]
+    try:
+        mail_pairs = substack_mail.split(";")
+        mail_config = {}
+        for pair in mail_pairs:
+            if "=" in pair:
+                key, value = pair.split("=", 1)
+                mail_config[key] = value
+        if "GMAIL_USER" not in mail_config or "GMAIL_PASS" not in mail_config:
+            missing_keys = [k for k in ["GMAIL_USER", "GMAIL_PASS"] if k not in mail_config]
+            return [ErrorItem(f"❌ Fehler: Fehlende Schlüssel in SUBSTACK_MAIL: {', '.join(missing_keys)}")]
+        email_user = mail_config["GMAIL_USER"]
+        email_password = mail_config["GMAIL_PASS"]
+        # Optional: IMAP_CONNECTIONS=3;PARSE_WORKERS=4 für parallelen Download bzw. paralleles Parsen
+        connections = int(mail_config.get("IMAP_CONNECTIONS", 1))
+        parse_workers = int(mail_config.get("PARSE_WORKERS", 0))
+        # Bei Aufnahme/Wiedergabe ohne Wasserstand, damit jeder Lauf dieselben IMAP-Befehle absetzt
+        store = SubstackStore(path=None) if _fixtures is not None else SubstackStore(readonly=not commit)
+        posts = fetch_substack_from_email(email_user, email_password, store=store, connections=connections,
+                                          parse_workers=parse_workers)
+        return posts
+    except ValueError as e:
+        return [ErrorItem(f"❌ Fehler beim Parsen von SUBSTACK_MAIL: {str(e)}")]
+
+# === 🧱 Briefing-Bausteine & Renderer ===
+@dataclass(slots=True)
+class HeadlineItem:
+    text: str
+    level: int = 2  # 2 = Abschnitt, 3 = Quelle/Absender
+
+@dataclass(slots=True)
+class LinkItem:
+    title: str
+    url: str
+    meta: str = None  # z. B. Datum
+    teaser: str = None
+    new: bool = False  # laut Verlauf seit dem letzten Lauf neu → 🆕
+    related: tuple = ()  # ((Quelle, Link), ...): dieselbe Geschichte bei anderen Quellen
+
+@dataclass(slots=True)
+class QuoteItem:
+    label: str
+    value: str
+    arrow: str = None
+    pct: float = None
+    extra: str = None  # z. B. "5T: +1.2 % | 20T: -3.4 %" aus dem Verlauf
+
+    @property
+    def text(self):
+        change = f" {self.arrow} ({self.pct:+.2f} %)" if self.pct is not None else ""
+        extra = f" · {self.extra}" if self.extra else ""
+        return f"{self.label}: {self.value}{change}{extra}"
+
+@dataclass(slots=True)
+class NoteItem:
+    text: str
+
+@dataclass(slots=True)
+class ErrorItem:
+    text: str
+
+BULLET_ITEMS = (LinkItem, QuoteItem)
+
+def is_web_url(url):
+    """Nur http(s)-Links werden verlinkt – Platzhalter wie "#" oder fremde Schemata bleiben reiner Text."""
+    return bool(url) and urlparse(url).scheme in ("http", "https")
+
+class BriefingRenderer:
+    """Schreibt Bausteine sofort beim Hinzufügen als HTML- und Text-Fragment mit.
+
+    Gerendert wird erst aus dem fertigen BriefingSnapshot, also nach dem letzten Abruf: Story-Cluster und
+    Verlauf brauchen alle Quellen. Das kostet nur Millisekunden gegenüber den Abrufen und erlaubt beliebig
+    viele Profile aus einem Snapshot. html()/text() setzen die Fragmente zusammen, auf Wunsch nur ausgewählte
+    Abschnitte (Varianten für einzelne Empfänger).
+    """
+
+    def __init__(self):
+        self.sections = []  # [(Schlüssel, HTML-Fragmente, Text-Fragmente)]
+        self.in_list = False
+        self.section("main")
+
+    def section(self, key):
+        """Beginnt einen neuen Abschnitt; alle folgenden Bausteine gehören zu key."""
+        if self.in_list:
+            self.html_parts.append("</ul>")
+            self.in_list = False
+        self.html_parts, self.text_parts = [], []
+        self.sections.append((key, self.html_parts, self.text_parts))
+
+    def add(self, item):
+        if isinstance(item, BULLET_ITEMS) and not self.in_list:
+            self.html_parts.append("<ul>")
+            self.in_list = True
+        elif not isinstance(item, BULLET_ITEMS) and self.in_list:
+            self.html_parts.append("</ul>")
+            self.in_list = False
+        if isinstance(item, HeadlineItem):
+            tag = f"h{item.level}"
+            self.html_parts.append(f"<{tag}>{escape_html(item.text)}</{tag}>")
+            self.text_parts.append(f"\n{'#' * item.level} {item.text}")
+        elif isinstance(item, LinkItem):
+            self.html_parts.append(self._link_html(item))
+            meta = f" ({item.meta})" if item.meta else ""
+            new = "🆕 " if item.new else ""
+            self.text_parts.append(f"• {new}{item.title}{meta}")
+            if is_web_url(item.url):
+                self.text_parts.append(f"  {item.url}")
+            if item.teaser:
+                self.text_parts.append(f"  {item.teaser}")
+            for label, url in item.related:
+                self.text_parts.append(f"  ↳ {label}: {url}")
+        elif isinstance(item, QuoteItem):
+            self.html_parts.append(f"<li>{escape_html(item.text)}</li>")
+            self.text_parts.append(f"• {item.text}")
+        elif isinstance(item, ErrorItem):
+            self.html_parts.append(f'<p style="color: #b00020;">{escape_html(item.text)}</p>')
+            self.text_parts.append(item.text)
+        else:
+            self.html_parts.append(f"<p>{escape_html(item.text)}</p>")
+            self.text_parts.append(item.text)
+
+    def extend(self, items):
+        for item in items:
+            self.add(item)
+
+    @staticmethod
+    def _link_html(item):
+        title = escape_html(item.title)
+        if is_web_url(item.url):
+            title = f'<a href="{escape_html(item.url, quote=True)}">{title}</a>'
+        line = f"<li>{'🆕 ' if item.new else ''}{title}"
+        if item.meta:
+            line += f' <span style="color: #666;">({escape_html(item.meta)})</span>'
+        if item.teaser:
+            line += f'<br><span style="color: #444;">{escape_html(item.teaser)}</span>'
+        if item.related:
+            links = ", ".join(f'<a href="{escape_html(url, quote=True)}">{escape_html(label)}</a>' if is_web_url(url)
+                              else escape_html(label) for label, url in item.related)
+            line += f'<br><span style="color: #666;">auch: {links}</span>'
+        return line + "</li>"
+
+    def _parts(self, index, keys):
+        return [part for key, *parts in self.sections if keys is None or key in keys for part in parts[index]]
+
+    def html(self, keys=None):
+        closing = ["</ul>"] if self.in_list else []
+        body = "\n".join(self._parts(0, keys) + closing)
+        return f"""\
+<html>
+  <head><meta charset="utf-8"></head>
+  <body style="background-color: white;">
+    <div style="background-color: white; padding: 20px; font-family: system-ui, sans-serif;">
+{body}
+    </div>
+  </body>
+</html>"""
+
+    def text(self, keys=None):
+        return "\n".join(self._parts(1, keys)).strip() + "\n"
+
+# === 🧭 Profile: ein Abruf, viele Briefings ===
+PROFILES_FILE = os.path.join(BASE_DIR, "profiles.json")
+SECTION_KEYS = ("intro", "markets", "currencies", "top", "nbs", "thinktanks", "x", "google", "scmp", "yicai",
+                "substack", "outro")
+RENDER_WORKERS = 8
+
+@dataclass(frozen=True)
+class BriefingProfile:
+    """Wer was bekommt: Abschnitte (in dieser Reihenfolge), Google-News-Sprachen, Mindest-Score, Substack-Auswahl.
+
+    substacks=None: alle Absender aus substacks.json; recipients=None: EMAIL_TO aus CONFIG ("a@x.de:markets" wie dort) –
+    das darf nur ein Profil sein, sonst bekäme jeder Leser mehrere Briefings.
+    """
+    name: str
+    greeting: str = "Guten Morgen!"
+    sections: tuple = SECTION_KEYS
+    languages: tuple = tuple(feeds_google_news)
+    min_score: float = 0
+    substacks: frozenset = None
+    recipients: tuple = None
+
+DEFAULT_PROFILE = BriefingProfile("standard", greeting="Guten Morgen, Hado!")
+
+def load_profiles(path=PROFILES_FILE):
+    """Liest profiles.json ([{"name": ..., "sections": [...], ...}]); ohne Datei gibt es nur das Standardprofil."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            entries = json.load(f)
+    except FileNotFoundError:
+        return [DEFAULT_PROFILE]
+    profiles = []
+    for entry in entries:
+        name = entry.get("name")
+        sections = tuple(entry.get("sections", SECTION_KEYS))
+        languages = tuple(entry.get("languages", DEFAULT_PROFILE.languages))
+        unknown = [s for s in sections if s not in SECTION_KEYS] + [lang for lang in languages if lang not in feeds_google_news]
+        if not name or unknown:
+            raise ValueError(f"Ungültiges Profil {name!r} in {path}: unbekannt {unknown}" if name else
+                             f"Profil ohne Namen in {path}")
+        substacks = entry.get("substacks")
+        recipients = entry.get("recipients")
+        profiles.append(BriefingProfile(
+            name, greeting=entry.get("greeting", DEFAULT_PROFILE.greeting), sections=sections, languages=languages,
+            min_score=entry.get("min_score", 0), substacks=frozenset(substacks) if substacks is not None else None,
+            recipients=tuple(recipients) if recipients is not None else None))
+    defaults = [p.name for p in profiles if p.recipients is None]
+    if len(defaults) > 1:
+        raise ValueError(f"Profile {defaults} in {path} haben keine Empfänger – nur eines darf an EMAIL_TO gehen")
+    return profiles
+
+@dataclass(frozen=True)
+class BriefingSnapshot:
+    """Alles, was ein Lauf abgerufen hat – unveränderlich, damit beliebig viele Profile parallel daraus rendern."""
+    created: datetime
+    china_open: bool
+    hk_open: bool
+    currencies_closed: bool
+    quotes: MappingProxyType  # Name -> Quote (nur Börsen, die heute handeln)
+    results: MappingProxyType  # Quelle -> Tupel aus Articles bzw. NewsletterPosts oder ErrorItems
+    google: MappingProxyType  # Sprache -> ((Kategorie, Article), ...), die Top-k je Quelle
+    history: HistoryView
+    timings: MappingProxyType
+    clusters: StoryClusters = field(default_factory=StoryClusters)
+    # Sprache -> (Article, ...): jeder bewertete, nur für den Verlauf
+    google_scanned: MappingProxyType = field(default_factory=lambda: MappingProxyType({}))
+
+def source_jobs(feeds, commit=True, substack_mail=None):
+    """Alle Abrufe außer den Marktdaten: Quelle -> (Funktion, args, kwargs).
+
+    commit=False: der Substack-Abruf schreibt seinen Speicher nicht fort; substack_mail ersetzt SUBSTACK_MAIL.
+
+    Google News liefert einen GoogleScan – zum Rendern nur die Top-k je Quelle, siehe top_google_articles.
+    """
+    jobs = {source: (rank_feed_entries, (url,), {"max_items": 30, "feeds": feeds}) for source, url in feeds_topchina.items()}
+    jobs["NBS"] = (collect_feed_section, (NBS_SECTION, feeds), {})
+    jobs["Think Tanks"] = (collect_feed_section, (THINKTANK_SECTION, feeds), {})
+    for lang, url in feeds_google_news.items():
+        jobs[f"Google News {lang}"] = (top_google_articles, (lang, url, feeds), {})
+    jobs["SCMP"] = (rank_feed_entries, (feeds_scmp_yicai["SCMP"],), {"feeds": feeds})
+    jobs["Yicai"] = (rank_feed_entries, (feeds_scmp_yicai["Yicai Global"],), {"feeds": feeds})
+    jobs["Substack"] = (fetch_substack_section, (), {"substack_mail": substack_mail, "commit": commit})
+    return jobs
+
+def source_fallback(name):
+    """Ersatzwert, wenn eine Quelle nichts geliefert hat: Google News ohne Artikel, sonst eine Fehlerzeile."""
+    if name.startswith("Google News ") and name[len("Google News "):] in feeds_google_news:
+        return lambda reason: None
+    return lambda reason: [ErrorItem(f"❌ {name}: {reason}")]
+
+def market_plan(calendar, today):
+    """Welche Kurse heute gezeigt werden: (china_open, hk_open, currencies_closed, {Name: Symbol})."""
+    china_open = calendar.is_trading_day("china", today)
+    hk_open = calendar.is_trading_day("hk", today)
+    currencies_closed = not (china_open and hk_open)
+    index_symbols = {n: sym for n, sym in INDEX_SYMBOLS.items() if calendar.is_trading_day(SYMBOL_MARKETS[sym], today)}
+    return china_open, hk_open, currencies_closed, {**index_symbols, **({} if currencies_closed else CURRENCY_SYMBOLS)}
+
+def freeze_snapshot(raw, history, calendar, today, timings):
+    """Macht aus den Rohergebnissen (Quelle -> Ergebnis) einen BriefingSnapshot; liest den Verlauf nur.
+
+    Kurse von Börsen, die heute nicht handeln, werden verworfen; fehlende Quellen bekommen ihren Ersatzwert.
+    Fortgeschrieben wird der Verlauf erst mit record_snapshot – nur bei echten Läufen, nicht für Vorschauen.
+    """
+    china_open, hk_open, currencies_closed, symbols = market_plan(calendar, today)
+    quotes = {name: q for name, q in raw.get("Marktdaten", {}).items() if name in symbols}
+    # Yahoo nicht erreichbar: lieber der letzte gespeicherte Schlusskurs (mit Datum) als eine Fehlerzeile
+    quotes = {name: q if q.ok else history.last_quote(q) for name, q in quotes.items()}
+
+    def result(name):
+        return raw[name] if name in raw else source_fallback(name)("Noch keine Daten.")
+
+    results = {name: tuple(result(name)) for name in [*feeds_topchina, "NBS", "Think Tanks", "SCMP", "Yicai", "Substack"]}
+    scans = {lang: result(f"Google News {lang}") for lang in feeds_google_news}
+    google = {lang: scan.candidates if scan else () for lang, scan in scans.items()}
+    scanned = {lang: scan.scanned if scan else () for lang, scan in scans.items()}
+
+    view = history.view(quotes.values(), [a for items in results.values() for a in items if isinstance(a, Article)]
+                        + [a for scanned in google.values() for _, a in scanned])
+    # Nachrichtenquellen sprachübergreifend zu Geschichten bündeln; Think Tanks und NBS bleiben für sich
+    news = [(name, a) for name in [*feeds_topchina, "SCMP", "Yicai"] for a in results[name] if isinstance(a, Article)]
+    news += [(f"Google News {lang}", a) for lang, scanned in google.items() for _, a in scanned]
+    return BriefingSnapshot(datetime.now(), china_open, hk_open, currencies_closed, MappingProxyType(quotes),
+                            MappingProxyType(results), MappingProxyType(google), view, MappingProxyType(dict(timings)),
+                            cluster_articles(news), MappingProxyType(scanned))
+
+def record_snapshot(history, snapshot):
+    """Schreibt Schlusskurse und jeden bewerteten Artikel des Snapshots einmal in den Verlauf – unabhängig vom Profil.
+
+    Von Google News auch die, die es nicht unter die Top-k ihrer Quelle geschafft haben.
+    """
+    if snapshot.quotes:
+        history.record_quotes(snapshot.quotes)
+    for name, items in snapshot.results.items():
+        if items and isinstance(items[0], Article):
+            history.record_articles(name, items)
+    for lang, scanned in snapshot.google_scanned.items():
+        if scanned:
+            history.record_articles(None, scanned)
+
+def collect_snapshot(commit=True, substack_mail=None):
+    """Ruft alle Quellen genau einmal parallel ab, schreibt den Verlauf fort und friert alles als BriefingSnapshot ein.
+
+    Gerendert wird danach, nicht mehr überlappend mit den Abrufen – siehe BriefingRenderer. commit=False (Vorschau,
+    Benchmark) liest Verlauf und Substack-Speicher nur, wie BriefingDaemon.build.
+    """
+    engine = FetchEngine()
+    feeds = FeedFetcher(cache=FeedCache() if _fixtures is None else None)
+    history = HistoryStore(HISTORY_DB_FILE if _fixtures is None else None)
+    # Nur Kurse von Börsen abfragen, die heute laut Kalender handeln
+    calendar = get_trading_calendar()
+    today = date.today()
+    _, _, currencies_closed, symbols = market_plan(calendar, today)
+    if symbols:
+        engine.submit("Marktdaten", fetch_market_data, index_symbols={n: s for n, s in symbols.items() if n in INDEX_SYMBOLS},
+                      include_currencies=not currencies_closed, calendar=calendar,
+                      fallback=lambda reason: {n: Quote(n, sym, error=reason) for n, sym in symbols.items()})
+    for name, (func, args, kwargs) in source_jobs(feeds, commit=commit, substack_mail=substack_mail).items():
+        engine.submit(name, func, *args, fallback=source_fallback(name), **kwargs)
+
+    raw = {name: engine.result(name) for name in engine.jobs}
+    engine.shutdown()
+    snapshot = freeze_snapshot(raw, history, calendar, today, engine.timings)
+    if commit:
+        record_snapshot(history, snapshot)
+    history.close(prune=commit)
+    feeds.close()
+    engine.report()
+    feeds.report()
+    return snapshot
+
+def render_section_intro(briefing, snapshot, profile, dedup):
+    date_str = snapshot.created.strftime("%d. %B %Y")
+    briefing.extend([NoteItem(profile.greeting), NoteItem(f"🗓️ {date_str}"),
+                     NoteItem("📬 Dies ist dein tägliches China-Briefing.")])
+
+def render_section_markets(briefing, snapshot, profile, dedup):
+    briefing.add(HeadlineItem("📊 Börsenindizes China (08:00 Uhr MESZ)"))
+    briefing.extend(format_index_lines(snapshot.quotes, history=snapshot.history))
+    if not snapshot.china_open:
+        briefing.add(NoteItem("📈 Heute kein Handelstag an den chinesischen Börsen."))
+    if not snapshot.hk_open:
+        briefing.add(NoteItem("📈 Heute kein Handelstag an der Börse Hongkong."))
+
+def render_section_currencies(briefing, snapshot, profile, dedup):
+    briefing.add(HeadlineItem("💱 Wechselkurse (08:00 Uhr MESZ)"))
+    if snapshot.currencies_closed:
+        briefing.add(NoteItem("📉 Heute keine aktuellen Wechselkurse."))
+    else:
+        briefing.extend(format_currency_lines(snapshot.quotes, history=snapshot.history))
+
+def render_section_top(briefing, snapshot, profile, dedup):
+    briefing.add(HeadlineItem("🏆 Top 5 China-Stories laut Google News"))
+    for source in feeds_topchina:
+        briefing.add(HeadlineItem(source, level=3))
+        briefing.extend(render_ranked_result(snapshot.results[source], dedup=dedup, history=snapshot.history,
+                                             min_score=profile.min_score))
+
+def render_section_nbs(briefing, snapshot, profile, dedup):
+    briefing.add(HeadlineItem("📈 NBS – Nationale Statistikdaten"))
+    briefing.extend(render_feed_section(NBS_SECTION, snapshot.results["NBS"], history=snapshot.history))
+
+def render_section_thinktanks(briefing, snapshot, profile, dedup):
+    briefing.add(HeadlineItem("🏛️ Think Tanks & Institute – letzte 7 Tage"))
+    briefing.extend(render_feed_section(THINKTANK_SECTION, snapshot.results["Think Tanks"], dedup=dedup,
+                                        history=snapshot.history, min_score=profile.min_score))
+
+def render_section_x(briefing, snapshot, profile, dedup):
+    briefing.add(HeadlineItem("📡 Stimmen & Perspektiven von X"))
+    for acc in x_accounts:
+        briefing.extend(fetch_recent_x_posts(acc["account"], acc["name"], acc["url"]))
+
+def render_section_google(briefing, snapshot, profile, dedup):
+    briefing.add(HeadlineItem("🌍 Google News – Nach Sprache & Quelle sortiert"))
+    aggregator = GoogleNewsAggregator(dedup=dedup, history=snapshot.history)
+    for lang in profile.languages:
+        for category, article in snapshot.google.get(lang, ()):
+            if article.score >= profile.min_score:
+                aggregator.add(category, article)
+    for cat_key, items in aggregator.groups():
+        briefing.section(f"google:{cat_key}")
+        briefing.extend(items)
+
+def render_section_scmp(briefing, snapshot, profile, dedup):
+    briefing.add(HeadlineItem("SCMP – Top-Themen"))
+    briefing.extend(render_ranked_result(snapshot.results["SCMP"], dedup=dedup, history=snapshot.history,
+                                         min_score=profile.min_score))
+
+def render_section_yicai(briefing, snapshot, profile, dedup):
+    briefing.add(HeadlineItem("Yicai Global – Top-Themen"))
+    briefing.extend(render_ranked_result(snapshot.results["Yicai"], dedup=dedup, history=snapshot.history,
+                                         min_score=profile.min_score))
+
+def render_section_substack(briefing, snapshot, profile, dedup):
+    briefing.add(HeadlineItem("📬 Aktuelle Substack-Artikel"))
+    result = snapshot.results["Substack"]
+    if result and isinstance(result[0], ErrorItem):
+        briefing.extend(result)
+        return
+    # Allgemeine Fehler (Gmail, substacks.json) betreffen jedes Profil
+    posts = [p for p in result if profile.substacks is None or p.sender in profile.substacks or p.sender == "Allgemein"]
+    briefing.extend(render_substack_items(posts))
+
+def render_section_outro(briefing, snapshot, profile, dedup):
+    briefing.add(NoteItem("Einen erfolgreichen Tag! 🌟"))
+
+SECTION_RENDERERS = {
+    "intro": render_section_intro,
+    "markets": render_section_markets,
+    "currencies": render_section_currencies,
+    "top": render_section_top,
+    "nbs": render_section_nbs,
+    "thinktanks": render_section_thinktanks,
+    "x": render_section_x,
+    "google": render_section_google,
+    "scmp": render_section_scmp,
+    "yicai": render_section_yicai,
+    "substack": render_section_substack,
+    "outro": render_section_outro,
+}
+
+def render_briefing(snapshot, profile=DEFAULT_PROFILE, footer=False):
+    """Rendert ein Profil aus dem Snapshot (ohne Netzwerk); liefert den BriefingRenderer (html()/text())."""
+    briefing = BriefingRenderer()
+    # Reihenfolge der Abschnitte = Vorrang: ein Artikel erscheint nur im ersten Abschnitt, der ihn zeigt
+    dedup = DedupIndex(clusters=snapshot.clusters)
+    for key in profile.sections:
+        briefing.section(key)
+        SECTION_RENDERERS[key](briefing, snapshot, profile, dedup)
+    log.info("🔁 Duplikate unterdrückt (%s): %d", profile.name, dedup.duplicates)
+    briefing.timings = dict(snapshot.timings)
+    if footer:
+        briefing.section("report")
+        briefing.add(NoteItem(get_run_report().footer_text()))
+    return briefing
+
+def render_profiles(snapshot, profiles, footer=False):
+    """Rendert alle Profile parallel aus demselben Snapshot; liefert {Profilname: BriefingRenderer}.
+
+    Die Kosten wachsen nur mit dem Rendern – abgerufen wurde vorher genau einmal.
+    """
+    with ThreadPoolExecutor(max_workers=max(1, min(RENDER_WORKERS, len(profiles))), thread_name_prefix="render") as pool:
+        briefings = list(pool.map(lambda profile: render_briefing(snapshot, profile, footer=footer), profiles))
+    return {profile.name: briefing for profile, briefing in zip(profiles, briefings)}
+
+def generate_briefing(footer=False, profile=DEFAULT_PROFILE, commit=True, substack_mail=None):
+    """Erzeugt das Briefing für ein Profil; liefert den BriefingRenderer (html()/text()). footer=True hängt eine Laufzeit-Zeile an.
+
+    commit/substack_mail wie bei collect_snapshot.
+    """
+    start_run_report()
+    return render_briefing(collect_snapshot(commit=commit, substack_mail=substack_mail), profile, footer=footer)
+
+# === 📤 Versand ===
+# Varianten je Empfänger: EMAIL_TO=a@x.de,b@y.de:markets,c@z.de:de (ohne Angabe = full)
+BRIEFING_VARIANTS = {
+    "full": None,
+    "markets": {"intro", "markets", "currencies", "outro", "report"},
+    "de": {"intro", "markets", "currencies", "google", "google:DE", "outro", "report"},
+}
+SMTP_RETRIES = 3
+SMTP_BACKOFF = 2.0  # Sekunden, verdoppelt sich je Versuch
+SMTP_TIMEOUT = 30
+
+def parse_recipients(email_to):
+    """"a@x.de, b@y.de:markets" → [(Adresse, Variante)]; unbekannte Varianten fallen auf full zurück."""
+    recipients = []
+    for entry in (email_to or "").split(","):
+        address, _, variant = entry.strip().partition(":")
+        if not address:
+            continue
+        variant = variant.strip().lower() or "full"
+        if variant not in BRIEFING_VARIANTS:
+            log.warning("⚠️ Warnung: Unbekannte Variante '%s' für %s, sende full.", variant, address)
+            variant = "full"
+        recipients.append((address, variant))
+    return recipients
+
+def build_message(briefing, variant="full"):
+    """multipart/alternative: Text zuerst, HTML zuletzt (bevorzugt von Mail-Clients)."""
+    keys = BRIEFING_VARIANTS[variant]
+    msg = MIMEMultipart("alternative")
+    msg.attach(MIMEText(briefing.text(keys), "plain", "utf-8"))
+    msg.attach(MIMEText(briefing.html(keys), "html", "utf-8"))
+    return msg
+
+@dataclass
+class DeliveryResult:
+    recipient: str
+    variant: str
+    ok: bool
+    seconds: float
+    attempts: int
+    error: str = None
+
+class SMTPDelivery:
+    """Eine authentifizierte SMTP-Verbindung für alle Empfänger; vorübergehende 4xx-Fehler werden mit Backoff wiederholt.
+
+    Ohne Passwort wird kein Login versucht und starttls=False erlaubt Tests gegen einen lokalen SMTP-Server (z. B. aiosmtpd).
+    """
+
+    def __init__(self, host, port, user=None, password=None, starttls=True, retries=SMTP_RETRIES, backoff=SMTP_BACKOFF,
+                 timeout=SMTP_TIMEOUT):
+        self.host, self.port = host, int(port)
+        self.user, self.password = user, password
+        self.starttls = starttls
+        self.retries, self.backoff, self.timeout = retries, backoff, timeout
+        self.server = None
+        self.handshakes = 0
+        self.fatal = None  # z. B. falsches Passwort: nicht für jeden Empfänger erneut versuchen
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def connect(self):
+        import smtplib
+        self.close()
+        with measure("smtp", "connect"):
+            server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+            try:
+                if self.starttls:
+                    server.starttls()
+                if self.password:
+                    server.login(self.user, self.password)
+            except Exception:
+                server.close()
+                raise
+        self.server = server
+        self.handshakes += 1
+
+    def close(self):
+        if self.server is not None:
+            try:
+                self.server.quit()
+            except Exception:
+                self.server.close()
+            self.server = None
+
+    def send(self, msg, recipient, variant="full"):
+        """Schickt msg an einen Empfänger über die offene Verbindung (bei Bedarf neu aufgebaut)."""
+        result = self._send(msg, recipient, variant)
+        record = StageRecord()
+        record.items = int(result.ok)
+        record.retries = max(0, result.attempts - 1)
+        record.error = result.error
+        get_run_report().add("smtp", recipient, result.seconds, record)
+        return result
+
+    def _send(self, msg, recipient, variant):
+        import smtplib
+        start = time.perf_counter()
+        if self.fatal:
+            return DeliveryResult(recipient, variant, False, 0.0, 0, self.fatal)
+        error = None
+        for attempt in range(1, self.retries + 2):
+            code = None
+            try:
+                if self.server is None:
+                    self.connect()
+                del msg["To"]
+                msg["To"] = recipient
+                refused = self.server.send_message(msg, to_addrs=[recipient])
+                if not refused:
+                    return DeliveryResult(recipient, variant, True, time.perf_counter() - start, attempt)
+                code, response = refused[recipient]
+                error = f"{code} {response!r}"
+            except smtplib.SMTPAuthenticationError as e:
+                self.fatal = f"Login fehlgeschlagen: {e.smtp_code} {e.smtp_error!r}"
+                return DeliveryResult(recipient, variant, False, time.perf_counter() - start, attempt, self.fatal)
+            except smtplib.SMTPRecipientsRefused as e:
+                code, response = e.recipients.get(recipient, (None, b""))
+                error = f"{code} {response!r}"
+            except smtplib.SMTPResponseException as e:
+                code, error = e.smtp_code, f"{e.smtp_code} {e.smtp_error!r}"
+            except (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, OSError) as e:
+                # Verbindung weg: beim nächsten Versuch neu verbinden und wie einen 4xx-Fehler behandeln
+                self.server = None
+                code, error = 421, str(e)
+            except smtplib.SMTPException as e:
+                error = str(e)
+            if code is None or not 400 <= code < 500 or attempt > self.retries:
+                break
+            delay = self.backoff * 2 ** (attempt - 1)
+            log.warning("⚠️ %s: vorübergehender Fehler (%s), neuer Versuch in %.0fs", recipient, error, delay)
+            time.sleep(delay)
+        return DeliveryResult(recipient, variant, False, time.perf_counter() - start, attempt, error)
+
+def report_delivery(results):
+    log.info("📤 Zustellung je Empfänger:")
+    for r in results:
+        status = "ok" if r.ok else f"Fehler: {r.error}"
+        log.info("   %-32s %-8s %6.2f s  %d Versuch(e)  (%s)", r.recipient, r.variant, r.seconds, r.attempts, status)
+
+def send_briefing(briefing, config_dict=None):
+    """Verschickt das Briefing an alle Empfänger aus EMAIL_TO über eine SMTP-Verbindung; liefert True, wenn alle ankamen."""
+    return send_briefings([(DEFAULT_PROFILE, briefing)], config_dict)
+
+def send_briefings(deliveries, config_dict=None):
+    """Verschickt [(Profil, Briefing)] über eine gemeinsame SMTP-Verbindung; liefert True, wenn alle Empfänger erreicht wurden.
+
+    Empfänger kommen aus dem Profil, sonst aus EMAIL_TO. Jede Adresse bekommt nur ein Briefing: ausdrücklich
+    genannte Empfänger gehen vor EMAIL_TO, sonst gewinnt das erste Profil.
+    """
+    config_dict = config_dict or load_config()
+    jobs, assigned = [], {}
+    for profile, briefing in sorted(deliveries, key=lambda d: d[0].recipients is None):
+        email_to = ",".join(profile.recipients) if profile.recipients is not None else config_dict["EMAIL_TO"]
+        for address, variant in parse_recipients(email_to):
+            if address.lower() in assigned:
+                log.warning("⚠️ Warnung: %s bekommt schon Profil %s, nicht zusätzlich %s.", address,
+                            assigned[address.lower()], profile.name)
+                continue
+            assigned[address.lower()] = profile.name
+            jobs.append((profile, briefing, address, variant))
+    messages = {}
+
+    log.info("📤 Sende E-Mail an %d Empfänger...", len(jobs))
+    results = []
+    with SMTPDelivery(config_dict["EMAIL_HOST"], config_dict["EMAIL_PORT"], config_dict.get("EMAIL_USER"),
+                      config_dict.get("EMAIL_PASSWORD"),
+                      starttls=config_dict.get("EMAIL_STARTTLS", "1").lower() not in ("0", "false", "no")) as delivery:
+        for profile, briefing, address, variant in jobs:
+            label = variant if len(deliveries) == 1 else f"{profile.name}/{variant}"
+            if label not in messages:
+                msg = build_message(briefing, variant)
+                msg["Subject"] = "📰 Dein tägliches China-Briefing"
+                msg["From"] = config_dict["EMAIL_USER"]
+                messages[label] = msg
+            results.append(delivery.send(messages[label], address, label))
+    report_delivery(results)
+    log.info("🤝 SMTP-Verbindungen: %d", delivery.handshakes)
+    if results and all(r.ok for r in results):
+        log.info("✅ E-Mail wurde gesendet!")
+        return True
+    log.error("❌ Fehler beim Senden der E-Mail: %d von %d Empfängern nicht erreicht.", sum(not r.ok for r in results), len(results))
+    return False
+
+# === 🕰️ Daemon: warme Quellen, Versand zur festen Uhrzeit ===
+DAEMON_SEND_AT = "05:00"  # UTC, wie der Cron-Job im Workflow
+DAEMON_PORT = 8787  # nur 127.0.0.1; 0 = kein HTTP-Auslöser
+DAEMON_DEFAULT_CADENCE = 60 * 60  # Google News, SCMP, Yicai: stündlich
+DAEMON_CADENCES = {  # Sekunden zwischen zwei Abrufen einer Quelle
+    "NBS": 6 * 60 * 60,
+    "Think Tanks": 24 * 60 * 60,
+    "Substack": 15 * 60,  # nur ohne IMAP IDLE; mit IDLE löst jede neue Mail den Abruf aus
+}
+DAEMON_IDLE_SAFETY = 6 * 60 * 60  # Substack trotz IDLE gelegentlich abrufen, falls eine Meldung verloren ging
+DAEMON_RETRY_DELAY = 5 * 60  # fehlgeschlagene Quellen früher erneut versuchen
+MARKET_REFRESH_TIMES = ((11, 35), (16, 15))  # MARKET_TZ: Mittagspause Shanghai/Shenzhen, Handelsschluss Hongkong
+SUBSTACK_FOLDERS = ["[Gmail]/Alle Nachrichten", "INBOX", "[Gmail]/Updates"]
+IMAP_IDLE_TIMEOUT = 25 * 60  # RFC 2177: IDLE spätestens nach 29 Minuten erneuern
+IMAP_IDLE_BACKOFF = (5, 600)  # Sekunden bis zum Neuverbinden: Start, Maximum
+
+def parse_send_time(text):
+    """"05:00" → (5, 0); ValueError bei ungültiger Uhrzeit."""
+    hour, _, minute = text.partition(":")
+    try:
+        hour, minute = int(hour), int(minute or 0)
+    except ValueError:
+        hour = -1
+    if not (0 <= hour < 24 and 0 <= minute < 60):
+        raise ValueError(f"Ungültige Versandzeit '{text}' (erwartet HH:MM in UTC)")
+    return hour, minute
+
+def next_daily(now, times, tz):
+    """Nächster Zeitpunkt nach now, an dem eine der Uhrzeiten [(h, m)] in der Zeitzone tz erreicht ist."""
+    local = now.astimezone(tz)
+    for days in (0, 1):
+        day = local.date() + timedelta(days=days)
+        for hour, minute in sorted(times):
+            at = datetime(day.year, day.month, day.day, hour, minute, tzinfo=tz)
+            if at > local:
+                return at.astimezone(timezone.utc)
+
+def imap_idle(imap, timeout, stop=None):
+    """Ein IDLE-Durchgang (RFC 2177) auf einer imaplib-Verbindung; True, wenn der Server neue Mails (EXISTS) meldet.
+
+    imaplib kann IDLE (noch) nicht, daher von Hand: Befehl senden, auf "+" warten, Meldungen lesen, "DONE".
+    """
+    import imaplib
+    import select
+    tag = b"IDLE%d" % random.randrange(10 ** 6)
+    imap.send(tag + b" IDLE\r\n")
+    line = imap.readline()
+    if not line.startswith(b"+"):
+        raise imaplib.IMAP4.error(f"IDLE abgelehnt: {line.strip()!r}")
+    sock = imap.socket()
+    new_mail = False
+    deadline = time.monotonic() + timeout
+    while not new_mail and time.monotonic() < deadline and not (stop and stop.is_set()):
+        # Kurze Wartescheiben, damit ein Stopp nicht bis zum Ablauf des IDLE hängt
+        pending = sock.pending() if hasattr(sock, "pending") else 0
+        if pending or select.select([sock], [], [], min(30, max(0, deadline - time.monotonic())))[0]:
+            line = imap.readline()
+            if not line:
+                raise imaplib.IMAP4.abort("Verbindung während IDLE geschlossen")
+            new_mail = b"EXISTS" in line
+    imap.send(b"DONE\r\n")
+    while not line.startswith(tag):
+        line = imap.readline()
+        if not line:
+            raise imaplib.IMAP4.abort("Verbindung während IDLE geschlossen")
+        new_mail = new_mail or b"EXISTS" in line
+    return new_mail
+
+class BriefingDaemon:
+    """Hält jede Quelle in ihrem eigenen Takt warm und setzt das Briefing zur Versandzeit ohne Netzwerk zusammen.
+
+    Kurse nach Handelsschluss, Google News stündlich, Think Tanks täglich, Substack bei neuer Mail (IMAP IDLE).
+    Schlägt ein Abruf fehl, bleibt das letzte gute Ergebnis stehen. Sofort-Versand per SIGUSR1 oder POST /send.
+    """
+
+    def __init__(self, send_at=DAEMON_SEND_AT, profiles=None, config_dict=None, footer=False, dry_run=False,
+                 after_send=None):
+        self.send_at = parse_send_time(send_at)
+        self.profiles = profiles or [DEFAULT_PROFILE]
+        self.config_dict = config_dict
+        self.footer, self.dry_run, self.after_send = footer, dry_run, after_send
+        self.cache = FeedCache() if _fixtures is None else None
+        self.calendar = get_trading_calendar()
+        self.names = ["Marktdaten", *source_jobs(FeedFetcher(cache=self.cache))]
+        self.executor = ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix="refresh")
+        self.lock = threading.Lock()
+        self.build_lock = threading.Lock()
+        self.wake = threading.Event()
+        self.stopped = threading.Event()
+        self.results = {}  # Quelle -> letztes brauchbares Ergebnis
+        self.refreshed = {}  # Quelle -> (Zeitpunkt UTC, Status, Dauer in s)
+        self.due = {}  # Quelle -> nächster Abruf (UTC)
+        self.running = set()
+        self.next_send = None
+        self.send_requested = False
+        self.idle_active = False
+
+    def cadence(self, name, now, ok):
+        """Nächster Abruf einer Quelle; Fehler werden nach spätestens DAEMON_RETRY_DELAY erneut versucht."""
+        if name == "Marktdaten" and ok:
+            return next_daily(now, MARKET_REFRESH_TIMES, MARKET_TZ)
+        seconds = DAEMON_CADENCES.get(name, DAEMON_DEFAULT_CADENCE)
+        if name == "Substack" and self.idle_active:
+            seconds = DAEMON_IDLE_SAFETY
+        return now + timedelta(seconds=seconds if ok else min(seconds, DAEMON_RETRY_DELAY))
+
+    def refresh(self, name):
+        """Ruft eine Quelle ab und übernimmt das Ergebnis, sofern es brauchbar ist (läuft im Thread-Pool)."""
+        start = time.monotonic()
+        try:
+            with measure("section", name) as m:
+                if name == "Marktdaten":
+                    result = fetch_market_data(calendar=self.calendar)
+                else:
+                    # Frischer FeedFetcher je Abruf: er merkt sich Feeds sonst für immer; der FeedCache bleibt geteilt
+                    feeds = FeedFetcher(cache=self.cache)
+                    try:
+                        func, args, kwargs = source_jobs(feeds)[name]
+                        result = func(*args, **kwargs)
+                    finally:
+                        feeds.close()
+                m.items = len(result) if hasattr(result, "__len__") else 0
+            if name == "Marktdaten":
+                ok = all(q.ok for q in result.values())
+            else:
+                ok = result is not None and not (isinstance(result, list) and result and isinstance(result[0], ErrorItem))
+        except Exception as e:
+            reason = f"Fehler beim Abrufen ({e})"
+            if name == "Marktdaten":
+                result = {n: Quote(n, sym, error=reason) for n, sym in {**INDEX_SYMBOLS, **CURRENCY_SYMBOLS}.items()}
+            else:
+                result = source_fallback(name)(reason)
+            ok = False
+        duration = time.monotonic() - start
+        now = datetime.now(timezone.utc)
+        with self.lock:
+            previous = self.results.get(name)
+            if name == "Marktdaten" and isinstance(result, dict) and previous:
+                # Einzelne Kurse, die diesmal fehlen, behalten ihren letzten guten Wert
+                result = {n: q if q.ok or n not in previous else previous[n] for n, q in result.items()}
+                self.results[name] = result
+            elif ok or previous is None:
+                self.results[name] = result
+            self.refreshed[name] = (now, "ok" if ok else "Fehler", duration)
+            self.due[name] = self.cadence(name, now, ok)
+            self.running.discard(name)
+        if ok:
+            log.info("🔄 %s aktualisiert (%.2f s), nächster Abruf %s UTC", name, duration, self.due[name].strftime("%d.%m. %H:%M"))
+        else:
+            log.warning("⚠️ %s: Abruf fehlgeschlagen (%.2f s), %s", name, duration,
+                        "letztes Ergebnis bleibt stehen" if previous is not None else "noch keine Daten")
+        self.wake.set()
+
+    def refresh_soon(self, name):
+        with self.lock:
+            self.due[name] = datetime.now(timezone.utc)
+        self.wake.set()
+
+    def request_send(self):
+        """Briefing sofort aus dem warmen Zustand erzeugen und versenden (auch aus Signal-Handlern aufrufbar)."""
+        self.send_requested = True
+        self.wake.set()
+
+    def stop(self):
+        self.stopped.set()
+        self.wake.set()
+
+    def build(self):
+        """Friert den warmen Zustand als BriefingSnapshot ein – ohne Netzwerk, typischerweise in Millisekunden.
+
+        Liest den Verlauf nur: eine Vorschau (GET /briefing) verbraucht keine 🆕-Markierungen.
+        """
+        with self.lock:
+            raw = dict(self.results)
+            timings = {name: (duration, status) for name, (_, status, duration) in self.refreshed.items()}
+        # SQLite-Verbindungen gehören ihrem Thread: der Verlauf wird je Build geöffnet
+        history = HistoryStore(HISTORY_DB_FILE if _fixtures is None else None)
+        try:
+            return freeze_snapshot(raw, history, self.calendar, date.today(), timings)
+        finally:
+            history.close(prune=False)
+
+    def commit(self, snapshot):
+        """Schreibt einen versendeten Snapshot in den Verlauf."""
+        history = HistoryStore(HISTORY_DB_FILE if _fixtures is None else None)
+        try:
+            record_snapshot(history, snapshot)
+        finally:
+            history.close()
+
+    def build_and_send(self):
+        """Setzt alle Profile aus dem warmen Zustand zusammen und versendet sie; danach beginnt ein neuer Laufbericht."""
+        with self.build_lock:
+            try:
+                start = time.monotonic()
+                snapshot = self.build()
+                briefings = render_profiles(snapshot, self.profiles, footer=self.footer)
+                log.info("⚡ Briefing für %d Profil(e) in %.3f s aus warmem Zustand erzeugt.", len(self.profiles),
+                         time.monotonic() - start)
+                if self.dry_run:
+                    log.info("🧪 Probelauf: kein Versand, Verlauf bleibt unverändert.")
+                else:
+                    send_briefings([(profile, briefings[profile.name]) for profile in self.profiles], self.config_dict)
+                    self.commit(snapshot)
+                if self.after_send:
+                    self.after_send()
+            except Exception:
+                log.exception("❌ Fehler beim Erzeugen oder Versenden des Briefings")
+            finally:
+                start_run_report()
+
+    def status(self):
+        """Alter und Status jeder Quelle sowie der nächste Versand (für GET /status)."""
+        now = datetime.now(timezone.utc)
+        with self.lock:
+            sources = {}
+            for name in self.names:
+                at, state, duration = self.refreshed.get(name, (None, "ausstehend", None))
+                sources[name] = {"status": "läuft" if name in self.running else state,
+                                 "age_s": round((now - at).total_seconds()) if at else None,
+                                 "duration_s": round(duration, 3) if duration is not None else None,
+                                 "next": self.due[name].isoformat() if name in self.due else None}
+        return {"next_send": self.next_send.isoformat() if self.next_send else None, "imap_idle": self.idle_active,
+                "sources": sources}
+
+    def watch_imap(self):
+        """Hält eine IMAP-IDLE-Verbindung offen und stößt bei jeder neuen Mail sofort einen Substack-Abruf an."""
+        mail_config = dict(pair.split("=", 1) for pair in os.getenv("SUBSTACK_MAIL", "").split(";") if "=" in pair)
+        if "GMAIL_USER" not in mail_config or "GMAIL_PASS" not in mail_config:
+            log.info("📭 Kein SUBSTACK_MAIL: Substack wird ohne IMAP IDLE alle %d Minuten abgerufen.",
+                     DAEMON_CADENCES["Substack"] // 60)
+            return
+        delay = IMAP_IDLE_BACKOFF[0]
+        while not self.stopped.is_set():
+            imap = None
+            try:
+                imap, folder = open_substack_folder(mail_config["GMAIL_USER"], mail_config["GMAIL_PASS"], SUBSTACK_FOLDERS,
+                                                    attempts=1)
+                if "IDLE" not in imap.capabilities:
+                    log.warning("⚠️ IMAP-Server kann kein IDLE, Substack wird weiter regelmäßig abgerufen.")
+                    return
+                log.info("📬 IMAP IDLE aktiv (%s).", folder)
+                self.idle_active = True
+                delay = IMAP_IDLE_BACKOFF[0]
+                while not self.stopped.is_set():
+                    if imap_idle(imap, IMAP_IDLE_TIMEOUT, self.stopped):
+                        log.info("📬 Neue Mail – Substack wird aktualisiert.")
+                        self.refresh_soon("Substack")
+            except Exception as e:
+                self.idle_active = False
+                log.warning("⚠️ IMAP IDLE unterbrochen (%s), neuer Versuch in %d s.", e, delay)
+                self.stopped.wait(delay)
+                delay = min(delay * 2, IMAP_IDLE_BACKOFF[1])
+            finally:
+                if imap is not None:
+                    try:
+                        imap.logout()
+                    except Exception:
+                        pass
+        self.idle_active = False
+
+    def serve(self, port):
+        """Startet den HTTP-Auslöser auf 127.0.0.1: GET /status, GET /briefing?profile=..., POST /send."""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        daemon = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                params = dict(parse_qsl(url.query))
+                if url.path == "/status":
+                    self.reply(200, "application/json", json.dumps(daemon.status(), ensure_ascii=False, indent=1))
+                elif url.path == "/briefing":
+                    profiles = {profile.name: profile for profile in daemon.profiles}
+                    name = params.get("profile", daemon.profiles[0].name)
+                    if name not in profiles:
+                        self.reply(404, "text/plain", f"Unbekanntes Profil '{name}' (vorhanden: {', '.join(profiles)})\n")
+                        return
+                    briefing = render_briefing(daemon.build(), profiles[name])
+                    if params.get("format") == "text":
+                        self.reply(200, "text/plain", briefing.text())
+                    else:
+                        self.reply(200, "text/html", briefing.html())
+                else:
+                    self.reply(404, "text/plain", "Nicht gefunden\n")
+
+            def do_POST(self):
+                if urlparse(self.path).path == "/send":
+                    daemon.request_send()
+                    self.reply(202, "text/plain", "Versand angestoßen\n")
+                else:
+                    self.reply(404, "text/plain", "Nicht gefunden\n")
+
+            def reply(self, code, content_type, body):
+                data = body.encode("utf-8")
+                self.send_response(code)
+                self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                log.debug("HTTP %s " + format, self.address_string(), *args)
+
+        server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        threading.Thread(target=server.serve_forever, name="http", daemon=True).start()
+        log.info("🌐 Auslöser: http://127.0.0.1:%d/status, /briefing, POST /send", server.server_address[1])
+        return server
+
+    def run(self, port=DAEMON_PORT):
+        """Scheduler-Schleife bis stop(): fällige Quellen abrufen, zur Versandzeit (oder auf Anforderung) versenden."""
+        start_run_report()
+        now = datetime.now(timezone.utc)
+        with self.lock:
+            self.due = {name: now for name in self.names}  # Warmstart: alles einmal sofort
+        self.next_send = next_daily(now, [self.send_at], timezone.utc)
+        log.info("🕰️ Daemon gestartet: %d Quellen, Versand täglich %02d:%02d UTC (nächster: %s).", len(self.names),
+                 *self.send_at, self.next_send.strftime("%d.%m. %H:%M"))
+        server = self.serve(port) if port else None
+        if _fixtures is None:
+            threading.Thread(target=self.watch_imap, name="imap-idle", daemon=True).start()
+        try:
+            while not self.stopped.is_set():
+                self.wake.clear()
+                now = datetime.now(timezone.utc)
+                with self.lock:
+                    due = [name for name, at in self.due.items() if at <= now and name not in self.running]
+                    self.running.update(due)
+                for name in due:
+                    self.executor.submit(self.refresh, name)
+                if self.send_requested or now >= self.next_send:
+                    if now >= self.next_send:
+                        self.next_send = next_daily(now, [self.send_at], timezone.utc)
+                    self.send_requested = False
+                    threading.Thread(target=self.build_and_send, name="send", daemon=True).start()
+                with self.lock:
+                    upcoming = [at for name, at in self.due.items() if name not in self.running]
+                wait = (min([*upcoming, self.next_send]) - now).total_seconds()
+                self.wake.wait(min(max(wait, 0.05), 60))
+        finally:
+            log.info("🛑 Daemon beendet.")
+            if server is not None:
+                server.shutdown()
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+# === 🖥️ Kommandozeile ===
+def write_run_report(args, default=RUN_REPORT_FILE):
+    """Schreibt den Laufbericht als JSON (und auf Wunsch im Prometheus-Textformat).
+
+    Ohne --report geht er nach default; None (Vorschau) schreibt nur, was ausdrücklich verlangt ist.
+    """
+    report = get_run_report()
+    path = default if args.report is None else args.report
+    if path:
+        report.write_json(path)
+    if args.prometheus:
+        with open(args.prometheus, "w", encoding="utf-8") as f:
+            f.write(report.prometheus())
+        log.info("📊 Prometheus-Metriken gespeichert: %s", args.prometheus)
+
+def find_profile(name):
+    profiles = {profile.name: profile for profile in load_profiles()}
+    if name is None:
+        return next(iter(profiles.values()))
+    if name not in profiles:
+        raise ValueError(f"Unbekanntes Profil '{name}' (vorhanden: {', '.join(profiles)})")
+    return profiles[name]
+
+def cmd_build(args):
+    # Eine Vorschau verbraucht weder 🆕-Markierungen noch Substack-Wasserstand und überschreibt keinen Laufbericht
+    briefing = generate_briefing(footer=args.footer, profile=find_profile(args.profile), commit=False)
+    write_run_report(args, default=None)
+    keys = BRIEFING_VARIANTS[args.variant]
+    briefing_content = briefing.text(keys) if args.text else briefing.html(keys)
+    if args.output and args.output != "-":
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(briefing_content)
+        log.info("💾 Briefing gespeichert: %s", args.output)
+    else:
+        sys.stdout.write(briefing_content + "\n")
+    return 0
+
+def cmd_send(args):
+    # Zugangsdaten vor dem (langen) Abruf prüfen, damit ein Konfigurationsfehler sofort auffällt
+    config_dict = load_config()
+    profiles = load_profiles()
+    log.info("🧠 Erzeuge Briefing für %d Profil(e)...", len(profiles))
+    start_run_report()
+    briefings = render_profiles(collect_snapshot(), profiles, footer=args.footer)
+    sent = send_briefings([(profile, briefings[profile.name]) for profile in profiles], config_dict)
+    write_run_report(args)
+    return 0 if sent else 1
+
+def cmd_daemon(args):
+    # Ohne Probelauf die Zugangsdaten gleich beim Start prüfen, nicht erst zur Versandzeit
+    config_dict = None if args.dry_run else load_config()
+    daemon = BriefingDaemon(send_at=args.at, profiles=load_profiles(), config_dict=config_dict, footer=args.footer,
+                            dry_run=args.dry_run, after_send=lambda: write_run_report(args))
+    if hasattr(signal, "SIGUSR1"):
+        signal.signal(signal.SIGUSR1, lambda signum, frame: daemon.request_send())
+    signal.signal(signal.SIGTERM, lambda signum, frame: daemon.stop())
+    try:
+        daemon.run(port=args.port)
+    except KeyboardInterrupt:
+        daemon.stop()
+    return 0
+
+def cmd_test_imap(args):
+    print(test_substack_email_access(folder=args.folder))
+    return 0
+
+def cmd_record(args):
+    """Erzeugt ein Briefing (ohne Versand) und zeichnet dabei alle HTTP- und IMAP-Antworten auf."""
+    session = FixtureSession("record", args.fixtures)
+    use_fixtures(session)
+    try:
+        generate_briefing()
+    finally:
+        use_fixtures(None)
+        session.save()
+    return 0
+
+# === 📏 Benchmarks ===
+def bench_call(func, repeat):
+    """(Sekunden je Aufruf, Spitzen-Allokation in Bytes); die Zeit wird ohne tracemalloc gemessen."""
+    import tracemalloc
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    seconds = (time.perf_counter() - start) / repeat
+    tracemalloc.start()
+    try:
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return seconds, peak
+
+def fixture_substack_tasks(session):
+    """Baut die Parse-Aufträge für parse_substack_body aus den aufgezeichneten UID-FETCH-Antworten."""
+    html_parts, subjects, bodies = {}, {}, {}
+    for entry in session.imap:
+        if entry["error"] or not entry["key"].startswith('uid ["fetch"'):
+            continue
+        typ, data = _unpack(entry["result"])
+        for uid, (meta, items) in parse_uid_fetch(data).items():
+            if b"BODYSTRUCTURE" in meta:
+                try:
+                    structure, _ = parse_imap_sexpr(meta, meta.index(b"BODYSTRUCTURE") + len(b"BODYSTRUCTURE"))
+                    html_parts[uid] = find_html_part(structure)
+                except ValueError:
+                    continue
+                header = next((v for k, v in items.items() if k.startswith("BODY[HEADER")), b"")
+                subjects[uid] = decode_mime_header(email.message_from_bytes(header)["Subject"])
+            elif "RFC822" in items:
+                html_parts[uid] = ("RFC822", None, None)
+                bodies[uid] = items["RFC822"]
+            elif items:
+                bodies[uid] = next(iter(items.values()))
+    return [(*html_parts[uid], raw, subjects.get(uid)) for uid, raw in bodies.items() if raw and html_parts.get(uid)]
+
+def run_micro_benchmarks(repeat, session=None):
+    """Zeit und Spitzen-Allokation der heißen Pfade; Feeds und Mails kommen aus den Fixtures."""
+    feeds = FeedFetcher()
+    news_urls = list(feeds_topchina.values()) + list(feeds_scmp_yicai.values())
+    parsed = {url: feeds.get(url) for url in news_urls + list(feeds_google_news.values())}
+    entries = [e for feed in parsed.values() for e in feed.entries]
+    google_feeds = {lang: parsed[url] for lang, url in feeds_google_news.items()}
+    news = [(f"Google News {lang}", a) for lang, feed in google_feeds.items() for _, a in scan_google_feed(lang, feed)]
+    benchmarks = {
+        "score_article": (lambda: [score_article(e.get("title", ""), e.get("summary", "")) for e in entries], len(entries)),
+        "fetch_news": (lambda: [fetch_news(url, feeds=FeedFetcher()) for url in news_urls], len(news_urls)),
+        "google_grouping": (lambda: group_google_news(google_feeds, dedup=DedupIndex()), 1),
+        "story_clusters": (lambda: cluster_articles(news), len(news)),
+    }
+    tasks = fixture_substack_tasks(session) if session else []
+    if tasks:
+        benchmarks["substack_extract"] = (lambda: [parse_substack_body(*task) for task in tasks], len(tasks))
+    results = {}
+    for name, (func, units) in benchmarks.items():
+        seconds, peak = bench_call(func, repeat)
+        results[name] = {"seconds": seconds, "per_item": seconds / max(1, units), "items": units, "peak_bytes": peak}
+    return results
+
+def bench_median(values):
+    return sorted(values)[len(values) // 2]
+
+def bench_regressions(report, baseline, max_ratio):
+    """[(Name, Sekunden, Basis)] für Gesamtzeit (Median) und Mikro-Benchmarks, die mehr als max_ratio-mal so lange
+    brauchen wie im gespeicherten Bericht baseline (bench --json)."""
+    def times(r):
+        return {"Gesamt": bench_median(r["wall"]), **{name: m["seconds"] for name, m in r.get("micro", {}).items()}}
+    reference = times(baseline)
+    return [(name, seconds, reference[name]) for name, seconds in times(report).items()
+            if name in reference and seconds > max_ratio * reference[name]]
+
+def cmd_bench(args):
+    """Erzeugt das Briefing mehrfach ohne Versand und misst Gesamt- und Abschnittszeiten (mit --fixtures offline)."""
+    session, substack_mail = None, None
+    if args.fixtures:
+        session = FixtureSession("replay", args.fixtures, latency=args.latency)
+        use_fixtures(session)
+        # Zugangsdaten werden beim Abspielen nicht gebraucht, der Substack-Abschnitt soll aber laufen
+        substack_mail = os.getenv("SUBSTACK_MAIL") or "GMAIL_USER=replay;GMAIL_PASS=replay"
+    report = {"wall": [], "sections": defaultdict(list), "micro": {}}
+    try:
+        for run in range(args.runs):
+            start = time.perf_counter()
+            briefing = generate_briefing(commit=False, substack_mail=substack_mail)
+            report["wall"].append(time.perf_counter() - start)
+            for name, (duration, status) in briefing.timings.items():
+                report["sections"][name].append(duration)
+            log.info("⏱️ Lauf %d/%d: %.2fs", run + 1, args.runs, report["wall"][-1])
+        if session:
+            session.latency = 0  # Mikro-Benchmarks messen nur CPU und Speicher
+            report["micro"] = run_micro_benchmarks(args.repeat, session)
+    finally:
+        use_fixtures(None)
+
+    median = bench_median
+    wall = sorted(report["wall"])
+    print(f"📏 Benchmark: {args.runs} Läufe" + (f", Fixtures {args.fixtures}, Latenz x{args.latency}" if session else ", live"))
+    print(f"   {'Gesamt':<22} min {wall[0]:.2f}s | median {median(wall):.2f}s | max {wall[-1]:.2f}s")
+    for name, durations in sorted(report["sections"].items(), key=lambda x: median(x[1]), reverse=True):
+        print(f"   {name:<22} median {median(durations):.2f}s")
+    for name, m in report["micro"].items():
+        print(f"   {name:<22} {m['per_item'] * 1e6:10.1f} µs/Element ({m['items']}) | Spitze {m['peak_bytes'] / 1024:8.1f} KB")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=1)
+        log.info("💾 Benchmark-Ergebnis gespeichert: %s", args.json)
+    if args.max_seconds is not None and median(wall) > args.max_seconds:
+        log.error("❌ Benchmark: Median %.2fs über der Grenze von %.2fs", median(wall), args.max_seconds)
+        return 1
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = bench_regressions(report, json.load(f), args.max_ratio)
+        for name, seconds, reference in regressions:
+            log.error("❌ Benchmark: %s %.4fs statt %.4fs (über x%.1f der Basis %s)", name, seconds, reference,
+                      args.max_ratio, args.baseline)
+        if regressions:
+            return 1
+    return 0
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="briefing", description="Tägliches China-Briefing erzeugen und versenden.")
+    parser.set_defaults(func=cmd_send)
+    parser.add_argument("--log-level", default=os.getenv("LOG_LEVEL", "INFO"),
+                        choices=["DEBUG", "INFO", "WARNING", "ERROR"], type=str.upper, help="Umfang der Ausgaben")
+    parser.add_argument("--report", help="Laufbericht als JSON (Standard bei send/daemon: run_report.json; leer = keiner)")
+    parser.add_argument("--prometheus", help="Messwerte zusätzlich im Prometheus-Textformat speichern")
+    parser.add_argument("--footer", action="store_true", help="Laufzeit-Zusammenfassung unten in die Mail")
+    sub = parser.add_subparsers(dest="command")
+    p = sub.add_parser("build", help="Briefing erzeugen, ohne es zu versenden")
+    p.add_argument("-o", "--output", default="-", help="Zieldatei für das HTML (Standard: stdout)")
+    p.add_argument("--text", action="store_true", help="Textfassung statt HTML ausgeben")
+    p.add_argument("--variant", choices=sorted(BRIEFING_VARIANTS), default="full", help="Empfänger-Variante")
+    p.add_argument("--profile", help="Profil aus profiles.json (Standard: das erste)")
+    p.set_defaults(func=cmd_build)
+    p = sub.add_parser("send", help="Briefing erzeugen und per E-Mail versenden (Standard)")
+    p.set_defaults(func=cmd_send)
+    p = sub.add_parser("daemon", help="Quellen dauerhaft warm halten und täglich zur festen Uhrzeit versenden")
+    p.add_argument("--at", default=DAEMON_SEND_AT, help="Versandzeit HH:MM in UTC (Standard: %(default)s)")
+    p.add_argument("--port", type=int, default=DAEMON_PORT, help="HTTP-Auslöser auf 127.0.0.1 (0 = aus)")
+    p.add_argument("--dry-run", action="store_true", help="Briefings erzeugen, aber nicht versenden")
+    p.set_defaults(func=cmd_daemon)
+    p = sub.add_parser("test-imap", help="Gmail-Zugang und Substack-Absender prüfen")
+    p.add_argument("--folder", default="[Gmail]/Alle Nachrichten", help="IMAP-Ordner")
+    p.set_defaults(func=cmd_test_imap)
+    p = sub.add_parser("record", help="Briefing ohne Versand erzeugen und alle HTTP-/IMAP-Antworten aufzeichnen")
+    p.add_argument("--fixtures", default=FIXTURES_DIR, help="Zielverzeichnis der Aufnahmen")
+    p.set_defaults(func=cmd_record)
+    p = sub.add_parser("bench", help="Briefing mehrfach ohne Versand erzeugen und Laufzeiten messen")
+    p.add_argument("-n", "--runs", type=int, default=3, help="Anzahl der Läufe")
+    p.add_argument("--fixtures", nargs="?", const=FIXTURES_DIR, help="Aufnahmen abspielen statt Netzwerk (Standard-Verzeichnis: fixtures/)")
+    p.add_argument("--latency", type=float, default=1.0, help="Faktor für die aufgezeichneten Antwortzeiten (0 = keine)")
+    p.add_argument("--repeat", type=int, default=20, help="Wiederholungen je Mikro-Benchmark")
+    p.add_argument("--json", help="Ergebnisse zusätzlich als JSON speichern (z. B. für CI)")
+    p.add_argument("--max-seconds", type=float, help="Obergrenze für den Median der Gesamtzeit; darüber Exit-Code 1 (CI)")
+    p.add_argument("--baseline", help="Gespeicherter Bericht (--json) als Maßstab; langsamer als --max-ratio: Exit-Code 1")
+    p.add_argument("--max-ratio", type=float, default=3.0, help="Erlaubter Faktor gegenüber --baseline (Standard: %(default)s)")
+    p.set_defaults(func=cmd_bench)
+    return parser
+
+def main(argv=None):
+    """Einstiegspunkt für "python briefing.py" bzw. "python -m briefing"; ohne Unterbefehl wird wie bisher versendet."""
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=args.log_level, format="%(asctime)s %(levelname)-7s %(message)s", datefmt="%H:%M:%S")
+    return args.func(args)
 
-# === Briefing generieren ===
-print("🧠 Erzeuge Briefing...")
-briefing_content = generate_briefing()
-
-msg = MIMEText(briefing_content, "html", "utf-8")
-msg["Subject"] = "📰 Dein tägliches China-Briefing"
-msg["From"] = config_dict["EMAIL_USER"]
-msg["To"] = config_dict["EMAIL_TO"]
-
-print("📤 Sende E-Mail...")
-try:
-    with smtplib.SMTP(config_dict["EMAIL_HOST"], int(config_dict["EMAIL_PORT"])) as server:
-        server.starttls()
-        server.login(config_dict["EMAIL_USER"], config_dict["EMAIL_PASSWORD"])
-        server.send_message(msg)
-    print("✅ E-Mail wurde gesendet!")
-except Exception as e:
-    print("❌ Fehler beim Senden der E-Mail:", str(e))
+# Guard nötig, damit Worker-Prozesse (spawn/forkserver) beim Import nicht selbst ein Briefing versenden
+if __name__ == "__main__":
+    sys.exit(main())
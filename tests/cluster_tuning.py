@@ -0,0 +1,128 @@
+"""Wählt CLUSTER_SIMILARITY an einem eigenen, beschrifteten EN/DE/FR-Satz – getrennt von tests/test_clusters.py.
+
+Aufruf: python tests/cluster_tuning.py
+
+Gibt je Paar die Kosinus-Ähnlichkeit aus (und ob stories_compatible die Paarung ohnehin verhindert) und schlägt den
+Schwellwert mit den wenigsten Fehlern vor; Paare, die stories_compatible ausschließt, zählen dabei nicht. Geprüft
+wird der gewählte Wert dann an den Paaren in tests/test_clusters.py, die hier nicht vorkommen.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import briefing  # noqa: E402
+
+A = briefing.Article
+
+ARTICLES = {
+    "byd_hu_en": ("Google News EN", A(2, "BYD to build second European car plant in Hungary's Szeged", "https://reuters.com/byd-szeged", "Reuters")),
+    "byd_hu_de": ("Google News DE", A(2, "BYD baut zweites Werk in Ungarn bei Szeged", "https://handelsblatt.com/byd-szeged", "Handelsblatt")),
+    "byd_hu_fr": ("Google News FR", A(2, "BYD va construire une deuxième usine en Hongrie, à Szeged", "https://lesechos.fr/byd-szeged", "Les Echos")),
+    "byd_tr_en": ("Google News EN", A(2, "BYD to build $1 billion plant in Turkey's Manisa", "https://bloomberg.com/byd-manisa", "Bloomberg")),
+    "kirin_en": ("Google News EN", A(2, "Huawei unveils Kirin 9010 chip in new Pura 70 phones", "https://theverge.com/kirin-9010", "The Verge")),
+    "kirin_de": ("Google News DE", A(2, "Huawei stellt Kirin-9010-Chip im neuen Pura 70 vor", "https://heise.de/kirin-9010", "heise")),
+    "kirin_fr": ("Google News FR", A(2, "Huawei dévoile la puce Kirin 9010 de ses Pura 70", "https://01net.com/kirin-9010", "01net")),
+    "mate_en": ("Google News EN", A(2, "Huawei Mate 60 Pro sales surge in China", "https://cnbc.com/mate-60", "CNBC")),
+    "gdp_q2_en": ("Google News EN", A(3, "China's economy grows 4.7% in second quarter, missing forecasts", "https://reuters.com/gdp-q2", "Reuters")),
+    "gdp_q2_de": ("Google News DE", A(2, "Chinas Wirtschaft wächst im zweiten Quartal um 4,7 Prozent", "https://tagesschau.de/bip-q2", "Tagesschau")),
+    "gdp_q2_fr": ("Google News FR", A(2, "Chine : la croissance ralentit à 4,7 % au deuxième trimestre", "https://lemonde.fr/pib-t2", "Le Monde")),
+    "gdp_q1_en": ("Google News EN", A(3, "China's economy grows 5.3% in first quarter, beating forecasts", "https://reuters.com/gdp-q1", "Reuters")),
+    "cg_en": ("Google News EN", A(2, "Country Garden misses $15 million bond coupon payment", "https://ft.com/country-garden", "Financial Times")),
+    "cg_de": ("Google News DE", A(2, "Country Garden verpasst Kuponzahlung über 15 Millionen Dollar", "https://faz.net/country-garden", "FAZ")),
+    "evergrande_en": ("Google News EN", A(2, "Evergrande ordered to liquidate by Hong Kong court", "https://bbc.com/evergrande", "BBC")),
+    "xi_paris_en": ("Google News EN", A(2, "Xi Jinping arrives in Paris for talks with Macron", "https://apnews.com/xi-paris", "AP")),
+    "xi_paris_fr": ("Google News FR", A(2, "Xi Jinping arrive à Paris pour des entretiens avec Macron", "https://lefigaro.fr/xi-paris", "Le Figaro")),
+    "xi_paris_de": ("Google News DE", A(2, "Xi Jinping zu Gesprächen mit Macron in Paris eingetroffen", "https://zeit.de/xi-paris", "Zeit")),
+    "xi_budapest_en": ("Google News EN", A(2, "Xi Jinping arrives in Budapest for talks with Orban", "https://apnews.com/xi-budapest", "AP")),
+    "ev_duties_en": ("Google News EN", A(3, "EU imposes provisional duties of up to 37.6% on Chinese electric vehicles", "https://politico.eu/ev-duties", "Politico")),
+    "ev_duties_de": ("Google News DE", A(2, "EU verhängt vorläufige Zölle von bis zu 37,6 Prozent auf chinesische E-Autos", "https://spiegel.de/e-auto-zoelle", "Spiegel")),
+    "ev_duties_fr": ("Google News FR", A(2, "L'UE impose des droits provisoires jusqu'à 37,6 % sur les véhicules électriques chinois", "https://liberation.fr/ve-droits", "Libération")),
+    "pork_en": ("Google News EN", A(2, "China launches anti-dumping probe into EU pork imports", "https://reuters.com/pork-probe", "Reuters")),
+    "plenum_en": ("Google News EN", A(2, "Communist Party opens Third Plenum in Beijing", "https://nytimes.com/third-plenum", "New York Times")),
+    "plenum_de": ("Google News DE", A(2, "Kommunistische Partei eröffnet drittes Plenum in Peking", "https://nzz.ch/drittes-plenum", "NZZ")),
+    "baba_en": ("Google News EN", A(2, "Alibaba quarterly revenue rises 4% to 243 billion yuan", "https://cnbc.com/alibaba-q", "CNBC")),
+    "baba_de": ("Google News DE", A(2, "Alibaba steigert Quartalsumsatz um 4 Prozent auf 243 Milliarden Yuan", "https://boerse.de/alibaba-q", "boerse.de")),
+    "jd_en": ("Google News EN", A(2, "JD.com quarterly revenue rises 1.2% to 291 billion yuan", "https://cnbc.com/jd-q", "CNBC")),
+    "shenzhou_en": ("Google News EN", A(2, "Shenzhou-18 astronauts return to Earth after six months on Tiangong", "https://space.com/shenzhou-18", "Space.com")),
+    "shenzhou_fr": ("Google News FR", A(2, "Les astronautes de Shenzhou-18 de retour sur Terre après six mois à bord de Tiangong", "https://franceinfo.fr/shenzhou-18", "franceinfo")),
+    "mars_en": ("Google News EN", A(1, "China's Tianwen-1 rover resumes work on Mars", "https://space.com/tianwen-1", "Space.com")),
+    "exports_mar_fr": ("Google News FR", A(2, "Chine : les exportations reculent en mars", "https://lesechos.fr/exports-mars", "Les Echos")),
+    "yagi_en": ("Google News EN", A(2, "Typhoon Yagi makes landfall in Hainan, killing two", "https://reuters.com/yagi", "Reuters")),
+    "yagi_de": ("Google News DE", A(2, "Taifun Yagi trifft auf Hainan – zwei Tote", "https://n-tv.de/yagi", "n-tv")),
+    "gaemi_en": ("Google News EN", A(2, "Typhoon Gaemi makes landfall in Fujian after hitting Taiwan", "https://reuters.com/gaemi", "Reuters")),
+    "stocks_fr": ("Google News FR", A(1, "Les actions chinoises rebondissent à Shanghai", "https://boursorama.com/actions-shanghai", "Boursorama")),
+    "lawsuit_en": ("Google News EN", A(1, "US lawmakers take action against Chinese drone maker DJI", "https://theverge.com/dji", "The Verge")),
+    "filler_taiwan": ("Google News EN", A(1, "Taiwan holds presidential election amid pressure from Beijing", "https://bbc.com/taiwan-vote", "BBC")),
+    "filler_rare": ("SCMP", A(2, "Beijing tightens rare earth export controls", "https://scmp.com/rare-earths")),
+    "filler_tiktok": ("Google News DE", A(1, "TikTok klagt gegen Verkaufsgesetz in den USA", "https://sueddeutsche.de/tiktok", "SZ")),
+}
+
+SAME_STORY = [
+    ("byd_hu_en", "byd_hu_de"), ("byd_hu_en", "byd_hu_fr"),
+    ("kirin_en", "kirin_de"), ("kirin_en", "kirin_fr"),
+    ("gdp_q2_en", "gdp_q2_de"), ("gdp_q2_en", "gdp_q2_fr"),
+    ("cg_en", "cg_de"),
+    ("xi_paris_en", "xi_paris_fr"), ("xi_paris_en", "xi_paris_de"),
+    ("ev_duties_en", "ev_duties_de"), ("ev_duties_en", "ev_duties_fr"),
+    ("plenum_en", "plenum_de"),
+    ("baba_en", "baba_de"),
+    ("shenzhou_en", "shenzhou_fr"),
+    ("yagi_en", "yagi_de"),
+]
+
+DIFFERENT_STORY = [
+    ("byd_hu_en", "byd_tr_en"), ("kirin_en", "mate_en"), ("gdp_q2_en", "gdp_q1_en"), ("gdp_q2_de", "gdp_q1_en"),
+    ("cg_en", "evergrande_en"), ("xi_paris_en", "xi_budapest_en"), ("xi_paris_fr", "xi_budapest_en"),
+    ("ev_duties_en", "pork_en"), ("baba_en", "jd_en"), ("baba_de", "jd_en"), ("mars_en", "exports_mar_fr"),
+    ("yagi_en", "gaemi_en"), ("stocks_fr", "lawsuit_en"), ("filler_taiwan", "gaemi_en"), ("plenum_en", "filler_rare"),
+]
+
+
+def pair_similarities(articles, pairs):
+    """{(a, b): (Kosinus-Ähnlichkeit, unvereinbar)} – dieselbe Aufbereitung wie briefing.cluster_articles."""
+    import numpy as np
+    keys = list(articles)
+    labels = [briefing.story_label(article, name) for name, article in articles.values()]
+    texts = [briefing.story_text(article, label) for (_, article), label in zip(articles.values(), labels)]
+    features = [briefing.story_features(article, name) for name, article in articles.values()]
+    rows, cols, weights = briefing.tfidf_matrix(*briefing.hashed_ngrams(texts, np), len(texts), np)
+    vectors = [dict() for _ in keys]
+    for row, col, weight in zip(rows.tolist(), cols.tolist(), weights.tolist()):
+        vectors[row][col] = weight
+    result = {}
+    for a, b in pairs:
+        i, j = keys.index(a), keys.index(b)
+        similarity = sum(weight * vectors[j].get(col, 0.0) for col, weight in vectors[i].items())
+        result[(a, b)] = (similarity, not briefing.stories_compatible(features[i], features[j]))
+    return result
+
+
+def suggest_threshold(same, different):
+    """(Schwellwert, Fehler): die Mitte zwischen zwei benachbarten Werten mit den wenigsten Fehlern (getrennte gleiche
+    + verbundene verschiedene Paare); bei Gleichstand der mit weniger verbundenen verschiedenen Paaren – eine
+    falsch verbundene Meldung verschwindet im Briefing, eine nicht erkannte erscheint nur zweimal."""
+    values = sorted(set(same + different))
+    candidates = []
+    for cut in ((a + b) / 2 for a, b in zip(values, values[1:])):
+        merged = sum(d >= cut for d in different)
+        candidates.append((sum(s < cut for s in same) + merged, merged, cut))
+    errors, _, cut = min(candidates)
+    return cut, errors
+
+
+def main():
+    sims = pair_similarities(ARTICLES, SAME_STORY + DIFFERENT_STORY)
+    for label, pairs in (("gleich", SAME_STORY), ("verschieden", DIFFERENT_STORY)):
+        for pair in pairs:
+            similarity, contrast = sims[pair]
+            print(f"{label:<12} {similarity:.3f}{'  (unvereinbar)' if contrast else ''}  {pair[0]} / {pair[1]}")
+    same = [sims[p][0] for p in SAME_STORY]
+    different = [sims[p][0] for p in DIFFERENT_STORY if not sims[p][1]]
+    threshold, errors = suggest_threshold(same, different)
+    print(f"Vorschlag {threshold:.3f} mit {errors} Fehlern von {len(same) + len(different)} Paaren"
+          f" (eingestellt: {briefing.CLUSTER_SIMILARITY})")
+
+
+if __name__ == "__main__":
+    main()
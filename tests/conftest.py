@@ -0,0 +1,158 @@
+import email.utils
+import os
+import re
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def substack_html(sender, number):
+    author = sender.split("@")[0]
+    return (f"<html><body><h1>Post {number} from {author}</h1>"
+            f"<p>This is the first real teaser paragraph of post {number}, long enough to count as a teaser.</p>"
+            f"<a href='https://{author}.substack.com/p/post-{number}'>Read</a></body></html>").encode()
+
+
+class FakeMailbox:
+    """Ein Ordner mit Substack-Mails (einteilig text/html); broken: UIDs, deren Inhalt der Server verweigert."""
+
+    def __init__(self):
+        self.messages = {}  # uid -> (Absender, Datum, HTML)
+        self.broken = set()
+        self.uidvalidity = b"42"
+
+    def add(self, sender, days_ago=0, uid=None):
+        uid = uid or max(self.messages, default=100) + 1
+        self.messages[uid] = (sender, datetime.now().astimezone() - timedelta(days=days_ago), substack_html(sender, uid))
+        return uid
+
+    def uids(self, spec):
+        found = set()
+        for part in spec.split(","):
+            first, _, last = part.partition(":")
+            high = max(self.messages, default=0) if last == "*" else int(last or first)
+            found |= {uid for uid in self.messages if int(first) <= uid <= high}
+            if last == "*" and self.messages:
+                found.add(max(self.messages))  # "n:*" liefert immer die höchste UID
+        return sorted(found)
+
+
+class FakeIMAP:
+    """Genug IMAP für fetch_substack_from_email: UID SEARCH (UID-Bereich, FROM), Kopf, BODYSTRUCTURE, Teilabruf."""
+
+    def __init__(self, box):
+        self.box = box
+        self.untagged = {}
+        self.commands = []
+
+    def login(self, user, password):
+        return "OK", [b"ok"]
+
+    def select(self, folder, readonly=False):
+        self.untagged = {"UIDVALIDITY": [self.box.uidvalidity], "UIDNEXT": [str(max(self.box.messages) + 1).encode()]}
+        return "OK", [str(len(self.box.messages)).encode()]
+
+    def response(self, code):
+        return code, self.untagged.pop(code, [None])
+
+    def uid(self, command, *args):
+        self.commands.append((command, args))
+        if command == "search":
+            query = " ".join(a for a in args if a)
+            senders = re.findall(r'FROM "([^"]+)"', query)
+            uids = [uid for uid in self.box.uids(re.search(r"UID (\S+)", query).group(1))
+                    if self.box.messages[uid][0] in senders]
+            return "OK", [" ".join(map(str, uids)).encode()]
+        spec, items = args
+        out = []
+        for uid in self.box.uids(spec):
+            sender, date, html = self.box.messages[uid]
+            if "BODYSTRUCTURE" in items:
+                header = (f"From: Author <{sender}>\r\nDate: {email.utils.format_datetime(date)}\r\n"
+                          f"Subject: Post {uid}\r\n\r\n").encode()
+                meta = f'{uid} (UID {uid} BODYSTRUCTURE ("TEXT" "HTML" ("CHARSET" "utf-8") NIL NIL "7BIT" {len(html)} 1 NIL NIL NIL) '
+                out += [((meta + f"BODY[HEADER.FIELDS (FROM DATE SUBJECT)] {{{len(header)}}}").encode(), header), b")"]
+            elif uid not in self.box.broken:
+                size = int(re.search(r"<0\.(\d+)>", items).group(1))
+                out += [(f"{uid} (UID {uid} BODY[1]<0> {{{len(html[:size])}}}".encode(), html[:size]), b")"]
+        return "OK", out
+
+    def logout(self):
+        return "BYE", [b""]
+
+
+@pytest.fixture
+def mailbox(monkeypatch, tmp_path):
+    """Leerer FakeMailbox; briefing verbindet sich mit ihm, substacks.json nennt zwei Absender."""
+    import briefing
+
+    box = FakeMailbox()
+    senders = tmp_path / "substacks.json"
+    senders.write_text('[{"email": "alpha@substack.com", "name": "Alpha", "order": 1},'
+                       ' {"email": "beta@substack.com", "name": "Beta", "order": 2}]')
+    monkeypatch.setattr(briefing, "SUBSTACKS_FILE", str(senders))
+    monkeypatch.setattr(briefing, "imap_connect", lambda *args, **kwargs: FakeIMAP(box))
+    return box
+
+
+class FakeSMTPServer:
+    """Nimmt Mails an; script: Empfänger -> Liste von (Code, Text) oder Exceptions, je Zustellversuch wird die erste
+    verbraucht. (Code, Text) lehnt den Empfänger ab (RCPT TO), eine Exception wird so geworfen."""
+
+    def __init__(self):
+        self.sent = []  # (Empfänger, Nachricht)
+        self.attempts = []
+        self.connections = 0
+        self.script = {}
+
+    def client(self, host, port, timeout=None):
+        server = self
+
+        class FakeSMTP:
+            def __init__(self):
+                server.connections += 1
+
+            def starttls(self):
+                pass
+
+            def login(self, user, password):
+                pass
+
+            def send_message(self, msg, to_addrs):
+                import email
+                import smtplib
+                recipient = to_addrs[0]
+                server.attempts.append(recipient)
+                replies = server.script.get(recipient)
+                if replies:
+                    reply = replies.pop(0)
+                    if isinstance(reply, Exception):
+                        raise reply
+                    raise smtplib.SMTPRecipientsRefused({recipient: reply})
+                # Kopie wie auf dem Draht: der Absender verwendet dieselbe Nachricht für weitere Empfänger
+                server.sent.append((recipient, email.message_from_bytes(msg.as_bytes())))
+                return {}
+
+            def quit(self):
+                pass
+
+            def close(self):
+                pass
+
+        return FakeSMTP()
+
+
+@pytest.fixture
+def smtp(monkeypatch):
+    """FakeSMTPServer hinter smtplib.SMTP; Wartezeiten zwischen Wiederholungen entfallen."""
+    import smtplib
+
+    import briefing
+
+    server = FakeSMTPServer()
+    monkeypatch.setattr(smtplib, "SMTP", server.client)
+    monkeypatch.setattr(briefing.time, "sleep", lambda seconds: None)
+    return server
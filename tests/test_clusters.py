@@ -0,0 +1,99 @@
+"""Story-Cluster gegen einen beschrifteten mehrsprachigen Paarsatz (EN/DE/FR).
+
+CLUSTER_SIMILARITY ist an einem anderen Satz gewählt (tests/cluster_tuning.py); dieser hier prüft ihn nur.
+Verschiedene Meldungen (Gegenteil, andere Zahl, andere Kennzahl) dürfen nie zusammenfallen – eine falsch verbundene
+Meldung verschwindet aus dem Briefing. Übersetzte Titel ohne gemeinsame Namen oder Zahlen findet der
+Zeichen-n-Gramm-Vergleich nicht immer; von den gleichen Paaren muss deshalb nur die Mehrheit erkannt werden.
+"""
+import pytest
+
+import briefing
+
+pytest.importorskip("numpy")
+
+A = briefing.Article
+
+# Artikel-Kürzel -> (Abschnitt, Article)
+ARTICLES = {
+    "lpr_cut_en": ("Google News EN", A(3, "PBoC cuts loan prime rate to 3.35% as China steps up stimulus", "https://reuters.com/lpr-cut", "Reuters")),
+    "lpr_cut_en2": ("Google News EN", A(2, "China's central bank cuts loan prime rate to 3.35% amid stimulus push", "https://ft.com/lpr-cut", "Financial Times")),
+    "lpr_cut_de": ("Google News DE", A(2, "China: Notenbank senkt Loan Prime Rate auf 3,35 Prozent", "https://faz.net/lpr-senkung", "FAZ")),
+    "lpr_cut_fr": ("Google News FR", A(2, "Chine : la PBoC abaisse son taux LPR à 3,35 % pour relancer l'économie", "https://lemonde.fr/lpr-baisse", "Le Monde")),
+    "lpr_hold_en": ("SCMP", A(2, "PBoC holds loan prime rate at 3.45% as China stimulus debate continues", "https://scmp.com/lpr-hold")),
+    "lpr_hold_de": ("Google News DE", A(2, "China: Notenbank belässt Loan Prime Rate unverändert bei 3,45 Prozent", "https://handelsblatt.com/lpr-unveraendert", "Handelsblatt")),
+    "cpi_en": ("Google News EN", A(3, "China consumer prices rise 0.4% in June as deflation fears ease", "https://reuters.com/cpi-june", "Reuters")),
+    "cpi_de": ("Google News DE", A(2, "Chinas Verbraucherpreise steigen im Juni um 0,4 Prozent", "https://spiegel.de/cpi-juni", "Spiegel")),
+    "cpi_fr": ("Google News FR", A(2, "Chine : les prix à la consommation progressent de 0,4 % en juin", "https://lesechos.fr/cpi-juin", "Les Echos")),
+    "ppi_en": ("Google News EN", A(2, "China producer prices fall 0.4% in June as deflation persists", "https://bloomberg.com/ppi-june", "Bloomberg")),
+    "exports_en": ("Google News EN", A(3, "China exports rise 7.6% in May, beating forecasts", "https://cnbc.com/exports-may", "CNBC")),
+    "exports_de": ("Google News DE", A(2, "Chinas Exporte steigen im Mai um 7,6 Prozent", "https://zeit.de/exporte-mai", "Zeit")),
+    "imports_en": ("Google News EN", A(2, "China imports fall 1.8% in May as domestic demand weakens", "https://cnbc.com/imports-may", "CNBC")),
+    "evergrande_en": ("Google News EN", A(3, "Evergrande liquidation hearing postponed again in Hong Kong", "https://reuters.com/evergrande", "Reuters")),
+    "evergrande_de": ("Google News DE", A(2, "Evergrande: Anhörung zur Liquidation in Hongkong erneut verschoben", "https://welt.de/evergrande", "Welt")),
+    "evergrande_fr": ("Google News FR", A(2, "Evergrande : l'audience sur la liquidation reportée à Hong Kong", "https://lefigaro.fr/evergrande", "Le Figaro")),
+    "stocks_up_en": ("Google News EN", A(2, "Hong Kong stocks rise as tech shares rally on stimulus hopes", "https://scmp.com/hk-stocks-rise")),
+    "stocks_down_en": ("Google News EN", A(2, "Hong Kong stocks fall as tech shares slump on stimulus doubts", "https://scmp.com/hk-stocks-fall")),
+    "tariffs_en": ("Google News EN", A(2, "Beijing announces retaliatory tariffs on US chips", "https://apnews.com/tariffs", "AP")),
+    "tariffs_de": ("Google News DE", A(2, "Peking kündigt Vergeltungszölle auf US-Chips an", "https://tagesschau.de/zoelle", "Tagesschau")),
+    # Füllartikel, damit die IDF nicht nur aus den Paaren besteht
+    "filler_zone": ("Yicai", A(2, "Shanghai opens new free trade zone for biotech firms", "https://yicai.com/ftz")),
+    "filler_taiwan": ("Google News EN", A(1, "Taiwan Strait tensions rise after military drills", "https://bbc.com/taiwan", "BBC")),
+    "filler_ev": ("Google News DE", A(1, "BYD eröffnet Werk in Ungarn", "https://ntv.de/byd", "n-tv")),
+    "filler_xi": ("Google News FR", A(1, "Xi Jinping reçu à Paris pour une visite d'État", "https://france24.com/xi", "France 24")),
+}
+
+SAME_STORY = [
+    ("lpr_cut_en", "lpr_cut_en2"), ("lpr_cut_en", "lpr_cut_de"), ("lpr_cut_en", "lpr_cut_fr"), ("lpr_cut_de", "lpr_cut_fr"),
+    ("lpr_hold_en", "lpr_hold_de"),
+    ("cpi_en", "cpi_de"), ("cpi_en", "cpi_fr"),
+    ("exports_en", "exports_de"),
+    ("evergrande_en", "evergrande_de"), ("evergrande_en", "evergrande_fr"),
+    ("tariffs_en", "tariffs_de"),
+]
+
+DIFFERENT_STORY = [
+    ("lpr_cut_en", "lpr_hold_en"), ("lpr_cut_de", "lpr_hold_de"), ("lpr_cut_fr", "lpr_hold_de"),
+    ("cpi_en", "ppi_en"), ("cpi_de", "ppi_en"),
+    ("exports_en", "imports_en"), ("exports_de", "imports_en"),
+    ("stocks_up_en", "stocks_down_en"),
+    ("filler_taiwan", "stocks_up_en"), ("filler_zone", "tariffs_en"),
+]
+
+
+@pytest.fixture(scope="module")
+def clusters():
+    return briefing.cluster_articles(list(ARTICLES.values()))
+
+
+def cluster_of(clusters, key):
+    return clusters.cluster(briefing.normalize_url(ARTICLES[key][1].link))
+
+
+def test_same_story_across_languages(clusters):
+    found = [(a, b) for a, b in SAME_STORY
+             if cluster_of(clusters, a) is not None and cluster_of(clusters, a) == cluster_of(clusters, b)]
+    assert len(found) / len(SAME_STORY) >= 0.5, f"erkannt: {found}"
+    # Gleiche Namen und Zahlen tragen über Sprachen hinweg
+    assert ("evergrande_en", "evergrande_de") in found and ("evergrande_en", "evergrande_fr") in found
+
+
+@pytest.mark.parametrize("a, b", DIFFERENT_STORY)
+def test_different_stories_stay_apart(clusters, a, b):
+    ca, cb = cluster_of(clusters, a), cluster_of(clusters, b)
+    assert ca is None or ca != cb
+
+
+def test_related_links_other_sources(clusters):
+    related = clusters.related(ARTICLES["evergrande_en"][1].link)
+    assert set(related) == {("Welt", "https://welt.de/evergrande"), ("Le Figaro", "https://lefigaro.fr/evergrande")}
+
+
+def test_each_story_is_shown_once_with_its_sources(clusters):
+    dedup = briefing.DedupIndex(clusters=clusters)
+    shown = [name for name in ("lpr_cut_en2", "lpr_cut_en", "lpr_hold_en")
+             if dedup.add(ARTICLES[name][1].link, ARTICLES[name][1].title)]
+    assert shown == ["lpr_cut_en2", "lpr_hold_en"]
+    items = briefing.render_ranked([ARTICLES[name][1] for name in ("evergrande_en", "evergrande_de", "evergrande_fr")],
+                                   dedup=briefing.DedupIndex(clusters=clusters))
+    assert [item.url for item in items] == ["https://reuters.com/evergrande"]
+    assert {label for label, _ in items[0].related} == {"Welt", "Le Figaro"}
@@ -0,0 +1,52 @@
+from datetime import date, timedelta
+
+import pytest
+
+import briefing
+
+CONFIG = {"EMAIL_HOST": "smtp.example.com", "EMAIL_PORT": "25", "EMAIL_USER": "briefing@example.com",
+          "EMAIL_PASSWORD": "", "EMAIL_STARTTLS": "0", "EMAIL_TO": "leser@example.com"}
+
+FRESH = briefing.Article(3, "PBoC cuts loan prime rate", "https://scmp.com/lpr-cut", "SCMP")
+
+
+@pytest.fixture
+def daemon(monkeypatch, tmp_path):
+    monkeypatch.setattr(briefing, "HISTORY_DB_FILE", str(tmp_path / "history.db"))
+    # Ein früherer Lauf, damit es überhaupt "neue" Artikel geben kann
+    history = briefing.HistoryStore(briefing.HISTORY_DB_FILE, today=date.today() - timedelta(days=1))
+    history.record_articles("SCMP", [briefing.Article(1, "Older story", "https://scmp.com/older", "SCMP")])
+    history.close()
+    daemon = briefing.BriefingDaemon(config_dict=CONFIG, dry_run=True)
+    daemon.results["SCMP"] = [FRESH]
+    return daemon
+
+
+def stored_links():
+    history = briefing.HistoryStore(briefing.HISTORY_DB_FILE)
+    links = {row[0] for row in history.db.execute("SELECT link FROM articles")}
+    history.close(prune=False)
+    return links
+
+
+def test_preview_build_does_not_write_history(daemon):
+    for _ in range(2):
+        assert daemon.build().history.is_new(FRESH.link)
+    assert stored_links() == {"https://scmp.com/older"}
+
+
+def test_dry_run_send_does_not_write_history(daemon, smtp):
+    daemon.build_and_send()
+    assert smtp.sent == []
+    assert stored_links() == {"https://scmp.com/older"}
+
+
+def test_send_commits_history(daemon, smtp):
+    daemon.dry_run = False
+    daemon.build_and_send()
+    assert [recipient for recipient, _ in smtp.sent] == ["leser@example.com"]
+    assert FRESH.link in stored_links()
+    # Erst der nächste Tag sieht den Artikel als bekannt
+    history = briefing.HistoryStore(briefing.HISTORY_DB_FILE, today=date.today() + timedelta(days=1))
+    assert not history.view(articles=[FRESH]).is_new(FRESH.link)
+    history.close(prune=False)
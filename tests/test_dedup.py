@@ -0,0 +1,40 @@
+import pytest
+
+import briefing
+
+DIFFERENT_NEWS = [
+    ("China CPI rises in June", "China PPI rises in June"),
+    ("China cuts loan prime rate", "China holds loan prime rate"),
+    ("China exports rise in May", "China imports rise in May"),
+    ("Xi meets Putin", "Xi meets Biden in Moscow"),
+    ("Hang Seng stocks fall as property developers slide", "Hang Seng stocks rise as property developers slide"),
+    ("PBoC cuts one-year loan prime rate to 3.35% in October", "PBoC cuts one-year loan prime rate to 3.10% in October"),
+]
+
+SAME_NEWS = [
+    ("China cuts loan prime rate - Reuters", "China cuts loan prime rate – Bloomberg"),
+    ("China's central bank keeps the loan prime rate unchanged for a fifth month in a row, as expected by economists",
+     "China's central bank keeps loan prime rate unchanged for a fifth month in a row, as widely expected by economists"),
+]
+
+
+@pytest.mark.parametrize("first, second", DIFFERENT_NEWS)
+def test_different_news_is_kept(first, second):
+    dedup = briefing.DedupIndex()
+    assert dedup.add("https://a.example/1", first)
+    assert not dedup.seen("https://b.example/2", second)
+    assert dedup.add("https://b.example/2", second)
+
+
+@pytest.mark.parametrize("first, second", SAME_NEWS)
+def test_same_news_is_suppressed(first, second):
+    dedup = briefing.DedupIndex()
+    assert dedup.add("https://a.example/1", first)
+    assert not dedup.add("https://b.example/2", second)
+    assert dedup.duplicates == 1
+
+
+def test_same_url_is_suppressed():
+    dedup = briefing.DedupIndex()
+    assert dedup.add("https://www.example.com/story?utm_source=x", "China CPI rises in June")
+    assert not dedup.add("https://example.com/story", "Completely different headline")
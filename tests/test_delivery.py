@@ -0,0 +1,91 @@
+import json
+import smtplib
+
+import pytest
+
+import briefing
+
+CONFIG = {"EMAIL_HOST": "smtp.example.com", "EMAIL_PORT": "587", "EMAIL_USER": "briefing@example.com",
+          "EMAIL_PASSWORD": "", "EMAIL_TO": "leser@example.com, chef@example.com:markets"}
+
+
+def rendered(text):
+    renderer = briefing.BriefingRenderer()
+    renderer.add(briefing.NoteItem(text))
+    return renderer
+
+
+def body(msg):
+    return msg.get_payload(0).get_payload(decode=True).decode()
+
+
+def send(smtp, email_to="leser@example.com", renderer=None):
+    return briefing.send_briefings([(briefing.DEFAULT_PROFILE, renderer or rendered("briefing"))],
+                                   {**CONFIG, "EMAIL_TO": email_to})
+
+
+def test_temporary_failure_is_retried(smtp):
+    smtp.script["leser@example.com"] = [(451, b"4.7.1 greylisted")]
+    assert send(smtp)
+    assert smtp.attempts == ["leser@example.com", "leser@example.com"]
+    assert [recipient for recipient, _ in smtp.sent] == ["leser@example.com"]
+
+
+def test_temporary_failure_on_data_is_retried(smtp):
+    smtp.script["leser@example.com"] = [smtplib.SMTPDataError(451, b"4.3.0 try again later")]
+    assert send(smtp)
+    assert len(smtp.attempts) == 2
+
+
+def test_permanent_failure_is_not_retried(smtp):
+    smtp.script["leser@example.com"] = [(550, b"5.1.1 no such user")]
+    assert not send(smtp, "leser@example.com, chef@example.com")
+    assert smtp.attempts == ["leser@example.com", "chef@example.com"]
+    assert [recipient for recipient, _ in smtp.sent] == ["chef@example.com"]
+
+
+def test_retries_give_up_after_smtp_retries(smtp):
+    smtp.script["leser@example.com"] = [(451, b"busy")] * (briefing.SMTP_RETRIES + 1)
+    assert not send(smtp)
+    assert len(smtp.attempts) == briefing.SMTP_RETRIES + 1
+
+
+def test_lost_connection_reconnects(smtp):
+    smtp.script["leser@example.com"] = [smtplib.SMTPServerDisconnected("Connection unexpectedly closed")]
+    assert send(smtp, "leser@example.com, chef@example.com")
+    assert smtp.connections == 2
+    assert sorted(recipient for recipient, _ in smtp.sent) == ["chef@example.com", "leser@example.com"]
+
+
+def test_variants_per_recipient(smtp):
+    renderer = briefing.BriefingRenderer()
+    renderer.section("markets")
+    renderer.add(briefing.NoteItem("Kurse"))
+    renderer.section("google")
+    renderer.add(briefing.NoteItem("Schlagzeilen"))
+    assert send(smtp, "leser@example.com, chef@example.com:markets", renderer)
+    sent = {recipient: msg for recipient, msg in smtp.sent}
+    assert "Kurse" in body(sent["leser@example.com"]) and "Schlagzeilen" in body(sent["leser@example.com"])
+    assert "Kurse" in body(sent["chef@example.com"]) and "Schlagzeilen" not in body(sent["chef@example.com"])
+    assert sent["chef@example.com"]["To"] == "chef@example.com"
+    assert smtp.connections == 1
+
+
+def test_every_address_gets_one_briefing(smtp):
+    deliveries = [
+        (briefing.BriefingProfile("standard"), rendered("standard")),
+        (briefing.BriefingProfile("zweites"), rendered("zweites")),
+        (briefing.BriefingProfile("markt", recipients=("chef@example.com",)), rendered("markt")),
+    ]
+    assert briefing.send_briefings(deliveries, CONFIG)
+    sent = {recipient: body(msg) for recipient, msg in smtp.sent}
+    assert sorted(sent) == ["chef@example.com", "leser@example.com"]
+    assert len(smtp.sent) == 2
+    assert "markt" in sent["chef@example.com"] and "standard" in sent["leser@example.com"]
+
+
+def test_only_one_profile_may_fall_back_to_email_to(tmp_path):
+    path = tmp_path / "profiles.json"
+    path.write_text(json.dumps([{"name": "a"}, {"name": "b"}, {"name": "c", "recipients": ["x@example.com"]}]))
+    with pytest.raises(ValueError):
+        briefing.load_profiles(str(path))
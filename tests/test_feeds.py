@@ -0,0 +1,169 @@
+import time
+from itertools import islice
+
+import pytest
+
+import briefing
+
+FRESH = time.strftime("%a, %d %b %Y %H:%M:%S +0000", time.gmtime())
+
+
+def rss_items(count, link=lambda i: f"https://example.com/{i}"):
+    """Ein RSS-Feed als Liste von Stücken: Kopf, je Eintrag ein Stück, Fuß."""
+    items = [f"<item><title>China trade talks {i}</title><link>{link(i)}</link>"
+             f"<description>Beijing and Washington, round {i}.</description><pubDate>{FRESH}</pubDate></item>".encode()
+             for i in range(count)]
+    return [b'<?xml version="1.0"?><rss version="2.0"><channel><title>Test</title>', *items, b"</channel></rss>"]
+
+
+class Chunks:
+    """Body-Stücke als Generator, der mitzählt, wie viele gelesen wurden und ob er geschlossen wurde."""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.read = 0
+        self.closed = False
+
+    def __iter__(self):
+        try:
+            for chunk in self.chunks:
+                self.read += 1
+                yield chunk
+        finally:
+            self.closed = True
+
+
+class FakeResponse:
+    def __init__(self, chunks, status_code=200, headers=None):
+        self.chunks = chunks
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.url = "https://example.com/feed"
+        self.closed = False
+
+    def iter_content(self, size):
+        yield from self.chunks
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f"HTTP {self.status_code}")
+
+    def close(self):
+        self.closed = True
+
+
+class FakePolicy:
+    """Statt des Netzes: jede URL liefert dieselbe Folge von Stücken."""
+
+    def __init__(self, chunks, status_code=200, headers=None):
+        self.chunks = chunks
+        self.status_code = status_code
+        self.response_headers = headers or {}
+        self.bodies = []
+        self.requests = []
+
+    def open(self, url, params=None, headers=None, max_bytes=None):
+        self.requests.append(headers or {})
+        body = Chunks(self.chunks)
+        self.bodies.append(body)
+        return FakeResponse(self.chunks, self.status_code, self.response_headers), iter(body)
+
+
+@pytest.fixture
+def policy(monkeypatch):
+    policy = FakePolicy(rss_items(200), headers={"ETag": '"v1"'})
+    monkeypatch.setattr(briefing, "get_fetch_policy", lambda: policy)
+    return policy
+
+
+@pytest.mark.filterwarnings("ignore::DeprecationWarning")
+def test_incremental_parser_matches_feedparser():
+    feedparser = pytest.importorskip("feedparser")
+    atom = (b'<?xml version="1.0"?><feed xmlns="http://www.w3.org/2005/Atom"><title>T</title>'
+            b'<entry><title>China &amp; EU</title><link rel="alternate" href="https://example.com/a"/>'
+            b'<summary>Trade.</summary><updated>2026-10-17T08:00:00Z</updated></entry></feed>')
+    for body in (b"".join(rss_items(3)), atom):
+        expected = feedparser.parse(body).entries
+        parsed = list(briefing.iter_feed_entries([body[i:i + 50] for i in range(0, len(body), 50)]))
+        assert [e["title"] for e in parsed] == [e.title for e in expected]
+        assert [e["link"] for e in parsed] == [e.link for e in expected]
+        assert [e["summary"] for e in parsed] == [e.summary for e in expected]
+        assert [e["updated_parsed"] for e in parsed] == [e.updated_parsed for e in expected]
+
+
+def test_stream_stops_reading_once_enough_entries(policy):
+    feeds = briefing.FeedFetcher()
+    articles = briefing.rank_feed_entries("https://example.com/feed", max_items=5, feeds=feeds)
+    body = policy.bodies[0]
+    assert len(articles) == 5
+    assert body.read < 10
+    feeds.close()
+    assert body.closed
+
+
+def test_max_items_counts_entries_with_title_and_link(monkeypatch):
+    chunks = rss_items(20, link=lambda i: "" if i % 2 else f"https://example.com/{i}")
+    monkeypatch.setattr(briefing, "get_fetch_policy", lambda: FakePolicy(chunks))
+    articles = briefing.rank_feed_entries("https://example.com/feed", max_items=5, feeds=briefing.FeedFetcher())
+    assert sorted(a.link for a in articles) == [f"https://example.com/{i}" for i in (0, 2, 4, 6, 8)]
+
+
+def test_shared_stream_is_fetched_once(policy):
+    feeds = briefing.FeedFetcher()
+    assert len(list(islice(feeds.get("https://example.com/feed"), 3))) == 3
+    assert policy.bodies[0].read < 10
+    assert len(feeds.get("https://example.com/feed").entries) == 200
+    assert len(policy.bodies) == 1
+    assert feeds.shared == 1
+
+
+def test_body_is_cut_at_max_bytes():
+    response = FakeResponse([b"x" * 100] * 10)
+    body = b"".join(briefing.FetchPolicy.iter_body(response, time.monotonic() + 60, max_bytes=250))
+    assert len(body) == 250
+    assert response.closed
+
+
+def test_cache_stays_unchanged_on_early_close(policy, tmp_path):
+    url = "https://example.com/feed"
+    feeds = briefing.FeedFetcher(cache=briefing.FeedCache(str(tmp_path)))
+    assert len(briefing.rank_feed_entries(url, max_items=5, feeds=feeds)) == 5
+    feeds.close()
+    assert policy.bodies[0].read < 10 and policy.bodies[0].closed
+    assert url not in feeds.cache.index
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_cache_revalidates_only_complete_bodies(policy, tmp_path):
+    url = "https://example.com/feed"
+    feeds = briefing.FeedFetcher(cache=briefing.FeedCache(str(tmp_path)))
+    assert len(feeds.get(url).entries) == 200
+    feeds.close()
+    assert feeds.cache.index[url]["etag"] == '"v1"'
+
+    policy.status_code = 304
+    cache = briefing.FeedCache(str(tmp_path))
+    chunks, status = cache.open(url, ttl=0)
+    assert status == "304"
+    assert policy.requests[-1]["If-None-Match"] == '"v1"'
+    assert len(list(briefing.iter_feed_entries(chunks))) == 200
+
+
+def test_body_cut_at_max_bytes_is_stored_without_etag(policy, tmp_path, monkeypatch):
+    url = "https://example.com/feed"
+    body = b"".join(policy.chunks)
+    monkeypatch.setattr(briefing, "FEED_MAX_BYTES", len(body) // 2)
+    policy.chunks = [body[:len(body) // 2]]  # so liefert iter_body einen abgeschnittenen Body
+    cache = briefing.FeedCache(str(tmp_path))
+    chunks, status = cache.open(url, ttl=0)
+    assert status == "200" and b"".join(chunks) == policy.chunks[0]
+    assert cache.index[url]["etag"] is None and cache.index[url]["last_modified"] is None
+    cache.open(url, ttl=0)[0].close()
+    assert "If-None-Match" not in policy.requests[-1]
+
+
+def test_section_reads_only_max_items_fresh_entries(policy):
+    section = briefing.FeedSection({"A": "https://example.com/feed"}, briefing.timedelta(days=1), max_items=4)
+    feeds = briefing.FeedFetcher()
+    assert len(briefing.collect_feed_section(section, feeds)) == 4
+    assert policy.bodies[0].read < 10
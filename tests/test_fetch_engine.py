@@ -0,0 +1,136 @@
+import os
+import subprocess
+import sys
+import textwrap
+import threading
+import time
+
+import briefing
+
+
+def test_deadline_returns_fallback_while_job_hangs(monkeypatch):
+    monkeypatch.setitem(briefing.FETCH_DEADLINES, "slow", 0.2)
+    release = threading.Event()
+    engine = briefing.FetchEngine()
+    engine.submit("slow", release.wait, 30, fallback=lambda reason: ["ersatz", reason])
+    started = time.monotonic()
+    assert engine.result("slow")[0] == "ersatz"
+    engine.shutdown()
+    assert time.monotonic() - started < 2
+    assert all(t.daemon for t in threading.enumerate() if t.name.startswith("fetch-"))
+    release.set()
+
+
+def test_shutdown_cancels_queued_jobs():
+    release, ran = threading.Event(), []
+    engine = briefing.FetchEngine(max_workers=1)
+    engine.submit("busy", release.wait, 5)
+    engine.submit("queued", ran.append, "gestartet")
+    engine.shutdown()
+    release.set()
+    time.sleep(0.2)
+    assert ran == []
+    assert engine.jobs["queued"][0].cancelled()
+
+
+def test_hanging_fetch_does_not_block_interpreter_exit(tmp_path):
+    script = textwrap.dedent("""
+        import sys, time
+        sys.path.insert(0, %r)
+        import briefing
+        briefing.FETCH_DEADLINES["slow"] = 0.2
+        engine = briefing.FetchEngine()
+        engine.submit("slow", time.sleep, 60)
+        engine.result("slow")
+        engine.shutdown()
+    """ % os.path.dirname(os.path.abspath(briefing.__file__)))
+    started = time.monotonic()
+    subprocess.run([sys.executable, "-c", script], check=True, timeout=20, cwd=tmp_path, capture_output=True)
+    assert time.monotonic() - started < 15
+
+
+def test_imap_connect_sets_socket_timeout(monkeypatch):
+    import imaplib
+    calls = []
+    monkeypatch.setattr(imaplib, "IMAP4_SSL", lambda host, **kwargs: calls.append((host, kwargs)))
+    briefing.imap_connect("imap.example.com")
+    assert calls == [("imap.example.com", {"timeout": briefing.IMAP_TIMEOUT})]
+
+
+def test_fetches_overlap_and_rendering_needs_no_network(monkeypatch):
+    """Statt Rendern während der Abrufe: alle Quellen laufen gleichzeitig (auch das langsame IMAP), gerendert wird
+    danach aus dem Snapshot – ohne weiteren Abruf, für beliebig viele Profile."""
+    def slow(name, seconds):
+        time.sleep(seconds)
+        calls.append(name)
+        return []
+
+    calls = []
+    names = list(briefing.source_jobs(None))
+    delays = {name: 0.6 if name == "Substack" else 0.3 for name in names}
+    monkeypatch.setattr(briefing, "source_jobs", lambda feeds, **kwargs: {name: (slow, (name, delays[name]), {}) for name in names})
+    monkeypatch.setattr(briefing, "market_plan", lambda calendar, today: (False, False, True, {}))
+    briefing.use_fixtures(briefing.FixtureSession("replay", os.path.join(os.path.dirname(__file__), "fixtures"), latency=0))
+    try:
+        started = time.monotonic()
+        snapshot = briefing.collect_snapshot()
+        elapsed = time.monotonic() - started
+    finally:
+        briefing.use_fixtures(None)
+    assert sorted(calls) == sorted(names)
+    assert 0.6 <= elapsed < sum(delays.values()) / 2
+
+    def no_network(*args, **kwargs):
+        raise AssertionError("Rendern darf nichts abrufen")
+    monkeypatch.setattr(briefing, "get_fetch_policy", no_network)
+    monkeypatch.setattr(briefing, "imap_connect", no_network)
+    profiles = [briefing.DEFAULT_PROFILE, briefing.BriefingProfile("markets", sections=("intro", "markets", "outro"))]
+    rendered = briefing.render_profiles(snapshot, profiles)
+    assert set(rendered) == {briefing.DEFAULT_PROFILE.name, "markets"}
+    assert len(calls) == len(names)  # jede Quelle genau einmal
+
+
+def test_preview_snapshot_writes_nothing(monkeypatch):
+    closed, jobs = [], {}
+
+    class History(briefing.HistoryStore):
+        def close(self, prune=True):
+            closed.append(prune)
+            super().close(prune=prune)
+
+    def fake_jobs(feeds, **kwargs):
+        jobs.update(kwargs)
+        return {}
+
+    def record(history, snapshot):
+        raise AssertionError("Vorschau darf den Verlauf nicht fortschreiben")
+
+    monkeypatch.setattr(briefing, "HistoryStore", History)
+    monkeypatch.setattr(briefing, "record_snapshot", record)
+    monkeypatch.setattr(briefing, "source_jobs", fake_jobs)
+    monkeypatch.setattr(briefing, "market_plan", lambda calendar, today: (False, False, True, {}))
+    briefing.use_fixtures(briefing.FixtureSession("replay", os.path.join(os.path.dirname(__file__), "fixtures"), latency=0))
+    try:
+        briefing.collect_snapshot(commit=False, substack_mail="GMAIL_USER=a;GMAIL_PASS=b")
+    finally:
+        briefing.use_fixtures(None)
+    assert closed == [False]
+    assert jobs == {"commit": False, "substack_mail": "GMAIL_USER=a;GMAIL_PASS=b"}
+
+
+def test_bench_leaves_environment_alone(monkeypatch, tmp_path):
+    monkeypatch.delenv("SUBSTACK_MAIL", raising=False)
+    monkeypatch.chdir(tmp_path)
+    fixtures = os.path.join(os.path.dirname(__file__), "fixtures")
+    assert briefing.main(["--report", "", "bench", "--fixtures", fixtures, "-n", "1", "--latency", "0",
+                          "--repeat", "1"]) == 0
+    assert "SUBSTACK_MAIL" not in os.environ
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_bench_regressions_against_baseline():
+    baseline = {"wall": [0.2, 0.05, 0.04], "micro": {"score_article": {"seconds": 0.001}}}
+    assert briefing.bench_regressions({"wall": [0.3, 0.1, 0.1], "micro": {"score_article": {"seconds": 0.002}}},
+                                      baseline, 3) == []
+    slow = {"wall": [0.3, 0.2, 0.2], "micro": {"score_article": {"seconds": 0.004}, "neu": {"seconds": 1.0}}}
+    assert briefing.bench_regressions(slow, baseline, 3) == [("Gesamt", 0.2, 0.05), ("score_article", 0.004, 0.001)]
@@ -0,0 +1,62 @@
+from collections import defaultdict
+from types import SimpleNamespace
+
+import briefing
+
+OUTLETS = ["Reuters", "Financial Times", "Bloomberg"]
+TOPICS = ["China trade talks", "Beijing stimulus", "Chinese exports", "Xi Jinping visit", "Shanghai stocks",
+          "weather report"]
+
+
+def google_feed(count):
+    entries = [{"title": f"{TOPICS[i % len(TOPICS)]} update {i} - {OUTLETS[i % len(OUTLETS)]}",
+                "link": f"https://example.com/{i}", "source": {"title": OUTLETS[i % len(OUTLETS)]}}
+               for i in range(count)]
+    return SimpleNamespace(entries=entries)
+
+
+class Feeds:
+    def __init__(self, feed):
+        self.feed = feed
+
+    def get(self, url):
+        return self.feed
+
+
+def test_only_top_k_per_source_are_kept():
+    feed = google_feed(120)
+    kept = briefing.top_google_articles("EN", "https://news.google.com/rss", Feeds(feed)).candidates
+    per_source = defaultdict(list)
+    for category, article in briefing.scan_google_feed("EN", feed):
+        per_source[(category, article.source)].append(article)
+    k = briefing.GoogleNewsAggregator().k
+    expected = {a.link for articles in per_source.values() for a in sorted(articles, key=lambda a: -a.score)[:k]}
+    assert {a.link for _, a in kept} == expected
+    assert len(kept) <= k * len(per_source) < len(briefing.scan_google_feed("EN", feed))
+    # Feed-Reihenfolge bleibt erhalten – bei gleichem Score entscheidet sie beim Rendern
+    order = [int(a.link.rsplit("/", 1)[1]) for _, a in kept]
+    assert order == sorted(order)
+
+
+def test_rendering_from_kept_articles_is_unchanged():
+    feed = google_feed(120)
+    full = briefing.group_google_news({"EN": feed})
+    aggregator = briefing.GoogleNewsAggregator()
+    for category, article in briefing.top_google_articles("EN", "https://news.google.com/rss", Feeds(feed)).candidates:
+        aggregator.add(category, article)
+    assert aggregator.groups() == full
+
+
+def test_history_records_every_scanned_article():
+    feed = google_feed(120)
+    scan = briefing.top_google_articles("EN", "https://news.google.com/rss", Feeds(feed))
+    snapshot = briefing.BriefingSnapshot(
+        briefing.datetime.now(), True, True, False, briefing.MappingProxyType({}), briefing.MappingProxyType({}),
+        briefing.MappingProxyType({"EN": scan.candidates}), briefing.HistoryView(),
+        briefing.MappingProxyType({}), google_scanned=briefing.MappingProxyType({"EN": scan.scanned}))
+    history = briefing.HistoryStore(None)
+    briefing.record_snapshot(history, snapshot)
+    recorded = {row[0] for row in history.db.execute("SELECT link FROM articles")}
+    assert recorded == {a.link for _, a in briefing.scan_google_feed("EN", feed)}
+    assert len(recorded) > len(scan.candidates)
+    assert all(a.summary is None for a in scan.scanned)
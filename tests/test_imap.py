@@ -0,0 +1,85 @@
+import base64
+import os
+
+import pytest
+
+import briefing
+
+
+def structure(meta):
+    start = meta.index(b"BODYSTRUCTURE") + len(b"BODYSTRUCTURE")
+    return briefing.parse_imap_sexpr(meta, start)[0]
+
+
+def test_bodystructure_nested_html_part():
+    meta = (b'1 (UID 42 BODYSTRUCTURE ((("TEXT" "PLAIN" ("CHARSET" "utf-8") NIL NIL "7BIT" 12 1 NIL NIL NIL)'
+            b'("TEXT" "HTML" ("CHARSET" "UTF-8") NIL NIL "QUOTED-PRINTABLE" 3400 70 NIL NIL NIL) "ALTERNATIVE" '
+            b'("BOUNDARY" "b1") NIL NIL)("IMAGE" "PNG" ("NAME" "logo \\"1\\".png") "<logo>" NIL "BASE64" 800 NIL '
+            b'("INLINE" ("FILENAME" "logo.png")) NIL) "RELATED" ("BOUNDARY" "b0") NIL NIL))')
+    parsed = structure(meta)
+    assert parsed[1][2] == ["NAME", 'logo "1".png']
+    assert briefing.find_html_part(parsed) == ("1.2", "quoted-printable", "UTF-8")
+
+
+def test_bodystructure_single_part():
+    meta = b'(UID 7 BODYSTRUCTURE ("TEXT" "HTML" ("CHARSET" "iso-8859-1") NIL NIL "BASE64" 120 2 NIL NIL NIL))'
+    assert briefing.find_html_part(structure(meta)) == ("1", "base64", "iso-8859-1")
+
+
+def test_bodystructure_without_html():
+    meta = b'(UID 7 BODYSTRUCTURE ("TEXT" "PLAIN" NIL NIL NIL "7BIT" 12 1 NIL NIL NIL))'
+    assert briefing.find_html_part(structure(meta)) is None
+
+
+@pytest.mark.parametrize("meta", [b'(UID 7 BODYSTRUCTURE ("TEXT" "HTML" {4}', b"(UID 7 BODYSTRUCTURE (\"TEXT\""])
+def test_bodystructure_unsupported_or_truncated(meta):
+    with pytest.raises(ValueError):
+        structure(meta)
+
+
+def test_partial_fetch_response():
+    data = [
+        (b"1 (UID 101 BODY[2]<0> {11}", b"<p>Hallo</p"),
+        b")",
+        # Gmail stellt die UID auch hinter das Literal
+        (b"2 (BODY[2]<0> {5}", b"<div>"),
+        b" UID 102)",
+        b"3 (UID 103)",
+    ]
+    assert briefing.parse_uid_fetch(data) == {
+        101: (b"1 (UID 101 BODY[2]<0> {11})", {"BODY[2]<0>": b"<p>Hallo</p"}),
+        102: (b"2 (BODY[2]<0> {5} UID 102)", {"BODY[2]<0>": b"<div>"}),
+        103: (b"3 (UID 103)", {}),
+    }
+
+
+def test_header_and_structure_fetch_response():
+    header = b"From: a@substack.com\r\nSubject: Test\r\n\r\n"
+    data = [(b'5 (UID 9 BODYSTRUCTURE ("TEXT" "HTML" NIL NIL NIL "7BIT" 10 1 NIL NIL NIL) '
+             b"BODY[HEADER.FIELDS (FROM DATE SUBJECT)] {39}", header), b")"]
+    meta, items = briefing.parse_uid_fetch(data)[9]
+    assert items == {"BODY[HEADER.FIELDS (FROM DATE SUBJECT)]": header}
+    assert briefing.find_html_part(structure(meta)) == ("1", "7bit", "utf-8")
+
+
+def test_decode_truncated_parts():
+    text = "Grüße aus Peking – " * 10
+    encoded = base64.encodebytes(text.encode("utf-8"))
+    assert text.startswith(briefing.decode_body_part(encoded[:101], "base64", "utf-8"))
+    assert briefing.decode_body_part(b"Gr=C3=BC=C3=9Fe =\r\naus Pek=C3", "quoted-printable", "utf-8").startswith("Grüße aus Pek")
+    assert briefing.decode_body_part("Grüße".encode("latin-1"), "8bit", "x-unknown") == "Gre"
+
+
+def test_replay_recorded_fixtures(monkeypatch):
+    """Die mitgelieferte Aufnahme (tests/fixtures) läuft offline durch; sie dient auch dem Benchmark in der CI."""
+    monkeypatch.setenv("SUBSTACK_MAIL", "GMAIL_USER=replay;GMAIL_PASS=replay")
+    session = briefing.FixtureSession("replay", os.path.join(os.path.dirname(__file__), "fixtures"), latency=0)
+    briefing.use_fixtures(session)
+    try:
+        text = briefing.generate_briefing().text()
+    finally:
+        briefing.use_fixtures(None)
+    assert "https://example.com/en/0" in text
+    tasks = briefing.fixture_substack_tasks(session)
+    assert len(tasks) == 28
+    assert all(part == "2" and encoding == "7bit" for part, encoding, *_ in tasks)
@@ -0,0 +1,86 @@
+import briefing
+
+
+def run(store):
+    return briefing.fetch_substack_from_email("user", "password", store=store)
+
+
+def stored_uids(store):
+    return sorted(int(uid) for state in store.data.values() for uid in state["posts"])
+
+
+def test_failed_mail_is_retried_not_skipped(mailbox, tmp_path):
+    store = briefing.SubstackStore(str(tmp_path / "store.json"))
+    first, broken, last = (mailbox.add("alpha@substack.com") for _ in range(3))
+    mailbox.broken.add(broken)
+    posts = run(store)
+    state = next(iter(store.data.values()))
+    assert stored_uids(store) == [first, last]
+    assert state["last_uid"] == last
+    assert state["retry"] == {str(broken): 1}
+    assert any(post.error and str(broken) in post.error for post in posts)
+
+    mailbox.broken.clear()
+    run(briefing.SubstackStore(str(tmp_path / "store.json")))
+    store = briefing.SubstackStore(str(tmp_path / "store.json"))
+    assert stored_uids(store) == [first, broken, last]
+    assert next(iter(store.data.values()))["retry"] == {}
+
+
+def test_watermark_does_not_jump_to_uidnext(mailbox, tmp_path):
+    store = briefing.SubstackStore(str(tmp_path / "store.json"))
+    seen = mailbox.add("alpha@substack.com")
+    mailbox.add("someone@example.com")  # nicht abonniert, liegt aber unter UIDNEXT
+    run(store)
+    assert next(iter(store.data.values()))["last_uid"] == seen
+
+
+def test_retry_gives_up_after_limit(mailbox, tmp_path):
+    path = str(tmp_path / "store.json")
+    broken = mailbox.add("beta@substack.com")
+    mailbox.broken.add(broken)
+    for attempt in range(1, briefing.SUBSTACK_RETRY_ATTEMPTS):
+        run(briefing.SubstackStore(path))
+        assert next(iter(briefing.SubstackStore(path).data.values()))["retry"] == {str(broken): attempt}
+    run(briefing.SubstackStore(path))
+    assert next(iter(briefing.SubstackStore(path).data.values()))["retry"] == {}
+
+
+def test_readonly_store_is_never_written(mailbox, tmp_path):
+    path = tmp_path / "store.json"
+    mailbox.add("alpha@substack.com")
+    posts = run(briefing.SubstackStore(str(path), readonly=True))
+    assert any(post.link for post in posts)
+    assert not path.exists()
+
+
+def test_section_passes_settings_explicitly(monkeypatch):
+    calls = []
+    monkeypatch.delenv("SUBSTACK_MAIL", raising=False)
+    monkeypatch.setattr(briefing, "fetch_substack_from_email",
+                        lambda user, password, store=None, **kwargs: calls.append((user, store.readonly)) or [])
+    briefing.fetch_substack_section("GMAIL_USER=a;GMAIL_PASS=b", commit=False)
+    assert calls == [("a", True)]
+
+
+def test_gmail_error_logs_out_and_falls_back_to_stored_posts(mailbox, tmp_path, monkeypatch):
+    path = str(tmp_path / "store.json")
+    first = mailbox.add("alpha@substack.com")
+    run(briefing.SubstackStore(path))
+    mailbox.add("alpha@substack.com")
+
+    sessions = []
+    imap = briefing.imap_connect()  # FakeIMAP aus conftest
+
+    def uid(command, *args):
+        raise OSError("Verbindung abgebrochen")
+
+    monkeypatch.setattr(imap, "uid", uid)
+    monkeypatch.setattr(imap, "logout", lambda: sessions.append("logout"))
+    monkeypatch.setattr(briefing, "imap_connect", lambda *args, **kwargs: imap)
+    posts = run(briefing.SubstackStore(path))
+    assert sessions == ["logout"]
+    assert any(post.sender == "Allgemein" and "Verbindung abgebrochen" in post.error for post in posts)
+    assert [post.link for post in posts if post.link] == [f"https://alpha.substack.com/p/post-{first}"]
+    assert not any(post.note for post in posts)
+    assert next(iter(briefing.SubstackStore(path).data.values()))["last_uid"] == first